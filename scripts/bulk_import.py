@@ -0,0 +1,73 @@
+"""
+Extraction results -> bulk-import JSON
+
+Builds the single-show format read by /api/admin/import-shows-episodes:
+
+    {"showSlug": "money-heist",
+     "episodes": [{"title", "episodeNumber", "seasonNumber", "description", "duration", "videoUrl"}]}
+
+from universalv6 season results (episodes with a video_source) or non-Drive
+results (episodes with video_links).
+"""
+
+import json
+import os
+import re
+
+from hls_resolver import duration_minutes
+
+# Suffixes WorthCrete adds to show URLs and names
+SHOW_SUFFIX_PATTERN = r'(-tv-series)?(-online)?(-english|-hindi)?(-dubbed)?$'
+
+
+def slug_from_url(show_url):
+    """StreamVault slug guessed from a WorthCrete show URL"""
+    segment = show_url.rstrip('/').split('/')[-1].lower()
+    return re.sub(SHOW_SUFFIX_PATTERN, '', segment) or segment
+
+
+def video_url(episode):
+    """(videoUrl, hls info) of an extracted episode, or (None, None)"""
+    source = episode.get('video_source')
+    if source:
+        if source['type'] == 'google_drive':
+            # The catalog plays Drive files through their /preview page
+            return source['direct_link'].rsplit('/', 1)[0] + '/preview', None
+        return source['direct_link'], source.get('hls')
+
+    links = episode.get('video_links') or []
+    if not links:
+        return None, None
+    link = next((l for l in links if l.get('type') == 'video_src'), links[0])
+    return link['url'], link.get('hls')
+
+
+def to_bulk_import(show_slug, seasons):
+    """Bulk-import dict for {season number: [extracted episodes]}"""
+    episodes = []
+    for season_num in sorted(seasons):
+        for episode in sorted(seasons[season_num], key=lambda ep: ep.get('episode') or 0):
+            url, hls = video_url(episode)
+            if not url:
+                continue
+            number = episode.get('episode')
+            episodes.append({
+                'title': f"Episode {number}",
+                'episodeNumber': number,
+                'seasonNumber': season_num,
+                'description': f"Episode {number}",
+                'duration': duration_minutes(hls),
+                'videoUrl': url
+            })
+    return {'showSlug': show_slug, 'episodes': episodes}
+
+
+def save_bulk_import(data, directory="bulk-imports"):
+    """Write a bulk-import dict to <directory>/<showSlug>.json, returning the path"""
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{data['showSlug']}.json")
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, path)
+    return path
@@ -0,0 +1,75 @@
+"""
+Apply episode URL fixes to data/streamvault-data.json
+
+The shared body of the one-off update-*-urls.py scripts: set the video URL
+of a show's episodes from a (season, episode) -> URL map. Maps can also be
+loaded from a JSON file such as
+
+    {"showId": "15ee663c-...", "urls": {"S01E02": "https://...", "S01E03": "https://..."}}
+
+Used by update-banshee-urls.py, update-his-hers-urls.py and
+`streamvault_cli.py patch`.
+"""
+
+import json
+import os
+import re
+
+
+DATA_FILE = 'data/streamvault-data.json'
+
+
+def parse_episode_key(key):
+    """(season, episode) of "S01E02", "1x2" or "2" (season 1)"""
+    match = re.fullmatch(r'\s*[sS]?(\d+)\s*(?:[eExX]|-)\s*(\d+)\s*', key)
+    if match:
+        return int(match.group(1)), int(match.group(2))
+    if key.strip().isdigit():
+        return 1, int(key)
+    raise ValueError(f"Bad episode key: {key!r} (expected S01E02, 1x2 or an episode number)")
+
+
+def load_url_map(path):
+    """(show_id, {(season, episode): url}) from a URL map JSON file"""
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    return data.get('showId'), {parse_episode_key(key): url for key, url in data.get('urls', {}).items()}
+
+
+def apply_url_map(show_id, url_map, data_file=DATA_FILE, skip=(), field='googleDriveUrl', dry_run=False):
+    """Set `field` on the show's episodes found in url_map, returning the number updated"""
+    with open(data_file, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+
+    updated_count = 0
+    for episode in data.get('episodes', []):
+        if episode.get('showId') != show_id:
+            continue
+        season = episode.get('season')
+        ep_num = episode.get('episodeNumber')
+        key = (season, ep_num)
+
+        if key in skip:
+            print(f"✓ Skipping S{season}E{ep_num} - already updated")
+            continue
+
+        if key in url_map:
+            episode[field] = url_map[key]
+            updated_count += 1
+            print(f"✓ Updated S{season}E{ep_num}: {episode['title']}")
+        else:
+            print(f"⚠️ No URL mapping for S{season}E{ep_num}")
+
+    if dry_run:
+        print(f"\n🔍 Would update {updated_count} episodes (dry run, nothing saved)")
+        return updated_count
+
+    # Save the updated data
+    tmp_file = f"{data_file}.tmp"
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_file, data_file)
+
+    print(f"\n✅ Updated {updated_count} episodes!")
+    print(f"💾 Data saved to {data_file}")
+    return updated_count
@@ -1,5 +1,8 @@
 import json
 
+from link_store import is_placeholder
+from result_index import ResultIndex
+
 # Load comparison results
 with open('show_comparison_results.json', encoding='utf-8') as f:
     comparison = json.load(f)
@@ -8,11 +11,8 @@ with open('show_comparison_results.json', encoding='utf-8') as f:
 with open('data/streamvault-data.json', encoding='utf-8') as f:
     streamvault = json.load(f)
 
-# Load extracted data
-with open('english-seasons_non_drive_category.json', encoding='utf-8') as f:
-    extracted = json.load(f)
-
-PLACEHOLDER_IDS = ['1zcFHiGEOwgq2-j6hMqpsE0ov7qcIUqCd', 'PLACEHOLDER']
+# Extracted data, read per show through its byte-range index
+extracted = ResultIndex('english-seasons_non_drive_category.json')
 
 print("=" * 80)
 print("CHECKING EXISTING SHOWS FOR VIDEO LINKS")
@@ -47,7 +47,7 @@ for match in comparison['matches']:
         
         if video_url:
             # Check if it's a placeholder
-            if any(placeholder in video_url for placeholder in PLACEHOLDER_IDS):
+            if is_placeholder(video_url):
                 has_placeholders = True
             else:
                 has_real_links = True
@@ -55,7 +55,7 @@ for match in comparison['matches']:
             has_placeholders = True
     
     # Get extracted episode count
-    extracted_episodes = sum(len(eps) for eps in extracted[extracted_name].values())
+    extracted_episodes = extracted.count(extracted_name)
     
     if has_real_links and not has_placeholders:
         shows_with_links.append({
@@ -106,7 +106,7 @@ if shows_no_episodes:
     print("❌ SHOWS WITH NO EPISODES IN DATABASE:")
     print("=" * 80)
     for show in shows_no_episodes:
-        extracted_episodes = sum(len(eps) for eps in extracted[show['extracted_name']].values())
+        extracted_episodes = extracted.count(show['extracted_name'])
         print(f"\n  • {show['name']}")
         print(f"    Extracted: {extracted_episodes} episodes available")
 
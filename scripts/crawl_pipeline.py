@@ -0,0 +1,334 @@
+"""
+Streaming crawl pipeline
+
+Runs the WorthCrete crawl as connected stages instead of level by level:
+
+    list shows -> list seasons -> list episodes -> extract -> write
+
+Each stage is a generator function run on its own thread(s), reading items
+from a bounded queue and putting what it yields on the next one. A full
+queue blocks the stage feeding it, so a fast stage never runs ahead of a
+slow one and memory stays flat however large a category is. The writer
+appends one NDJSON line per extracted episode and flushes it, so the first
+results are on disk as soon as the first episode is parsed. An output
+ending in .gz or .zst is compressed (see result_stream.py); --finalize
+also writes the nested JSON and TXT exports from it at the end.
+
+Every episode is also recorded in the extractor's state store. A season
+is marked done once all its episodes were handled without a failure, and a
+show once every one of its seasons was, so a rerun skips finished shows and
+seasons as well as the episodes already extracted (unless --force). Failed
+episodes, including ones whose extraction raised, go to the dead-letter
+queue.
+
+Each output line:
+    {"category", "show", "season", "episode", "episode_url", "video_source"}
+
+Usage:
+    python crawl_pipeline.py --output all_categories_links.ndjson
+    python crawl_pipeline.py --category "Hindi Seasons" --force
+    python crawl_pipeline.py --output all_categories_links.ndjson.gz --finalize
+"""
+
+import argparse
+import queue
+import threading
+import time
+
+import video_extraction
+from parse_pool import from_cache
+from result_stream import NDJSONWriter, export_paths, finalize
+from universalv6 import CATEGORIES, WorthCreteExtractor
+
+
+# Marks the end of a stage's input
+DONE = object()
+
+
+class Stage:
+    """Run a generator function over every item of a queue on worker threads"""
+
+    def __init__(self, name, func, inbox, outbox, workers=1, on_error=None):
+        self.name = name
+        self.func = func
+        self.on_error = on_error
+        self.inbox = inbox
+        self.outbox = outbox
+        self.workers = workers
+        self.remaining = workers
+        self.lock = threading.Lock()
+        self.threads = [threading.Thread(target=self.run, name=f"{name}-{i}", daemon=True)
+                        for i in range(workers)]
+
+    def start(self):
+        for thread in self.threads:
+            thread.start()
+
+    def run(self):
+        while True:
+            item = self.inbox.get()
+            if item is DONE:
+                # Let sibling workers see the end of input too
+                self.inbox.put(DONE)
+                break
+            try:
+                for output in self.func(item):
+                    if self.outbox is not None:
+                        self.outbox.put(output)
+            except Exception as e:
+                print(f"❌ [{self.name}] {e}")
+                if self.on_error is not None:
+                    self.on_error(item, e)
+
+        # The last worker to finish closes the next stage's input
+        with self.lock:
+            self.remaining -= 1
+            last = self.remaining == 0
+        if last and self.outbox is not None:
+            self.outbox.put(DONE)
+
+    def join(self):
+        for thread in self.threads:
+            thread.join()
+
+
+class CrawlPipeline:
+    def __init__(self, extractor=None, output="all_categories_links.ndjson", delay=2,
+                 queue_size=32, fetch_workers=2, force=False):
+        self.extractor = extractor or WorthCreteExtractor()
+        self.output = output
+        self.delay = delay
+        self.queue_size = queue_size
+        self.fetch_workers = fetch_workers
+        self.force = force
+        self.stats_lock = threading.Lock()
+        self.counts = {'shows': 0, 'seasons': 0, 'episodes': 0, 'extracted': 0, 'failed': 0, 'resumed': 0}
+        # ('show', category, show_name) / ('season', category, season_url) -> [items still open, failed]
+        self.open_items = {}
+        self.show_urls = {}
+
+    def count(self, key, n=1):
+        with self.stats_lock:
+            self.counts[key] += n
+
+    # Progress: every season and episode listed under a show stays open until it is
+    # handled, and the show (or season) is marked done when its last item closes
+
+    def expect(self, key, n=1):
+        with self.stats_lock:
+            self.open_items.setdefault(key, [0, False])[0] += n
+
+    def close(self, key, failed=False):
+        """Close one item of `key`: None while others are open, else whether any failed"""
+        with self.stats_lock:
+            entry = self.open_items[key]
+            entry[0] -= 1
+            entry[1] = entry[1] or failed
+            if entry[0]:
+                return None
+            del self.open_items[key]
+        return entry[1]
+
+    def close_show(self, category_name, show_name, failed=False):
+        key = ('show', category_name, show_name)
+        failed = self.close(key, failed)
+        if failed is None:
+            return
+        show_url = self.show_urls.pop(key, None)
+        if not failed:
+            self.extractor.mark_show_extracted(category_name, show_name, show_url)
+            print(f"🏁 {show_name} done")
+
+    def close_season(self, category_name, show_name, season_label, season_url, failed=False):
+        """Close one episode of a season (or its listing)"""
+        failed = self.close(('season', category_name, season_url), failed)
+        if failed is None:
+            return
+        if not failed:
+            self.extractor.state.mark_season_done(season_url, category_name, show_name, season_label)
+        self.close_show(category_name, show_name, failed)
+
+    # Stages
+
+    def list_shows(self, category):
+        category_name, category_url = category
+        for show in self.extractor.iter_show_links_from_category(category_url, category_name):
+            if not self.force and self.extractor.is_show_extracted(category_name, show['name']):
+                continue
+            self.count('shows')
+            key = ('show', category_name, show['name'])
+            self.show_urls[key] = show['url']
+            # Closed once its seasons are listed
+            self.expect(key)
+            yield category_name, show['name'], show['url']
+
+    def list_seasons(self, show):
+        category_name, show_name, show_url = show
+        season_links = self.extractor.get_season_links_from_show_page(show_url)
+        time.sleep(self.delay)
+        
+        # Seasons finished by an earlier run are not listed again
+        seasons = [(f"Season {season_num}", season_url) for season_num, season_url in enumerate(season_links, 1)
+                   if self.force or not self.extractor.state.is_season_done(season_url)]
+        self.expect(('show', category_name, show_name), len(seasons))
+        for season_label, season_url in seasons:
+            self.count('seasons')
+            # Closed once its episodes are listed
+            self.expect(('season', category_name, season_url))
+            yield category_name, show_name, season_label, season_url
+        self.close_show(category_name, show_name, failed=not season_links)
+
+    def list_episodes(self, season):
+        category_name, show_name, season_label, season_url = season
+        episode_links = self.extractor.get_episode_links_from_season_page(season_url)
+        time.sleep(self.delay)
+        season_num = self.extractor.extract_season_number(season_url)
+        episodes = [(self.extractor.extract_episode_number(episode_url), episode_url)
+                    for episode_url in episode_links]
+        episodes = [(episode_num, episode_url) for episode_num, episode_url in episodes if episode_num is not None]
+        self.expect(('season', category_name, season_url), len(episodes))
+        for episode_num, episode_url in episodes:
+            self.count('episodes')
+            yield category_name, show_name, season_label, season_url, season_num, episode_num, episode_url
+        self.close_season(category_name, show_name, season_label, season_url, failed=not episodes)
+
+    def extract(self, episode):
+        category_name, show_name, season_label, season_url, season_num, episode_num, episode_url = episode
+        state = self.extractor.state
+        
+        # Episodes stored by an earlier (interrupted) run are not fetched again
+        if not self.force and state.episode_result(episode_url):
+            state.add_episode_category(episode_url, category_name, show_name, season_label)
+            self.count('resumed')
+            self.close_season(category_name, show_name, season_label, season_url)
+            return
+        
+        stats = self.extractor.rule_stats
+        with self.stats_lock:
+            rule_order = stats.video_rule_order(category_name, show_name, season_num)
+            drive_pattern_order = stats.drive_pattern_order(category_name, show_name, season_num)
+
+        future = self.extractor.submit_episode(
+            episode_url,
+            rule_order=rule_order,
+            drive_pattern_order=drive_pattern_order,
+            context={'category': category_name, 'show': show_name, 'season': season_label, 'episode': episode_num}
+        )
+        found = future.result() if future is not None else None
+        time.sleep(self.delay)
+
+        if not found:
+            state.record_episode(episode_url, None, category_name, show_name, season_label, season_url, episode_num)
+            self.extractor.dead_letters.add('universal', episode_url,
+                                            'fetch_failed' if future is None else 'no_video_source',
+                                            category_name, show_name, season_label, season_url, episode_num)
+            self.count('failed')
+            self.close_season(category_name, show_name, season_label, season_url, failed=True)
+            print(f"✗ {show_name} {season_label} Episode {episode_num}: no video source")
+            return
+
+        if not from_cache(future):
+            with self.stats_lock:
+                stats.record_match(found, category_name, show_name, season_num)
+        record = {
+            'category': category_name,
+            'show': show_name,
+            'season': season_label,
+            'episode': episode_num,
+            'episode_url': episode_url,
+            'video_source': video_extraction.build_video_source(found[0], found[1])
+        }
+        
+        # Same optional second hops as WorthCreteExtractor.extract_season
+        if self.extractor.embed_resolver is not None:
+            self.extractor.embed_resolver.resolve_episodes([record])
+        if self.extractor.hls_resolver is not None:
+            self.extractor.hls_resolver.annotate_episodes([record])
+        state.record_episode(episode_url, {'video_source': record['video_source']},
+                             category_name, show_name, season_label, season_url, episode_num)
+        self.extractor.dead_letters.resolve('universal', episode_url)
+        yield dict(record, season_url=season_url)
+
+    def extract_failed(self, episode, error):
+        """Dead-letter an episode whose extraction raised"""
+        category_name, show_name, season_label, season_url, season_num, episode_num, episode_url = episode
+        self.extractor.dead_letters.add('universal', episode_url, f"error: {error}",
+                                        category_name, show_name, season_label, season_url, episode_num)
+        self.count('failed')
+        self.close_season(category_name, show_name, season_label, season_url, failed=True)
+
+    def run(self, categories):
+        """Crawl the given {name: url} categories, streaming results to the output file"""
+        start = time.time()
+        queues = [queue.Queue(maxsize=self.queue_size) for _ in range(5)]
+
+        with NDJSONWriter(self.output) as writer:
+            def write(record):
+                season_url = record.pop('season_url')
+                writer.write(record)
+                self.count('extracted')
+                print(f"✓ {record['show']} {record['season']} Episode {record['episode']} "
+                      f"({record['video_source']['type']})")
+                self.close_season(record['category'], record['show'], record['season'], season_url)
+                return ()
+
+            stages = [
+                Stage('shows', self.list_shows, queues[0], queues[1]),
+                Stage('seasons', self.list_seasons, queues[1], queues[2]),
+                Stage('episodes', self.list_episodes, queues[2], queues[3]),
+                Stage('extract', self.extract, queues[3], queues[4], workers=self.fetch_workers,
+                      on_error=self.extract_failed),
+                Stage('write', write, queues[4], None),
+            ]
+            for stage in stages:
+                stage.start()
+
+            for category in categories.items():
+                queues[0].put(category)
+            queues[0].put(DONE)
+
+            for stage in stages:
+                stage.join()
+
+        self.extractor.rule_stats.save()
+        self.extractor.parse_pool.flush()
+
+        elapsed = time.time() - start
+        print("\n" + "=" * 80)
+        print(f"📊 Pipeline Summary ({elapsed:.0f}s): {self.counts['shows']} shows, "
+              f"{self.counts['seasons']} seasons, {self.counts['episodes']} episodes")
+        print(f"✅ Extracted: {self.counts['extracted']}")
+        print(f"⏭️  Already extracted: {self.counts['resumed']}")
+        print(f"⚠️  No video source: {self.counts['failed']}")
+        print(f"💾 Results streamed to {self.output}")
+        return self.counts
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Streaming WorthCrete crawl with NDJSON output")
+    parser.add_argument('--category', action='append', choices=list(CATEGORIES),
+                        help="category to crawl (repeatable, default: all)")
+    parser.add_argument('--output', default="all_categories_links.ndjson", help="NDJSON output file (appended)")
+    parser.add_argument('--delay', type=float, default=2, help="seconds between requests per fetching stage")
+    parser.add_argument('--queue-size', type=int, default=32, help="capacity of each queue between stages")
+    parser.add_argument('--fetch-workers', type=int, default=2, help="threads fetching episode pages")
+    parser.add_argument('--force', action='store_true', help="also crawl shows already in the history")
+    parser.add_argument('--finalize', action='store_true',
+                        help="write the nested JSON and TXT exports next to the output when done")
+    args = parser.parse_args(argv)
+
+    categories = {name: CATEGORIES[name] for name in (args.category or CATEGORIES)}
+
+    extractor = WorthCreteExtractor()
+    try:
+        CrawlPipeline(extractor, args.output, args.delay, args.queue_size,
+                      args.fetch_workers, args.force).run(categories)
+    finally:
+        extractor.parse_pool.close()
+
+    if args.finalize:
+        finalize(args.output, *export_paths(args.output))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,564 @@
+"""
+Declarative pipeline runner: extract -> match -> validate -> upload -> patch
+
+Chains the manual steps (extract / compare-shows.py / check-existing-links.py
+/ upload-to-archive.py / update-*-urls.py) as stages of one pipeline. Stages
+pass episode records to each other in memory; every stage's output is also
+spooled to <spool>/<stage>.ndjson, with records that failed in
+<stage>.rejects.ndjson.
+
+A pipeline is a JSON file (see DEFAULT_PIPELINE, or `--print-default`):
+
+    {"spool": "pipeline_spool",
+     "stages": [
+       {"name": "load", "use": "load", "inputs": [{"file": "english-seasons_non_drive_category.json"}]},
+       {"name": "match", "use": "match", "after": ["load"], "options": {"data": "data/streamvault-data.json"}},
+       {"name": "validate", "use": "validate", "after": ["match"], "concurrency": 8, "retries": 2},
+       ...]}
+
+- use          stage type from STAGE_TYPES
+- after        upstream stages, whose outputs are concatenated as input
+- inputs       input records of a stage without upstream stages
+- concurrency  records processed at once (threads)
+- retries      extra attempts per record (whole input for batch stages),
+               with exponential backoff from `backoff` seconds
+
+Re-runs are incremental: a stage's fingerprint covers its definition, the
+hash of its input records and the files it reads. A stage whose fingerprint
+matches the spool manifest is not run; its spooled output is used instead,
+so only stages whose inputs changed (and what they feed) run again.
+`--force STAGE` re-runs a stage regardless (e.g. extract, whose input is
+the live site).
+
+Patch stages only report what they would change unless their options set
+"dry_run": false or the runner is started with --write, since the catalog
+match that picks each show is fuzzy.
+
+Episode records:
+    {"show", "season", "season_number", "episode", "episode_url", "url", "type",
+     "category"?, "show_id"?, "catalog_title"?, "slug"?, "file"? (local video to upload)}
+
+Usage:
+    python dag_runner.py --pipeline pipeline.json
+    python dag_runner.py --force extract
+    python dag_runner.py --write
+    python dag_runner.py --print-default > pipeline.json
+"""
+
+import argparse
+import hashlib
+import importlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from bulk_import import save_bulk_import, to_bulk_import, video_url
+from link_store import canonical_link, is_placeholder
+from result_stream import iter_records
+from state_store import season_number, show_slug
+
+
+DEFAULT_PIPELINE = {
+    "spool": "pipeline_spool",
+    "stages": [
+        {"name": "load", "use": "load",
+         "inputs": [{"file": "english-seasons_non_drive_category.json"}]},
+        {"name": "match", "use": "match", "after": ["load"],
+         "options": {"data": "data/streamvault-data.json"}},
+        {"name": "validate", "use": "validate", "after": ["match"], "concurrency": 8, "retries": 2,
+         "options": {"check_http": True}},
+        {"name": "upload", "use": "upload", "after": ["validate"], "concurrency": 1, "retries": 3, "backoff": 30},
+        {"name": "patch", "use": "patch", "after": ["upload"],
+         "options": {"data": "data/streamvault-data.json", "field": "googleDriveUrl", "bulk_dir": "bulk-imports",
+                     "dry_run": True}},
+    ]
+}
+
+
+class StageError(Exception):
+    """A record that should be rejected without retrying"""
+
+
+def file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def records_hash(records):
+    digest = hashlib.sha256()
+    for record in records:
+        digest.update(json.dumps(record, sort_keys=True, ensure_ascii=False).encode('utf-8'))
+        digest.update(b'\n')
+    return digest.hexdigest()
+
+
+def episode_record(show, season, episode, category=None):
+    """Pipeline record of an extracted episode (video_source or video_links layout)"""
+    url, _ = video_url(episode)
+    source = episode.get('video_source')
+    links = episode.get('video_links') or []
+    record = {
+        'show': show,
+        'season': season,
+        'season_number': season_number(season),
+        'episode': episode.get('episode'),
+        'episode_url': episode.get('episode_url') or episode.get('url'),
+        'url': url,
+        'type': source['type'] if source else next((l['type'] for l in links if l.get('url') == url), None),
+    }
+    if category:
+        record['category'] = category
+    return record
+
+
+# Stage types
+#
+# map stages:   func(record, options, context) -> record, list of records or None (drop)
+# batch stages: func(records, options, context) -> list of records
+# files(options, records) lists the files a stage reads, for its fingerprint
+
+def load_records(record, options, context):
+    """Episode records of an extraction result file (JSON or an NDJSON result stream, maybe compressed)"""
+    path = record['file']
+    records = []
+    if path.endswith(('.ndjson', '.ndjson.gz', '.ndjson.zst')):
+        for ep in iter_records(path):
+            records.append(episode_record(ep.get('show'), ep.get('season'), ep, ep.get('category')))
+        return records
+
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    for key, value in data.items():
+        first = next(iter(value.values()), None) if isinstance(value, dict) else None
+        if isinstance(first, list):
+            # Show -> Season -> episodes (non-Drive layout)
+            for season, episodes in value.items():
+                records.extend(episode_record(key, season, ep) for ep in episodes)
+        else:
+            # Category -> Show -> Season -> episodes (universalv6 layout)
+            for show, seasons in value.items():
+                for season, episodes in seasons.items():
+                    records.extend(episode_record(show, season, ep, key) for ep in episodes)
+    return records
+
+
+def extract_show(record, options, context):
+    """Extract a show ({'slug' or 'show_url', 'seasons'?, 'episodes'?}) into episode records"""
+    extractor = context.extractor()
+    if record.get('show_url'):
+        show = extractor.state.find_show_by_url(record['show_url'])
+        if show is None:
+            if not record.get('category'):
+                raise StageError(f"'{record['show_url']}' is not in the show index and has no category")
+            show = {
+                'category': record['category'],
+                'show_name': record['show_url'].rstrip('/').split('/')[-1],
+                'show_url': record['show_url'],
+            }
+    else:
+        from reextract_show import AmbiguousShowError, ShowReextractor
+        try:
+            show = ShowReextractor(extractor).resolve(record['slug'], record.get('category'))
+        except AmbiguousShowError as e:
+            raise StageError(str(e))
+        if show is None:
+            raise StageError(f"no show found for '{record['slug']}'")
+
+    records = []
+    season_links = extractor.get_season_links_from_show_page(show['show_url'])
+    for season_num, season_url in enumerate(season_links, 1):
+        if record.get('seasons') and season_num not in record['seasons']:
+            continue
+        season = f"Season {season_num}"
+        episodes = extractor.extract_season(
+            season_url, options.get('delay', 1), show['category'], show['show_name'], season,
+            only_episodes=record.get('episodes'), refresh=True
+        )
+        for ep in episodes:
+            extracted = episode_record(show['show_name'], season, ep, show['category'])
+            if record.get('slug'):
+                extracted['slug'] = record['slug']
+            records.append(extracted)
+    return records
+
+
+def match_catalog(record, options, context):
+    """Attach the catalog show (compare-shows.py matching) to a record"""
+    catalog = context.catalog(options.get('data', 'data/streamvault-data.json'))
+    sv_show = context.compare.match_show(record['show'], catalog['by_title'])
+    if not sv_show:
+        return dict(record, show_id=None)
+    matched = dict(record, show_id=sv_show['id'], catalog_title=sv_show['title'])
+    if sv_show.get('slug'):
+        matched['slug'] = sv_show['slug']
+    return matched
+
+
+def validate_link(record, options, context):
+    """Reject records without a usable link, with a placeholder, or (check_http) a dead one"""
+    url = record.get('url')
+    key, _ = canonical_link(url)
+    if not url or not url.startswith('http') or key is None:
+        raise StageError("no link")
+    if is_placeholder(key):
+        raise StageError("placeholder link")
+    if record.get('file') or not options.get('check_http'):
+        return record
+
+    # Each canonical source is checked once per run, however many records share it.
+    # Network errors raise and are retried; a 404/410 is final
+    status = context.link_status(key)
+    if status is None:
+        status = context.session().head(url, timeout=options.get('timeout', 15), allow_redirects=True).status_code
+        context.set_link_status(key, status)
+    if status in (404, 410):
+        raise StageError(f"HTTP {status}")
+    return record
+
+
+def upload_record(record, options, context):
+    """Upload a record's local video file to Internet Archive and use its URL"""
+    if not record.get('file'):
+        return record
+    uploader = importlib.import_module('upload-to-archive')
+    result = uploader.upload_video(
+        file_path=record['file'],
+        title=f"Episode {record['episode']}",
+        show_name=record.get('catalog_title') or record['show'],
+        season=record.get('season_number'),
+        episode=record.get('episode'),
+    )
+    if not result.get('success'):
+        raise RuntimeError(result.get('error') or "upload failed")
+    return dict(record, url=result['video_url'], type='direct_video', file=None)
+
+
+def patch_catalog(records, options, context):
+    """Set the URLs of matched shows in the catalog; write bulk imports for the others"""
+    catalog_patch = importlib.import_module('catalog_patch')
+    by_show = {}
+    unmatched = {}
+    for record in records:
+        if record.get('show_id'):
+            by_show.setdefault(record['show_id'], []).append(record)
+        else:
+            slug = record.get('slug') or show_slug(record['show'])
+            unmatched.setdefault(slug, []).append(record)
+
+    dry_run = options.get('dry_run', True)
+    for show_id, show_records in by_show.items():
+        url_map = {(r['season_number'], r['episode']): r['url'] for r in show_records}
+        catalog_patch.apply_url_map(show_id, url_map, options.get('data', 'data/streamvault-data.json'),
+                                    field=options.get('field', 'googleDriveUrl'), dry_run=dry_run)
+        context.invalidate_catalog()
+
+    if not options.get('bulk_dir'):
+        return records
+    # Not in the catalog yet: a bulk-import file per show for when it is created
+    for slug, show_records in unmatched.items():
+        seasons = {}
+        for r in show_records:
+            seasons.setdefault(r['season_number'], []).append(
+                {'episode': r['episode'], 'video_links': [{'url': r['url'], 'type': r['type']}]})
+        show = show_records[0]['show']
+        if dry_run:
+            path = os.path.join(options['bulk_dir'], f"{slug}.json")
+            print(f"📦 {show}: not in the catalog, would write {path}")
+        else:
+            path = save_bulk_import(to_bulk_import(slug, seasons), options['bulk_dir'])
+            print(f"📦 {show}: not in the catalog, wrote {path}")
+    return records
+
+
+def data_file(options, records):
+    return [options.get('data', 'data/streamvault-data.json')]
+
+
+def input_files(options, records):
+    return [record['file'] for record in records if record.get('file')]
+
+
+# use -> (function, 'map' or 'batch', files read)
+STAGE_TYPES = {
+    'load': (load_records, 'map', input_files),
+    'extract': (extract_show, 'map', None),
+    'match': (match_catalog, 'map', data_file),
+    'validate': (validate_link, 'map', input_files),
+    'upload': (upload_record, 'map', input_files),
+    'patch': (patch_catalog, 'batch', data_file),
+}
+
+
+class RunContext:
+    """Objects shared by the records of a run: catalog, HTTP sessions, extractors"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.catalogs = {}
+        self.extractors = []
+        # Shared by the per-thread extractors so there is a single writer of the stats file
+        self.rule_stats = None
+        # canonical link key -> HTTP status seen this run
+        self.link_statuses = {}
+        self._compare = None
+
+    @property
+    def compare(self):
+        if self._compare is None:
+            self._compare = importlib.import_module('compare-shows')
+        return self._compare
+
+    def catalog(self, path):
+        with self.lock:
+            if path not in self.catalogs:
+                with open(path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                self.catalogs[path] = {
+                    'data': data,
+                    'by_title': {s['title'].lower().strip(): s for s in data.get('shows', [])},
+                }
+            return self.catalogs[path]
+
+    def invalidate_catalog(self):
+        with self.lock:
+            self.catalogs.clear()
+
+    def link_status(self, key):
+        with self.lock:
+            return self.link_statuses.get(key)
+
+    def set_link_status(self, key, status):
+        with self.lock:
+            self.link_statuses[key] = status
+
+    def session(self):
+        if not hasattr(self.local, 'session'):
+            self.local.session = requests.Session()
+            self.local.session.headers.update({
+                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+            })
+        return self.local.session
+
+    def extractor(self):
+        if not hasattr(self.local, 'extractor'):
+            from universalv6 import WorthCreteExtractor
+            extractor = WorthCreteExtractor(parse_workers=0)
+            with self.lock:
+                if self.rule_stats is None:
+                    self.rule_stats = extractor.rule_stats
+                extractor.rule_stats = self.rule_stats
+                self.extractors.append(extractor)
+            self.local.extractor = extractor
+        return self.local.extractor
+
+    def close(self):
+        if self.rule_stats is not None:
+            self.rule_stats.save()
+        for extractor in self.extractors:
+            extractor.parse_pool.close()
+
+
+class DagRunner:
+    def __init__(self, pipeline, force=()):
+        self.stages = {stage['name']: stage for stage in pipeline['stages']}
+        self.spool = pipeline.get('spool', 'pipeline_spool')
+        self.force = set(force)
+        self.manifest_file = os.path.join(self.spool, 'manifest.json')
+        self.order = self.topological_order()
+
+    def topological_order(self):
+        order = []
+        visiting = set()
+
+        def visit(name, path=()):
+            if name in order:
+                return
+            if name in visiting:
+                raise ValueError(f"cycle in pipeline: {' -> '.join(path + (name,))}")
+            if name not in self.stages:
+                raise ValueError(f"unknown stage '{name}' (after {path[-1] if path else '?'})")
+            stage = self.stages[name]
+            if stage['use'] not in STAGE_TYPES:
+                raise ValueError(f"stage '{name}': unknown type '{stage['use']}'")
+            visiting.add(name)
+            for upstream in stage.get('after', []):
+                visit(upstream, path + (name,))
+            visiting.discard(name)
+            order.append(name)
+
+        for name in self.stages:
+            visit(name)
+        return order
+
+    # Spool
+
+    def load_manifest(self):
+        if os.path.exists(self.manifest_file):
+            with open(self.manifest_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        return {}
+
+    def save_manifest(self, manifest):
+        tmp_file = f"{self.manifest_file}.tmp"
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp_file, self.manifest_file)
+
+    def spool_path(self, name, suffix="ndjson"):
+        return os.path.join(self.spool, f"{name}.{suffix}")
+
+    def write_spool(self, path, records):
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            for record in records:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        os.replace(tmp_path, path)
+
+    def read_spool(self, path):
+        with open(path, 'r', encoding='utf-8') as f:
+            return [json.loads(line) for line in f if line.strip()]
+
+    # Running
+
+    def fingerprint(self, stage, records, input_hash=None):
+        _, _, files = STAGE_TYPES[stage['use']]
+        parts = [json.dumps(stage, sort_keys=True), input_hash or records_hash(records)]
+        for path in (files(stage.get('options', {}), records) if files else []):
+            parts.append(f"{path}:{file_hash(path) if os.path.exists(path) else 'missing'}")
+        return hashlib.sha256("\n".join(parts).encode('utf-8')).hexdigest()
+
+    def attempt(self, func, value, stage, context):
+        """Run a stage function with the stage's retry policy; (result, error)"""
+        retries = stage.get('retries', 0)
+        backoff = stage.get('backoff', 2)
+        options = stage.get('options', {})
+        for attempt in range(retries + 1):
+            try:
+                return func(value, options, context), None
+            except StageError as e:
+                return None, str(e)
+            except Exception as e:
+                if attempt == retries:
+                    return None, f"{type(e).__name__}: {e}"
+                time.sleep(backoff * 2 ** attempt)
+
+    def run_stage(self, stage, records, context):
+        """(output records, rejected records) of one stage"""
+        func, mode, _ = STAGE_TYPES[stage['use']]
+
+        if mode == 'batch':
+            result, error = self.attempt(func, records, stage, context)
+            if error:
+                return [], [dict(record, error=error) for record in records]
+            return result, []
+
+        outputs = []
+        rejected = []
+        with ThreadPoolExecutor(max_workers=stage.get('concurrency', 1)) as pool:
+            futures = [pool.submit(self.attempt, func, record, stage, context) for record in records]
+            for record, future in zip(records, futures):
+                result, error = future.result()
+                if error:
+                    rejected.append(dict(record, error=error))
+                elif isinstance(result, list):
+                    outputs.extend(result)
+                elif result is not None:
+                    outputs.append(result)
+        return outputs, rejected
+
+    def run(self):
+        os.makedirs(self.spool, exist_ok=True)
+        manifest = self.load_manifest()
+        outputs = {}
+        context = RunContext()
+        start = time.time()
+
+        try:
+            for name in self.order:
+                stage = self.stages[name]
+                if stage.get('after'):
+                    records = [record for upstream in stage['after'] for record in outputs[upstream]]
+                else:
+                    records = stage.get('inputs', [])
+
+                input_hash = records_hash(records)
+                fingerprint = self.fingerprint(stage, records, input_hash)
+                previous = manifest.get(name)
+                spool_file = self.spool_path(name)
+                if (name not in self.force and previous and previous['fingerprint'] == fingerprint
+                        and os.path.exists(spool_file)):
+                    outputs[name] = self.read_spool(spool_file)
+                    print(f"⏭️  {name}: inputs unchanged, {len(outputs[name])} record(s) from spool")
+                    continue
+
+                stage_start = time.time()
+                print(f"\n▶️  {name} ({stage['use']}): {len(records)} input record(s)")
+                output, rejected = self.run_stage(stage, records, context)
+                outputs[name] = output
+
+                self.write_spool(spool_file, output)
+                self.write_spool(self.spool_path(name, "rejects.ndjson"), rejected)
+                manifest[name] = {
+                    # Files are hashed after the run, so those a stage writes itself (patch) don't count
+                    # as changed; the input hash is the one from before, in case a stage edited its records
+                    'fingerprint': self.fingerprint(stage, records, input_hash),
+                    'output_hash': records_hash(output),
+                    'records': len(output),
+                    'rejected': len(rejected),
+                    'finished_at': time.time(),
+                }
+                self.save_manifest(manifest)
+
+                print(f"✅ {name}: {len(output)} record(s) out, {len(rejected)} rejected "
+                      f"({time.time() - stage_start:.1f}s)")
+                for record in rejected[:5]:
+                    print(f"   ✗ {record.get('show')} {record.get('season')} "
+                          f"Episode {record.get('episode')}: {record['error']}")
+                if len(rejected) > 5:
+                    print(f"   ... see {self.spool_path(name, 'rejects.ndjson')}")
+        finally:
+            context.close()
+
+        print(f"\n📊 Pipeline finished in {time.time() - start:.1f}s (spool: {self.spool})")
+        return outputs
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the extract -> validate -> upload -> patch pipeline")
+    parser.add_argument('--pipeline', default=None, help="pipeline JSON (default: built-in)")
+    parser.add_argument('--force', action='append', default=[], help="re-run this stage even if unchanged")
+    parser.add_argument('--write', action='store_true',
+                        help="let patch stages save the catalog (default: dry run)")
+    parser.add_argument('--print-default', action='store_true', help="print the built-in pipeline and exit")
+    args = parser.parse_args(argv)
+
+    if args.print_default:
+        print(json.dumps(DEFAULT_PIPELINE, indent=2))
+        return
+
+    pipeline = DEFAULT_PIPELINE
+    if args.pipeline:
+        with open(args.pipeline, 'r', encoding='utf-8') as f:
+            pipeline = json.load(f)
+
+    if args.write:
+        pipeline = dict(pipeline, stages=[
+            dict(stage, options=dict(stage.get('options', {}), dry_run=False)) if stage['use'] == 'patch' else stage
+            for stage in pipeline['stages']
+        ])
+    elif any(stage['use'] == 'patch' and stage.get('options', {}).get('dry_run', True) for stage in pipeline['stages']):
+        print("🔍 Patch stages run dry (pass --write to save the catalog)")
+
+    DagRunner(pipeline, args.force).run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Persistent dead-letter queue for failed episodes
+
+Every episode an extractor could not fetch or extract is recorded here with
+the reason, how many times it has failed, when it first and last failed,
+and where it belongs (category, show, season), instead of being printed
+and forgotten. redrive.py re-processes just these entries.
+
+Entries are keyed by (extractor, episode URL): failing again bumps the
+attempt count, succeeding (in a normal run or a re-drive) marks the entry
+resolved.
+"""
+
+import sqlite3
+import threading
+import time
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS dead_letters (
+    extractor TEXT NOT NULL,
+    episode_url TEXT NOT NULL,
+    reason TEXT,
+    attempts INTEGER NOT NULL DEFAULT 1,
+    first_failed REAL NOT NULL,
+    last_failed REAL NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    category TEXT,
+    show_name TEXT,
+    season_label TEXT,
+    season_url TEXT,
+    episode INTEGER,
+    PRIMARY KEY (extractor, episode_url)
+);
+CREATE INDEX IF NOT EXISTS dead_letters_status ON dead_letters (extractor, status);
+"""
+
+COLUMNS = ('extractor', 'episode_url', 'reason', 'attempts', 'first_failed', 'last_failed', 'status',
+           'category', 'show_name', 'season_label', 'season_url', 'episode')
+
+
+class DeadLetterQueue:
+    def __init__(self, dlq_file="dead_letters.sqlite"):
+        self.dlq_file = dlq_file
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(dlq_file, check_same_thread=False)
+        self.db.executescript(SCHEMA)
+
+    def add(self, extractor, episode_url, reason, category=None, show_name=None, season_label=None,
+            season_url=None, episode=None):
+        """Record a failed episode (or one more failure of a known one)"""
+        now = time.time()
+        with self.lock, self.db:
+            self.db.execute(
+                "INSERT INTO dead_letters VALUES (?, ?, ?, 1, ?, ?, 'pending', ?, ?, ?, ?, ?) "
+                "ON CONFLICT (extractor, episode_url) DO UPDATE SET "
+                "reason = excluded.reason, attempts = attempts + 1, last_failed = excluded.last_failed, "
+                "status = 'pending', "
+                "category = COALESCE(excluded.category, category), "
+                "show_name = COALESCE(excluded.show_name, show_name), "
+                "season_label = COALESCE(excluded.season_label, season_label), "
+                "season_url = COALESCE(excluded.season_url, season_url), "
+                "episode = COALESCE(excluded.episode, episode)",
+                (extractor, episode_url, reason, now, now, category, show_name, season_label, season_url, episode)
+            )
+
+    def resolve(self, extractor, episode_url):
+        """Mark an entry as resolved after the episode was extracted"""
+        with self.lock, self.db:
+            self.db.execute(
+                "UPDATE dead_letters SET status = 'resolved' WHERE extractor = ? AND episode_url = ? AND status = 'pending'",
+                (extractor, episode_url)
+            )
+
+    def pending(self, extractor=None, max_attempts=None):
+        """Pending entries as dicts, oldest failure first"""
+        query = "SELECT * FROM dead_letters WHERE status = 'pending'"
+        params = []
+        if extractor:
+            query += " AND extractor = ?"
+            params.append(extractor)
+        if max_attempts:
+            query += " AND attempts < ?"
+            params.append(max_attempts)
+        query += " ORDER BY first_failed"
+        with self.lock:
+            rows = self.db.execute(query, params).fetchall()
+        return [dict(zip(COLUMNS, row)) for row in rows]
+
+    def counts(self):
+        """{(extractor, status): n}"""
+        with self.lock:
+            rows = self.db.execute(
+                "SELECT extractor, status, COUNT(*) FROM dead_letters GROUP BY extractor, status"
+            ).fetchall()
+        return {(extractor, status): n for extractor, status, n in rows}
+
+    def close(self):
+        with self.lock:
+            self.db.close()
@@ -0,0 +1,112 @@
+"""
+Second-hop resolver for generic iframe embeds
+
+An 'iframe_embed' video source only points at a third-party player page,
+which the viewer's browser has to load before any media arrives. This stage
+fetches those embed pages concurrently and, where the page exposes the
+underlying media (an HLS manifest or a video file), makes that the
+episode's source:
+
+    {'type': 'hls' | 'direct_video', 'embed_code': ..., 'direct_link': media URL,
+     'embed_page': original embed URL}
+
+Episodes whose embed page yields nothing keep their iframe_embed source.
+
+Caching is per host: resolved embed URLs are remembered, and a host that
+keeps failing (no media found or unreachable) is skipped after
+`host_failure_limit` attempts with no success. At most `per_host` requests
+run against one host at a time.
+"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+import requests
+
+import video_extraction
+from html_parsing import decode_page
+
+
+class EmbedResolver:
+    def __init__(self, session=None, workers=8, per_host=2, host_failure_limit=3, timeout=15):
+        if session is None:
+            session = requests.Session()
+            session.headers.update({
+                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+            })
+        self.session = session
+        self.workers = workers
+        self.per_host = per_host
+        self.host_failure_limit = host_failure_limit
+        self.timeout = timeout
+        self.lock = threading.Lock()
+        # host -> {'resolved': {embed_url: (type, media_url) or None}, 'ok': n, 'failed': n}
+        self.hosts = {}
+        self.host_slots = {}
+
+    def host_cache(self, host):
+        with self.lock:
+            if host not in self.hosts:
+                self.hosts[host] = {'resolved': {}, 'ok': 0, 'failed': 0}
+                self.host_slots[host] = threading.Semaphore(self.per_host)
+            return self.hosts[host]
+
+    def host_given_up(self, cache):
+        return cache['ok'] == 0 and cache['failed'] >= self.host_failure_limit
+
+    def resolve(self, embed_url):
+        """(type, media_url) behind an embed page, or None"""
+        host = urlparse(embed_url).netloc.lower()
+        cache = self.host_cache(host)
+
+        with self.lock:
+            if embed_url in cache['resolved']:
+                return cache['resolved'][embed_url]
+            if self.host_given_up(cache):
+                return None
+
+        found = None
+        with self.host_slots[host]:
+            try:
+                response = self.session.get(embed_url, timeout=self.timeout,
+                                            headers={'Referer': video_extraction.BASE_URL})
+                response.raise_for_status()
+                found = video_extraction.find_embed_media(decode_page(response), response.url or embed_url)
+            except requests.exceptions.RequestException:
+                found = None
+
+        with self.lock:
+            cache['resolved'][embed_url] = found
+            if found:
+                cache['ok'] += 1
+            else:
+                cache['failed'] += 1
+        return found
+
+    @staticmethod
+    def resolved_source(video_source, found):
+        """video_source for the resolved media, remembering the embed page"""
+        resolved = video_extraction.build_video_source(found[0], found[1])
+        resolved['embed_page'] = video_source['direct_link']
+        return resolved
+
+    def resolve_episodes(self, episodes):
+        """Resolve the iframe_embed episodes of a season result list in place
+
+        Returns the number of episodes whose source was replaced.
+        """
+        targets = [ep for ep in episodes
+                   if ep.get('video_source') and ep['video_source']['type'] == 'iframe_embed']
+        if not targets:
+            return 0
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            found_list = list(pool.map(lambda ep: self.resolve(ep['video_source']['direct_link']), targets))
+
+        resolved = 0
+        for episode, found in zip(targets, found_list):
+            if found:
+                episode['video_source'] = self.resolved_source(episode['video_source'], found)
+                resolved += 1
+        return resolved
@@ -0,0 +1,150 @@
+"""
+Compact extracted-episode records
+
+An extracted episode is a dict with a nested video_source dict whose
+embed_code is an HTML snippet repeating direct_link inside boilerplate
+markup. embed_code is fully determined by the source type and link (see
+video_extraction.build_video_source), so EpisodeRecord keeps only the
+type and link and builds the markup when the episode is exported.
+
+Records are slotted. The source type and the directory part of both URLs
+are interned, so the season path and media host an episode shares with
+its neighbours are stored once however many episodes point at them. A
+record reads like the dict it replaces (ep['video_source']['type'],
+ep.get('episode'), dict(ep)), and json_default lets json.dump write it
+exactly as that dict.
+
+The same split is used for stored results: compact_result() drops a
+regenerable embed_code before a result is written to the state store and
+expand_result() puts it back when it is read.
+"""
+
+import sys
+from collections.abc import Mapping
+
+from video_extraction import build_video_source
+
+
+KEYS = ('episode', 'episode_url', 'video_source')
+
+
+def split_url(url):
+    """(interned directory part, rest of the URL)
+
+    Episodes of a season share everything up to their last path segment,
+    both in their WorthCrete URL and usually in their media link. A short
+    last segment such as Drive's /view stays with the segment before it,
+    so the shared part is .../file/d/ rather than one directory per file.
+    """
+    if not url:
+        return None, url
+    end = url.rstrip('/').rfind('/')
+    if end != -1 and len(url) - end <= 9:
+        end = url.rfind('/', 0, end)
+    if end < url.find('://') + 3:
+        return None, url
+    return sys.intern(url[:end + 1]), url[end + 1:]
+
+
+def join_url(directory, leaf):
+    return directory + leaf if directory else leaf
+
+
+class EpisodeRecord(Mapping):
+    """One episode with a video_source, without the stored embed markup"""
+
+    __slots__ = ('episode', 'url_dir', 'url_leaf', 'type', 'link_dir', 'link_leaf', 'extra')
+
+    def __init__(self, episode, episode_url, source_type, direct_link, extra=None):
+        self.episode = episode
+        self.url_dir, self.url_leaf = split_url(episode_url)
+        self.type = sys.intern(source_type)
+        self.link_dir, self.link_leaf = split_url(direct_link)
+        # Other video_source keys ('hls', 'embed_page', a non-standard embed_code), usually None
+        self.extra = extra or None
+
+    @classmethod
+    def from_dict(cls, episode):
+        """Record for an extracted episode dict; episodes without a video_source stay dicts"""
+        if isinstance(episode, cls):
+            return episode
+        source = episode.get('video_source')
+        if not source or set(episode) - set(KEYS):
+            return episode
+        source = compact_source(source)
+        extra = {key: value for key, value in source.items() if key not in ('type', 'direct_link')}
+        return cls(episode.get('episode'), episode.get('episode_url'), source['type'], source['direct_link'], extra)
+
+    @property
+    def episode_url(self):
+        return join_url(self.url_dir, self.url_leaf)
+
+    @property
+    def direct_link(self):
+        return join_url(self.link_dir, self.link_leaf)
+
+    @property
+    def video_source(self):
+        """The full video_source dict, embed_code included"""
+        source = build_video_source(self.type, self.direct_link)
+        if self.extra:
+            source.update(self.extra)
+        return source
+
+    def to_dict(self):
+        return {'episode': self.episode, 'episode_url': self.episode_url, 'video_source': self.video_source}
+
+    # Mapping interface, so code written for episode dicts keeps working
+
+    def __getitem__(self, key):
+        if key not in KEYS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __iter__(self):
+        return iter(KEYS)
+
+    def __len__(self):
+        return len(KEYS)
+
+    def __repr__(self):
+        return f"EpisodeRecord({self.episode!r}, {self.episode_url!r}, {self.type!r}, {self.direct_link!r})"
+
+
+def compact_episodes(episodes):
+    """Season result list with compact records where possible"""
+    return [EpisodeRecord.from_dict(ep) for ep in episodes]
+
+
+def json_default(value):
+    """json.dump default= hook writing records as their episode dicts"""
+    if isinstance(value, EpisodeRecord):
+        return value.to_dict()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def compact_source(source):
+    """video_source without embed_code when build_video_source would produce the same one"""
+    if 'embed_code' not in source or 'type' not in source or 'direct_link' not in source:
+        return source
+    built = build_video_source(source['type'], source['direct_link'])
+    if source['embed_code'] != built['embed_code']:
+        return source
+    return {key: value for key, value in source.items() if key != 'embed_code'}
+
+
+def compact_result(result):
+    """Stored form of an episode result ({'video_source': ...} or {'video_links': [...]})"""
+    if result and result.get('video_source'):
+        return dict(result, video_source=compact_source(result['video_source']))
+    return result
+
+
+def expand_result(result):
+    """Result as the extractor produced it, with embed_code rebuilt if it was dropped"""
+    source = result.get('video_source') if result else None
+    if not source or 'embed_code' in source:
+        return result
+    full = build_video_source(source['type'], source['direct_link'])
+    full.update((key, value) for key, value in source.items() if key not in full)
+    return dict(result, video_source=full)
@@ -1,17 +1,57 @@
+import os
 import re
 import requests
-from bs4 import BeautifulSoup
 from urllib.parse import urljoin
 import json
 import time
 
+import video_extraction
+from dead_letter import DeadLetterQueue
+from hls_resolver import HLSResolver
+from html_parsing import decode_page, extract_hrefs
+from page_classifier import classify_page, NON_DRIVE_FAMILIES
+from page_store import open_page_store
+from result_stream import open_writer
+from show_triage import ShowTriage
+from state_store import StateStore
+
 class NonDriveVideoExtractor:
-    def __init__(self, base_url="https://www.worthcrete.com"):
+    def __init__(self, base_url="https://www.worthcrete.com", page_store=None, resume=True):
         self.base_url = base_url
         self.session = requests.Session()
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
         })
+        # Fetched episode pages are kept for offline re-extraction when set
+        self.page_store = page_store or open_page_store()
+        # Category/show the episodes being fetched belong to
+        self.page_context = {}
+        # Episode results, so an interrupted run resumes where it stopped;
+        # without resume every episode is fetched again and its result replaced
+        self.state = StateStore("extraction_state.sqlite", "non_drive")
+        self.resume = resume
+        # Episodes that could not be fetched are kept for redrive.py
+        self.dead_letters = DeadLetterQueue()
+        # .m3u8 links get variant, duration and segment info when enabled
+        resolve_hls = os.getenv('STREAMVAULT_RESOLVE_HLS', '') not in ('', '0')
+        self.hls_resolver = HLSResolver(self.session) if resolve_hls else None
+        # Episodes are appended to STREAMVAULT_STREAM_OUTPUT as they are extracted when set
+        self.result_stream = open_writer()
+    
+    def store_episode_page(self, response, episode_url):
+        """Keep a fetched episode page in the page store, if one is configured"""
+        if self.page_store is None:
+            return
+        season_num = self.extract_season_number(episode_url)
+        try:
+            self.page_store.put_response(
+                response, 'episode', episode_url,
+                season=f"Season {season_num}" if season_num else None,
+                episode=video_extraction.extract_episode_number(episode_url),
+                **self.page_context
+            )
+        except Exception as e:
+            print(f"⚠️  Error storing page: {e}")
     
     def is_google_drive_url(self, url):
         """Check if URL is a Google Drive link"""
@@ -21,59 +61,13 @@ class NonDriveVideoExtractor:
     
     def has_non_drive_videos_quick_check(self, html_content):
         """Quick check if HTML contains non-Drive video indicators"""
-        html_lower = html_content.lower()
-        
-        # Check for Mega.nz
-        if 'mega.nz' in html_lower:
-            return True
-        
-        # Check for direct video files
-        video_extensions = ['.mp4', '.m3u8', '.webm', '.mkv', '.avi', '.mov']
-        for ext in video_extensions:
-            if ext in html_lower:
-                return True
-        
-        # Check for common video hosting domains (excluding Drive and YouTube)
-        non_drive_hosts = ['vimeo.com', 'dailymotion.com', 'streamtape.com', 
-                          'doodstream.com', 'mixdrop.co', 'upstream.to']
-        for host in non_drive_hosts:
-            if host in html_lower:
-                return True
-        
-        return False
+        # One pass over the page for Mega.nz, direct video files and
+        # common video hosting domains (excluding Drive and YouTube)
+        return classify_page(html_content).has_any(NON_DRIVE_FAMILIES)
     
     def extract_video_urls(self, html_content):
         """Extract non-Drive video URLs from HTML content"""
-        video_urls = []
-        
-        # Patterns for different video sources
-        patterns = {
-            'mega': r'https?://mega\.nz/[^\s\'"<>]+',
-            'direct_video': r'https?://[^\s\'"<>]+\.(mp4|m3u8|webm|mkv|avi|mov)(?:\?[^\s\'"<>]*)?',
-            'iframe_src': r'<iframe[^>]+src=["\']([^"\']+)["\']',
-            'video_src': r'<video[^>]+src=["\']([^"\']+)["\']',
-            'source_src': r'<source[^>]+src=["\']([^"\']+)["\']',
-        }
-        
-        for pattern_name, pattern in patterns.items():
-            matches = re.findall(pattern, html_content, re.IGNORECASE)
-            for match in matches:
-                url = match[0] if isinstance(match, tuple) else match
-                
-                if self.is_google_drive_url(url):
-                    continue
-                
-                skip_domains = ['google.com', 'facebook.com', 'twitter.com', 'instagram.com', 
-                               'youtube.com', 'doubleclick.net', 'googletagmanager.com']
-                if any(domain in url.lower() for domain in skip_domains):
-                    continue
-                
-                video_urls.append({
-                    'url': url,
-                    'type': pattern_name
-                })
-        
-        return video_urls
+        return video_extraction.extract_video_urls(html_content)
     
     def extract_season_number(self, url):
         """Extract season number from URL"""
@@ -82,35 +76,39 @@ class NonDriveVideoExtractor:
             return int(match.group(1))
         return None
     
+    def parse_episode_links(self, html_content, season_url):
+        """Episode links of an already-fetched season page (None if the season number is unknown)"""
+        current_season_num = self.extract_season_number(season_url)
+        
+        if current_season_num is None:
+            return None
+        
+        episode_links = []
+        
+        for href in extract_hrefs(html_content):
+            if 'episode' not in href.lower():
+                continue
+            
+            episode_season_num = self.extract_season_number(href)
+            
+            if episode_season_num == current_season_num:
+                full_url = urljoin(self.base_url, href)
+                episode_links.append(full_url)
+        
+        return sorted(list(set(episode_links)))
+    
     def get_episode_links_from_season_page(self, season_url):
         """Extract all episode links from a season page"""
         try:
             response = self.session.get(season_url, timeout=15)
             response.raise_for_status()
-            soup = BeautifulSoup(response.content, 'html.parser')
             
-            current_season_num = self.extract_season_number(season_url)
+            episode_links = self.parse_episode_links(decode_page(response), season_url)
             
-            if current_season_num is None:
+            if episode_links is None:
                 print("⚠️  Could not determine season number from URL")
                 return []
             
-            episode_links = []
-            
-            for link in soup.find_all('a', href=True):
-                href = link['href']
-                
-                if 'episode' not in href.lower():
-                    continue
-                
-                episode_season_num = self.extract_season_number(href)
-                
-                if episode_season_num == current_season_num:
-                    full_url = urljoin(self.base_url, href)
-                    episode_links.append(full_url)
-            
-            episode_links = sorted(list(set(episode_links)))
-            
             return episode_links
         
         except Exception as e:
@@ -118,22 +116,18 @@ class NonDriveVideoExtractor:
             return []
     
     def extract_video_links_from_episode(self, episode_url, retries=3):
-        """Extract non-Drive video links from an episode page"""
+        """Extract non-Drive video links from an episode page (None if it can't be fetched)"""
         for attempt in range(retries):
             try:
                 response = self.session.get(episode_url, timeout=15)
                 response.raise_for_status()
                 
-                video_urls = self.extract_video_urls(response.text)
+                self.store_episode_page(response, episode_url)
+                
+                video_urls = video_extraction.find_video_links(decode_page(response))
                 
                 if video_urls:
-                    unique_urls = []
-                    seen = set()
-                    for video in video_urls:
-                        if video['url'] not in seen:
-                            seen.add(video['url'])
-                            unique_urls.append(video)
-                    return unique_urls
+                    return video_urls
                 
                 if attempt == retries - 1:
                     print(f"\n⚠️  No non-Drive video URLs found")
@@ -145,7 +139,7 @@ class NonDriveVideoExtractor:
                     time.sleep(3)
                 else:
                     print(f"❌ Timeout after {retries} attempts")
-                    return []
+                    return None
             
             except requests.exceptions.RequestException as e:
                 if attempt < retries - 1:
@@ -153,48 +147,48 @@ class NonDriveVideoExtractor:
                     time.sleep(3)
                 else:
                     print(f"❌ Failed: {str(e)[:50]}")
-                    return []
+                    return None
         
         return []
     
-    def extract_season(self, season_url, delay=2, check_first_only=False):
-        """Extract all non-Drive video links from a season"""
+    def extract_season(self, season_url, delay=2, check_first_only=False, episode_links=None, prefetched=None,
+                       season_label=None):
+        """Extract all non-Drive video links from a season
+        
+        episode_links and prefetched (episode_url -> video_links) let a
+        caller that already fetched the season page or some episodes,
+        such as the show triage, skip downloading them again.
+        """
         print(f"\n🔍 Extracting season from: {season_url}")
         print("=" * 80)
         
         season_num = self.extract_season_number(season_url)
         if season_num:
             print(f"📺 Detected: Season {season_num}")
+        season_label = season_label or (f"Season {season_num}" if season_num else None)
+        
+        prefetched = prefetched or {}
         
         # Quick pre-check: fetch season page and check for non-Drive video indicators
-        if check_first_only:
+        if episode_links is not None:
+            pass
+        elif check_first_only:
             try:
                 print(f"🔍 Quick check: Fetching season page...")
                 response = self.session.get(season_url, timeout=15)
                 response.raise_for_status()
                 
+                html = decode_page(response)
+                
                 # Quick check if this season has non-Drive videos
-                if not self.has_non_drive_videos_quick_check(response.text):
+                if not self.has_non_drive_videos_quick_check(html):
                     print(f"⏭️  SKIPPING SHOW - No non-Drive video indicators found (likely Drive-only)")
                     return None
                 else:
                     print(f"✓ Found non-Drive video indicators, proceeding...")
                 
                 # Use the already-fetched HTML to get episode links
-                soup = BeautifulSoup(response.content, 'html.parser')
-                current_season_num = self.extract_season_number(season_url)
-                
-                episode_links = []
-                for link in soup.find_all('a', href=True):
-                    href = link['href']
-                    if 'episode' not in href.lower():
-                        continue
-                    episode_season_num = self.extract_season_number(href)
-                    if episode_season_num == current_season_num:
-                        full_url = urljoin(self.base_url, href)
-                        episode_links.append(full_url)
-                
-                episode_links = sorted(list(set(episode_links)))
+                episode_links = self.parse_episode_links(html, season_url) or []
                 
             except Exception as e:
                 print(f"⚠️  Error in quick check: {e}, falling back to normal method")
@@ -215,6 +209,7 @@ class NonDriveVideoExtractor:
             
             # Try to extract non-Drive videos from first episode
             video_links = self.extract_video_links_from_episode(first_episode_url)
+            prefetched[first_episode_url] = video_links
             
             if not video_links:
                 # No extractable non-Drive videos found in first episode, skip the show
@@ -226,10 +221,49 @@ class NonDriveVideoExtractor:
         results = []
         failed_episodes = []
         
+        # Stream lines are nested under the same keys as the saved JSON of this mode
+        path = {'show': self.page_context.get('show'), 'season': season_label}
+        path = {key: value for key, value in path.items() if value}
+        
+        def stream(ep):
+            if self.result_stream is not None:
+                self.result_stream.write(dict(path, **ep))
+        
         for i, episode_url in enumerate(episode_links, 1):
             print(f"📥 [{i}/{len(episode_links)}] Processing Episode {i}...", end=" ")
             
-            video_links = self.extract_video_links_from_episode(episode_url)
+            stored = None
+            if self.resume:
+                status = self.state.episode_status(episode_url)
+                if status == 'ok':
+                    stored = self.state.episode_result(episode_url)
+                elif status == 'drive_only':
+                    # Fetched before and found to hold only Drive links
+                    stored = {'video_links': []}
+            fetched = episode_url not in prefetched and not stored
+            if stored:
+                video_links = stored['video_links']
+                if self.page_context.get('category'):
+                    self.state.add_episode_category(episode_url, self.page_context['category'],
+                                                    self.page_context.get('show'), season_label)
+            elif fetched:
+                video_links = self.extract_video_links_from_episode(episode_url)
+            else:
+                video_links = prefetched[episode_url]
+            
+            if not stored:
+                self.state.record_episode(
+                    episode_url, {'video_links': video_links} if video_links else None,
+                    self.page_context.get('category'), self.page_context.get('show'),
+                    season_label, season_url, i, status='drive_only' if video_links == [] else None
+                )
+                # None means the page could not be fetched ([] is a Drive-only episode)
+                if video_links is not None:
+                    self.dead_letters.resolve('non_drive', episode_url)
+                else:
+                    self.dead_letters.add('non_drive', episode_url, 'fetch_failed',
+                                          self.page_context.get('category'), self.page_context.get('show'),
+                                          season_label, season_url, i)
             
             if video_links:
                 results.append({
@@ -237,14 +271,28 @@ class NonDriveVideoExtractor:
                     'episode_url': episode_url,
                     'video_links': video_links
                 })
+                stream(results[-1])
                 print(f"✓ Found {len(video_links)} video link(s)")
             else:
                 failed_episodes.append({'episode': i, 'url': episode_url})
                 print(f"✗ No non-Drive videos found")
             
-            if i < len(episode_links):
+            if fetched and i < len(episode_links):
                 time.sleep(delay)
         
+        if self.hls_resolver is not None:
+            before = [json.dumps(ep['video_links'], sort_keys=True) for ep in results]
+            annotated = self.hls_resolver.annotate_episodes(results)
+            if annotated:
+                print(f"🎞️  Read {annotated} HLS manifest(s)")
+            # Only episodes that gained manifest info are written again (the last line wins)
+            for ep, links in zip(results, before):
+                if json.dumps(ep['video_links'], sort_keys=True) != links:
+                    self.state.record_episode(ep['episode_url'], {'video_links': ep['video_links']},
+                                              self.page_context.get('category'), self.page_context.get('show'),
+                                              season_label, season_url, ep['episode'])
+                    stream(ep)
+        
         print("\n" + "=" * 80)
         print(f"✅ Successfully extracted: {len(results)}/{len(episode_links)} episodes")
         
@@ -258,11 +306,10 @@ class NonDriveVideoExtractor:
         try:
             response = self.session.get(show_url, timeout=15)
             response.raise_for_status()
-            soup = BeautifulSoup(response.content, 'html.parser')
+            hrefs = extract_hrefs(decode_page(response))
             
             season_links = []
-            for link in soup.find_all('a', href=True):
-                href = link['href']
+            for href in hrefs:
                 if re.search(r'season[s]?-\d+', href.lower()) and 'episode' not in href.lower():
                     full_url = urljoin(self.base_url, href)
                     season_links.append(full_url)
@@ -295,7 +342,7 @@ class NonDriveVideoExtractor:
         for season_num, season_url in enumerate(season_links, 1):
             print(f"\n{'='*80}")
             print(f"🎯 SEASON {season_num}")
-            results = self.extract_season(season_url, delay)
+            results = self.extract_season(season_url, delay, season_label=f"Season {season_num}")
             all_results[f"Season {season_num}"] = results
             total_success += len(results)
         
@@ -320,11 +367,10 @@ class NonDriveVideoExtractor:
                 print(f"   Processing page {page}...")
                 response = self.session.get(page_url, timeout=15)
                 response.raise_for_status()
-                soup = BeautifulSoup(response.content, 'html.parser')
+                hrefs = extract_hrefs(decode_page(response))
                 
                 page_shows = []
-                for link in soup.find_all('a', href=True):
-                    href = link['href']
+                for href in hrefs:
                     # Improved regex for show links: ends with -online-something/
                     if (re.search(r'/[^/]+-online-[^/]+/?$', href) and 
                         'seasons-' not in href.lower() and 'episode' not in href.lower()):
@@ -367,8 +413,13 @@ class NonDriveVideoExtractor:
         print(f"✅ Total unique shows loaded: {len(unique_shows)}")
         return unique_shows
     
-    def extract_category(self, category_url, delay=2):
-        """Extract all shows from a category"""
+    def extract_category(self, category_url, delay=2, confidence=0.8, max_samples=8):
+        """Extract all shows from a category
+        
+        Each show is first triaged by sampling up to max_samples episodes
+        across its seasons until its source type is settled at the given
+        confidence; Drive-only shows are skipped.
+        """
         print(f"\n🌐 Extracting category from: {category_url}")
         print("=" * 80)
         
@@ -383,9 +434,14 @@ class NonDriveVideoExtractor:
         all_results = {}
         skipped_shows = 0
         
+        category_name = category_url.rstrip('/').split('/')[-1]
+        # Checks up front that the confidence is reachable within max_samples
+        show_triage = ShowTriage(self, confidence=confidence, max_samples=max_samples)
+        
         for i, show_info in enumerate(show_links, 1):
             show_name = show_info['name']
             show_url = show_info['url']
+            self.page_context = {'category': category_name, 'show': show_name}
             
             print(f"\n{'='*80}")
             print(f"[{i}/{len(show_links)}] Processing: {show_name}")
@@ -401,26 +457,32 @@ class NonDriveVideoExtractor:
             
             print(f"✅ Found {len(season_links)} seasons")
             
+            print(f"🔍 Triage: sampling episodes across {len(season_links)} season(s)...")
+            triage = show_triage.triage(season_links)
+            print(f"   Verdict: {triage.verdict} after {len(triage.samples)} sample(s) "
+                  f"(confidence {triage.confidence:.2f})")
+            
+            if not triage.worth_extracting:
+                print(f"⏭️  SKIPPING ENTIRE SHOW - Google Drive links only")
+                skipped_shows += 1
+                time.sleep(delay * 2)
+                continue
+            
             show_results = {}
-            show_has_drive_links = False
             
             for season_num, season_url in enumerate(season_links, 1):
                 print(f"\n🎯 SEASON {season_num}")
-                # Check first episode only for Drive links
-                results = self.extract_season(season_url, delay, check_first_only=True)
-                
-                # If results is None, the show has Drive links - skip entire show
-                if results is None:
-                    show_has_drive_links = True
-                    print(f"⏭️  SKIPPING ENTIRE SHOW - Google Drive links detected")
-                    break
+                results = self.extract_season(
+                    season_url, delay,
+                    episode_links=triage.episode_links.get(season_url),
+                    prefetched=triage.samples,
+                    season_label=f"Season {season_num}"
+                )
                 
                 if results:
                     show_results[f"Season {season_num}"] = results
             
-            if show_has_drive_links:
-                skipped_shows += 1
-            elif show_results:
+            if show_results:
                 all_results[show_name] = show_results
             
             # Delay between shows
@@ -542,71 +604,60 @@ def main():
         print("❌ Invalid choice! Please run again and choose 1, 2, or 3.")
         return
     
-    extractor = NonDriveVideoExtractor()
+    examples = {
+        '1': ("📌 SINGLE SEASON MODE", "https://www.worthcrete.com/literature/seasons/english-seasons/stranger-things-online-english/stranger-things-seasons-1-online-english/", "season"),
+        '2': ("🎭 ALL SEASONS MODE", "https://www.worthcrete.com/literature/seasons/english-seasons/stranger-things-online-english/", "show"),
+        '3': ("🌐 CATEGORY MODE (WITH PAGINATION)", "https://www.worthcrete.com/literature/seasons/english-seasons/", "category"),
+    }
+    title, example, mode = examples[choice]
+    print("\n" + "-"*80)
+    print(title)
+    print("-"*80)
+    print(f"Example: {example}")
+    url = input(f"\n🔗 Enter {mode} URL: ").strip()
     
-    if choice == "1":
-        print("\n" + "-"*80)
-        print("📌 SINGLE SEASON MODE")
-        print("-"*80)
-        print("Example: https://www.worthcrete.com/literature/seasons/english-seasons/stranger-things-online-english/stranger-things-seasons-1-online-english/")
-        season_url = input("\n🔗 Enter season URL: ").strip()
-        
-        if not season_url:
-            print("❌ No URL provided!")
-            return
-        
-        results = extractor.extract_season(season_url, delay=2)
-        
-        if results:
-            extractor.print_results(results)
-            
-            filename = season_url.rstrip('/').split('/')[-1]
-            extractor.save_to_json(results, f"{filename}_non_drive_links.json")
-            extractor.save_to_txt(results, f"{filename}_non_drive_links.txt")
+    if not url:
+        print("❌ No URL provided!")
+        return
     
-    elif choice == "2":
-        print("\n" + "-"*80)
-        print("🎭 ALL SEASONS MODE")
-        print("-"*80)
-        print("Example: https://www.worthcrete.com/literature/seasons/english-seasons/stranger-things-online-english/")
-        show_url = input("\n🔗 Enter show URL: ").strip()
-        
-        if not show_url:
-            print("❌ No URL provided!")
-            return
-        
-        all_results = extractor.extract_all_seasons(show_url, delay=2)
-        
-        if all_results:
-            extractor.print_results(all_results)
-            
-            show_name = show_url.rstrip('/').split('/')[-1]
-            extractor.save_to_json(all_results, f"{show_name}_non_drive_all_seasons.json")
-            extractor.save_to_txt(all_results, f"{show_name}_non_drive_all_seasons.txt")
+    force = input("♻️  Re-fetch episodes already extracted? (y/N): ").strip().lower() == 'y'
     
-    elif choice == "3":
-        print("\n" + "-"*80)
-        print("🌐 CATEGORY MODE (WITH PAGINATION)")
-        print("-"*80)
-        print("Example: https://www.worthcrete.com/literature/seasons/english-seasons/")
-        category_url = input("\n🔗 Enter category URL: ").strip()
-        
-        if not category_url:
-            print("❌ No URL provided!")
-            return
-        
-        all_results = extractor.extract_category(category_url, delay=2)
+    extract(mode, url, delay=2, force=force)
+
+
+def extract(mode, url, delay=2, output=None, force=False):
+    """Extract a season, show or category URL and save the JSON and TXT results (no prompts)
+
+    With force, episodes already in the state store are fetched again.
+    """
+    extractor = NonDriveVideoExtractor(resume=not force)
+    
+    if mode == "season":
+        results = extractor.extract_season(url, delay=delay)
+        suffix = "_non_drive_links"
+    elif mode == "show":
+        results = extractor.extract_all_seasons(url, delay=delay)
+        suffix = "_non_drive_all_seasons"
+    elif mode == "category":
+        results = extractor.extract_category(url, delay=delay)
+        suffix = "_non_drive_category"
+    else:
+        raise ValueError(f"Unknown mode: {mode}")
+    
+    if extractor.result_stream is not None:
+        extractor.result_stream.close()
+    
+    if results:
+        extractor.print_results(results)
         
-        if all_results:
-            extractor.print_results(all_results)
-            
-            category_name = category_url.rstrip('/').split('/')[-1]
-            extractor.save_to_json(all_results, f"{category_name}_non_drive_category.json")
-            extractor.save_to_txt(all_results, f"{category_name}_non_drive_category.txt")
+        base = os.path.splitext(output)[0] if output else url.rstrip('/').split('/')[-1] + suffix
+        extractor.save_to_json(results, f"{base}.json")
+        extractor.save_to_txt(results, f"{base}.txt")
     
     print("\n" + "="*80)
     print("✅ Extraction complete!")
     print("="*80)
+    return results
 
 
 if __name__ == "__main__":
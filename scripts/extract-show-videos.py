@@ -1,10 +1,12 @@
 import re
 import requests
-from bs4 import BeautifulSoup
 from urllib.parse import urljoin
 import json
 import time
 
+import video_extraction
+from html_parsing import decode_page, extract_hrefs
+
 class ShowVideoExtractor:
     """Extract non-Drive video URLs from a specific show"""
     
@@ -23,35 +25,7 @@ class ShowVideoExtractor:
     
     def extract_video_urls(self, html_content):
         """Extract non-Drive video URLs from HTML content"""
-        video_urls = []
-        
-        patterns = {
-            'mega': r'https?://mega\.nz/[^\s\'"<>]+',
-            'direct_video': r'https?://[^\s\'"<>]+\.(mp4|m3u8|webm|mkv|avi|mov)(?:\?[^\s\'"<>]*)?',
-            'iframe_src': r'<iframe[^>]+src=["\']([^"\']+)["\']',
-            'video_src': r'<video[^>]+src=["\']([^"\']+)["\']',
-            'source_src': r'<source[^>]+src=["\']([^"\']+)["\']',
-        }
-        
-        for pattern_name, pattern in patterns.items():
-            matches = re.findall(pattern, html_content, re.IGNORECASE)
-            for match in matches:
-                url = match[0] if isinstance(match, tuple) else match
-                
-                if self.is_google_drive_url(url):
-                    continue
-                
-                skip_domains = ['google.com', 'facebook.com', 'twitter.com', 'instagram.com', 
-                               'youtube.com', 'doubleclick.net', 'googletagmanager.com']
-                if any(domain in url.lower() for domain in skip_domains):
-                    continue
-                
-                video_urls.append({
-                    'url': url,
-                    'type': pattern_name
-                })
-        
-        return video_urls
+        return video_extraction.extract_video_urls(html_content)
     
     def extract_season_number(self, url):
         """Extract season number from URL"""
@@ -65,11 +39,10 @@ class ShowVideoExtractor:
         try:
             response = self.session.get(show_url, timeout=15)
             response.raise_for_status()
-            soup = BeautifulSoup(response.content, 'html.parser')
+            hrefs = extract_hrefs(decode_page(response))
             
             season_links = []
-            for link in soup.find_all('a', href=True):
-                href = link['href']
+            for href in hrefs:
                 if re.search(r'season[s]?-\d+', href.lower()) and 'episode' not in href.lower():
                     full_url = urljoin(self.base_url, href)
                     season_links.append(full_url)
@@ -88,7 +61,7 @@ class ShowVideoExtractor:
         try:
             response = self.session.get(season_url, timeout=15)
             response.raise_for_status()
-            soup = BeautifulSoup(response.content, 'html.parser')
+            hrefs = extract_hrefs(decode_page(response))
             
             current_season_num = self.extract_season_number(season_url)
             
@@ -98,9 +71,7 @@ class ShowVideoExtractor:
             
             episode_links = []
             
-            for link in soup.find_all('a', href=True):
-                href = link['href']
-                
+            for href in hrefs:
                 if 'episode' not in href.lower():
                     continue
                 
@@ -125,7 +96,7 @@ class ShowVideoExtractor:
                 response = self.session.get(episode_url, timeout=15)
                 response.raise_for_status()
                 
-                video_urls = self.extract_video_urls(response.text)
+                video_urls = self.extract_video_urls(decode_page(response))
                 
                 if video_urls:
                     unique_urls = []
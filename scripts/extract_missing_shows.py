@@ -7,12 +7,22 @@ Usage: python scripts/extract_missing_shows.py
 
 import re
 import requests
-from bs4 import BeautifulSoup
 from urllib.parse import urljoin
 import json
 import time
 import os
 
+import video_extraction
+from dead_letter import DeadLetterQueue
+from html_parsing import decode_page, extract_hrefs
+
+CATEGORIES = {
+    "English Seasons": "https://www.worthcrete.com/literature/seasons/english-seasons/",
+    "Hindi Seasons": "https://www.worthcrete.com/literature/seasons/hindi-seasons/",
+    "Hindi Dubbed Seasons": "https://www.worthcrete.com/literature/seasons/hindi-dubbed-seasons/"
+}
+
+
 class StreamVaultExtractor:
     def __init__(self, base_url="https://www.worthcrete.com/", data_file="data/streamvault-data.json"):
         self.base_url = base_url
@@ -24,6 +34,8 @@ class StreamVaultExtractor:
         self.output_file = "scripts/missing_shows_links.json"
         self.checkpoint_file = "scripts/extraction_checkpoint.json"
         self.existing_shows = set()
+        # Failed episodes are kept for redrive.py
+        self.dead_letters = DeadLetterQueue()
         self.load_existing_shows()
         self.load_checkpoint()
     
@@ -118,62 +130,11 @@ class StreamVaultExtractor:
     
     def extract_google_drive_id(self, content):
         """Extract Google Drive file ID from content"""
-        patterns = [
-            r'drive\.google\.com/file/d/([a-zA-Z0-9_-]+)',
-            r'drive-video-([a-zA-Z0-9_-]+)',
-            r'/file/d/([a-zA-Z0-9_-]+)/preview',
-            r'id="drive-video-([a-zA-Z0-9_-]+)"',
-            r'data-id="([a-zA-Z0-9_-]+)"',
-            r'fileId["\s:=]+([a-zA-Z0-9_-]+)',
-            r'src="[^"]*?/d/([a-zA-Z0-9_-]+)',
-        ]
-        
-        for pattern in patterns:
-            match = re.search(pattern, content, re.IGNORECASE)
-            if match:
-                return match.group(1)
-        return None
+        return video_extraction.extract_google_drive_id(content)
     
     def extract_video_source(self, html_content):
         """Detect and extract video source from HTML"""
-        soup = BeautifulSoup(html_content, 'html.parser')
-        
-        # Look for iframe with video sources
-        iframes = soup.find_all('iframe', src=re.compile(r'(drive\.google\.com|mega\.nz|youtube\.com|youtu\.be|vimeo\.com)', re.I))
-        if iframes:
-            src = iframes[0]['src']
-            if 'drive.google.com' in src:
-                drive_id = self.extract_google_drive_id(src)
-                if drive_id:
-                    return {
-                        'type': 'google_drive',
-                        'drive_id': drive_id,
-                        'embed_url': f"https://drive.google.com/file/d/{drive_id}/preview"
-                    }
-            return {'type': 'iframe', 'src': src}
-        
-        # Look for video tag
-        video = soup.find('video')
-        if video:
-            src_attr = video.get('src')
-            if not src_attr:
-                source = video.find('source')
-                if source:
-                    src_attr = source.get('src')
-            if src_attr:
-                full_src = urljoin(self.base_url, src_attr) if not src_attr.startswith('http') else src_attr
-                return {'type': 'html5', 'src': full_src}
-        
-        # Fallback regex for Google Drive
-        drive_id = self.extract_google_drive_id(html_content)
-        if drive_id:
-            return {
-                'type': 'google_drive',
-                'drive_id': drive_id,
-                'embed_url': f"https://drive.google.com/file/d/{drive_id}/preview"
-            }
-        
-        return None
+        return video_extraction.extract_video_source(html_content, self.base_url)
     
     def extract_season_number(self, url):
         """Extract season number from URL"""
@@ -194,15 +155,14 @@ class StreamVaultExtractor:
         try:
             response = self.session.get(season_url, timeout=15)
             response.raise_for_status()
-            soup = BeautifulSoup(response.content, 'html.parser')
+            hrefs = extract_hrefs(decode_page(response))
             
             current_season = self.extract_season_number(season_url)
             if current_season is None:
                 return []
             
             episodes = []
-            for link in soup.find_all('a', href=True):
-                href = link['href']
+            for href in hrefs:
                 if 'episode' not in href.lower():
                     continue
                 
@@ -233,7 +193,7 @@ class StreamVaultExtractor:
             try:
                 response = self.session.get(episode_url, timeout=15)
                 response.raise_for_status()
-                return self.extract_video_source(response.text)
+                return self.extract_video_source(decode_page(response))
             except Exception as e:
                 if attempt < retries - 1:
                     time.sleep(2)
@@ -246,11 +206,10 @@ class StreamVaultExtractor:
         try:
             response = self.session.get(show_url, timeout=15)
             response.raise_for_status()
-            soup = BeautifulSoup(response.content, 'html.parser')
+            hrefs = extract_hrefs(decode_page(response))
             
             seasons = []
-            for link in soup.find_all('a', href=True):
-                href = link['href']
+            for href in hrefs:
                 if re.search(r'season[s]?-\d+', href.lower()) and 'episode' not in href.lower():
                     full_url = urljoin(self.base_url, href)
                     seasons.append(full_url)
@@ -262,7 +221,7 @@ class StreamVaultExtractor:
             print(f"❌ Error fetching show: {e}")
             return []
     
-    def extract_show(self, show_url, show_name, delay=1):
+    def extract_show(self, show_url, show_name, delay=1, category=None):
         """Extract all episodes from a show"""
         print(f"\n🎬 Extracting: {show_name}")
         
@@ -293,8 +252,11 @@ class StreamVaultExtractor:
                         'url': ep_url,
                         'video': video
                     })
+                    self.dead_letters.resolve('missing_shows', ep_url)
                     print(f"    ✓ Episode {ep_num}")
                 else:
+                    self.dead_letters.add('missing_shows', ep_url, 'no_video_source', category, show_name,
+                                          f"Season {season_num}", season_url, ep_num)
                     print(f"    ✗ Episode {ep_num}")
                 
                 time.sleep(delay)
@@ -314,11 +276,10 @@ class StreamVaultExtractor:
             try:
                 response = self.session.get(page_url, timeout=15)
                 response.raise_for_status()
-                soup = BeautifulSoup(response.content, 'html.parser')
+                hrefs = extract_hrefs(decode_page(response))
                 
                 page_shows = []
-                for link in soup.find_all('a', href=True):
-                    href = link['href']
+                for href in hrefs:
                     if (re.search(r'/[^/]+-online-[^/]+/?$', href) and 
                         'seasons-' not in href.lower() and 'episode' not in href.lower()):
                         full_url = urljoin(self.base_url, href)
@@ -355,15 +316,9 @@ class StreamVaultExtractor:
     
     def extract_missing_shows(self, delay=1):
         """Main extraction - only shows NOT in StreamVault"""
-        categories = {
-            "English Seasons": "https://www.worthcrete.com/literature/seasons/english-seasons/",
-            "Hindi Seasons": "https://www.worthcrete.com/literature/seasons/hindi-seasons/",
-            "Hindi Dubbed Seasons": "https://www.worthcrete.com/literature/seasons/hindi-dubbed-seasons/"
-        }
-        
         results = self.checkpoint.get('results', {})
         
-        for cat_name, cat_url in categories.items():
+        for cat_name, cat_url in CATEGORIES.items():
             print(f"\n{'='*80}")
             print(f"🌐 CATEGORY: {cat_name}")
             print(f"{'='*80}")
@@ -387,7 +342,7 @@ class StreamVaultExtractor:
                     print("  ⏭️  Already extracted")
                     continue
                 
-                show_data = self.extract_show(show['url'], show['name'], delay)
+                show_data = self.extract_show(show['url'], show['name'], delay, cat_name)
                 if show_data:
                     results[cat_name][show['name']] = {
                         'url': show['url'],
@@ -448,58 +403,61 @@ def main():
     
     choice = input("\nEnter choice (1/2): ").strip()
     
-    extractor = StreamVaultExtractor()
-    
     if choice == "1":
-        # Dry run - just show which shows are missing/already added
-        categories = {
-            "English Seasons": "https://www.worthcrete.com/literature/seasons/english-seasons/",
-            "Hindi Seasons": "https://www.worthcrete.com/literature/seasons/hindi-seasons/",
-            "Hindi Dubbed Seasons": "https://www.worthcrete.com/literature/seasons/hindi-dubbed-seasons/"
-        }
+        dry_run()
+    elif choice == "2":
+        extract_missing(delay=1)
+    else:
+        print("❌ Invalid choice!")
+
+
+def dry_run(extractor=None):
+    """Show which shows are missing/already added (no extraction)"""
+    extractor = extractor or StreamVaultExtractor()
+    
+    for cat_name, cat_url in CATEGORIES.items():
+        print(f"\n{'='*80}")
+        print(f"🌐 CATEGORY: {cat_name}")
+        print(f"{'='*80}")
         
-        for cat_name, cat_url in categories.items():
-            print(f"\n{'='*80}")
-            print(f"🌐 CATEGORY: {cat_name}")
-            print(f"{'='*80}")
-            
-            shows = extractor.get_shows_from_category(cat_url)
-            
-            # Separate into found and missing
-            in_streamvault = []
-            not_in_streamvault = []
-            
-            for show in shows:
-                if extractor.is_show_in_streamvault(show['name']):
-                    in_streamvault.append(show['name'])
-                else:
-                    not_in_streamvault.append(show['name'])
-            
-            print(f"\n✅ Already in StreamVault ({len(in_streamvault)}):")
-            for name in sorted(in_streamvault)[:20]:  # Show first 20
-                print(f"   • {name}")
-            if len(in_streamvault) > 20:
-                print(f"   ... and {len(in_streamvault) - 20} more")
-            
-            print(f"\n❌ NOT in StreamVault ({len(not_in_streamvault)}) - Would be extracted:")
-            for name in sorted(not_in_streamvault):
-                print(f"   • {name}")
+        shows = extractor.get_shows_from_category(cat_url)
         
-        print("\n" + "="*80)
-        print("✅ DRY RUN COMPLETE - No extraction performed")
-        print("="*80)
+        # Separate into found and missing
+        in_streamvault = []
+        not_in_streamvault = []
         
-    elif choice == "2":
-        results = extractor.extract_missing_shows(delay=1)
-        extractor.print_summary(results)
+        for show in shows:
+            if extractor.is_show_in_streamvault(show['name']):
+                in_streamvault.append(show['name'])
+            else:
+                not_in_streamvault.append(show['name'])
         
-        print("\n" + "="*80)
-        print("✅ Extraction complete!")
-        print(f"📝 Results: {extractor.output_file}")
-        print("="*80)
-    else:
-        print("❌ Invalid choice!")
+        print(f"\n✅ Already in StreamVault ({len(in_streamvault)}):")
+        for name in sorted(in_streamvault)[:20]:  # Show first 20
+            print(f"   • {name}")
+        if len(in_streamvault) > 20:
+            print(f"   ... and {len(in_streamvault) - 20} more")
+        
+        print(f"\n❌ NOT in StreamVault ({len(not_in_streamvault)}) - Would be extracted:")
+        for name in sorted(not_in_streamvault):
+            print(f"   • {name}")
+    
+    print("\n" + "="*80)
+    print("✅ DRY RUN COMPLETE - No extraction performed")
+    print("="*80)
+
 
+def extract_missing(delay=1, extractor=None):
+    """Extract every show not yet in StreamVault (no prompts)"""
+    extractor = extractor or StreamVaultExtractor()
+    results = extractor.extract_missing_shows(delay=delay)
+    extractor.print_summary(results)
+    
+    print("\n" + "="*80)
+    print("✅ Extraction complete!")
+    print(f"📝 Results: {extractor.output_file}")
+    print("="*80)
+    return results
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,272 @@
+"""
+HLS manifest resolver
+
+Looks inside .m3u8 sources: fetches master playlists concurrently, parses
+their variants (bandwidth, resolution, codecs), fetches the media playlist
+of the chosen variant and reads its segment count and total duration.
+
+The chosen ("best") variant is the cheapest one that still looks good: the
+lowest-bandwidth variant at least `min_height` lines tall, or the tallest
+variant when none is. Parsed manifests are cached in a JSON file for
+`ttl` seconds, since manifest URLs are often signed and expire.
+
+Resolved info, stored under 'hls' on a video_source / video link:
+
+    {'variants': [{'uri', 'bandwidth', 'resolution', 'height', 'codecs'}, ...],
+     'best_variant': {...} or None, 'duration': seconds, 'segments': n,
+     'target_duration': seconds}
+
+Usage (fill in real durations of HLS episodes in a bulk-import file):
+    python hls_resolver.py bulk-imports/show.json
+"""
+
+import argparse
+import json
+import math
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urljoin
+
+import requests
+
+
+ATTRIBUTE_PATTERN = re.compile(r'([A-Z0-9-]+)=("[^"]*"|[^,]*)')
+
+# Minutes used by the bulk imports when a source has no known duration
+DEFAULT_DURATION_MINUTES = 45
+
+
+def is_hls_url(url):
+    return bool(url) and '.m3u8' in url.lower()
+
+
+def parse_attributes(line):
+    """Attribute list of an #EXT-X tag as a dict of strings"""
+    attributes = {}
+    for name, value in ATTRIBUTE_PATTERN.findall(line.split(':', 1)[1] if ':' in line else ''):
+        attributes[name] = value.strip('"')
+    return attributes
+
+
+def parse_master_playlist(text, base_url):
+    """Variants of a master playlist, lowest bandwidth first"""
+    variants = []
+    stream_inf = None
+    for line in text.splitlines():
+        line = line.strip()
+        if line.startswith('#EXT-X-STREAM-INF'):
+            stream_inf = parse_attributes(line)
+        elif line and not line.startswith('#') and stream_inf is not None:
+            resolution = stream_inf.get('RESOLUTION')
+            height = None
+            if resolution and 'x' in resolution.lower():
+                try:
+                    height = int(resolution.lower().split('x')[1])
+                except ValueError:
+                    height = None
+            try:
+                bandwidth = int(stream_inf.get('BANDWIDTH', 0))
+            except ValueError:
+                bandwidth = 0
+            variants.append({
+                'uri': urljoin(base_url, line),
+                'bandwidth': bandwidth,
+                'resolution': resolution,
+                'height': height,
+                'codecs': stream_inf.get('CODECS')
+            })
+            stream_inf = None
+
+    variants.sort(key=lambda v: v['bandwidth'])
+    return variants
+
+
+def parse_media_playlist(text):
+    """(total duration in seconds, segment count, target duration) of a media playlist"""
+    duration = 0.0
+    segments = 0
+    target_duration = None
+    for line in text.splitlines():
+        line = line.strip()
+        if line.startswith('#EXTINF:'):
+            try:
+                duration += float(line[len('#EXTINF:'):].split(',', 1)[0])
+            except ValueError:
+                pass
+            segments += 1
+        elif line.startswith('#EXT-X-TARGETDURATION:'):
+            try:
+                target_duration = int(line.split(':', 1)[1])
+            except ValueError:
+                pass
+    return round(duration, 3), segments, target_duration
+
+
+def choose_variant(variants, min_height=720):
+    """Cheapest variant at least min_height tall, else the tallest one"""
+    if not variants:
+        return None
+    good = [v for v in variants if v['height'] and v['height'] >= min_height]
+    if good:
+        return min(good, key=lambda v: v['bandwidth'])
+    return max(variants, key=lambda v: (v['height'] or 0, v['bandwidth']))
+
+
+def duration_minutes(info, default=DEFAULT_DURATION_MINUTES):
+    """Duration for the bulk imports, in whole minutes"""
+    if not info or not info.get('duration'):
+        return default
+    return max(1, int(math.ceil(info['duration'] / 60)))
+
+
+class HLSResolver:
+    def __init__(self, session=None, cache_file="hls_cache.json", ttl=6 * 3600, min_height=720,
+                 workers=8, timeout=15):
+        if session is None:
+            session = requests.Session()
+            session.headers.update({
+                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+            })
+        self.session = session
+        self.cache_file = cache_file
+        self.ttl = ttl
+        self.min_height = min_height
+        self.workers = workers
+        self.timeout = timeout
+        self.lock = threading.Lock()
+        self.dirty = False
+        self.load_cache()
+
+    def load_cache(self):
+        """Load parsed manifests from JSON file"""
+        self.cache = {}
+        if self.cache_file and os.path.exists(self.cache_file):
+            try:
+                with open(self.cache_file, 'r', encoding='utf-8') as f:
+                    self.cache = json.load(f)
+            except Exception as e:
+                print(f"⚠️  Error loading HLS cache: {e}. Starting fresh.")
+
+    def save_cache(self):
+        """Save parsed manifests to JSON file, dropping expired entries"""
+        if not self.cache_file or not self.dirty:
+            return
+        now = time.time()
+        with self.lock:
+            live = {url: entry for url, entry in self.cache.items() if now - entry['fetched_at'] < self.ttl}
+        try:
+            with open(self.cache_file, 'w', encoding='utf-8') as f:
+                json.dump(live, f, indent=2, ensure_ascii=False)
+            self.dirty = False
+        except Exception as e:
+            print(f"❌ Error saving HLS cache: {e}")
+
+    def fetch_text(self, url):
+        response = self.session.get(url, timeout=self.timeout)
+        response.raise_for_status()
+        return response.text
+
+    def resolve(self, url):
+        """Parsed info for one .m3u8 URL, or None if it can't be fetched"""
+        with self.lock:
+            entry = self.cache.get(url)
+            if entry and time.time() - entry['fetched_at'] < self.ttl:
+                return entry['info']
+
+        try:
+            text = self.fetch_text(url)
+            variants = parse_master_playlist(text, url)
+            best = choose_variant(variants, self.min_height)
+            # A master playlist points at media playlists; a media playlist is used as is
+            media_text = self.fetch_text(best['uri']) if best else text
+            duration, segments, target_duration = parse_media_playlist(media_text)
+        except (requests.exceptions.RequestException, KeyError) as e:
+            print(f"⚠️  HLS manifest unavailable: {str(e)[:50]}")
+            return None
+
+        info = {
+            'variants': variants,
+            'best_variant': best,
+            'duration': duration,
+            'segments': segments,
+            'target_duration': target_duration
+        }
+        with self.lock:
+            self.cache[url] = {'fetched_at': time.time(), 'info': info}
+            self.dirty = True
+        return info
+
+    def resolve_many(self, urls):
+        """Resolve several manifests concurrently: {url: info or None}"""
+        urls = list(dict.fromkeys(urls))
+        if not urls:
+            return {}
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            return dict(zip(urls, pool.map(self.resolve, urls)))
+
+    def annotate_episodes(self, episodes):
+        """Attach 'hls' info to the HLS sources of a season result list
+
+        Handles both video_source episodes (universalv6) and video_links
+        episodes (non-Drive extractor). Returns the number of sources
+        annotated.
+        """
+        targets = []
+        for episode in episodes:
+            source = episode.get('video_source')
+            if source and is_hls_url(source.get('direct_link')):
+                targets.append((source, source['direct_link']))
+            for link in episode.get('video_links') or []:
+                if is_hls_url(link.get('url')):
+                    targets.append((link, link['url']))
+
+        resolved = self.resolve_many(url for _, url in targets)
+        annotated = 0
+        for target, url in targets:
+            if resolved.get(url):
+                target['hls'] = resolved[url]
+                annotated += 1
+
+        self.save_cache()
+        return annotated
+
+    def update_bulk_import(self, path):
+        """Replace the placeholder duration of HLS episodes in a bulk-import file"""
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+
+        episodes = [ep for ep in data.get('episodes', []) if is_hls_url(ep.get('videoUrl'))]
+        resolved = self.resolve_many(ep['videoUrl'] for ep in episodes)
+        updated = 0
+        for episode in episodes:
+            info = resolved.get(episode['videoUrl'])
+            if info and info.get('duration'):
+                episode['duration'] = duration_minutes(info)
+                updated += 1
+
+        if updated:
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, indent=2, ensure_ascii=False)
+        self.save_cache()
+        return updated
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fill in real durations of HLS episodes in bulk-import files")
+    parser.add_argument('paths', nargs='+', metavar='bulk-import.json', help="bulk-import file(s) to update in place")
+    parser.add_argument('--cache', default="hls_cache.json", help="manifest cache file")
+    parser.add_argument('--min-height', type=int, default=720, help="lowest variant height chosen as best")
+    parser.add_argument('--workers', type=int, default=8, help="manifests fetched concurrently")
+    args = parser.parse_args(argv)
+
+    resolver = HLSResolver(cache_file=args.cache, min_height=args.min_height, workers=args.workers)
+    for path in args.paths:
+        updated = resolver.update_bulk_import(path)
+        print(f"✅ {path}: {updated} episode duration(s) updated")
+
+
+if __name__ == "__main__":
+    main()
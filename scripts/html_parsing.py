@@ -0,0 +1,207 @@
+"""
+Partial HTML parsing for WorthCrete pages
+
+The extractors only ever look at a handful of tags: <a href> on listing,
+show and season pages, and <iframe>/<video>/<source> on episode pages.
+These helpers build only those elements instead of the full WordPress page
+tree, and hand back plain values to the callers.
+
+Parsing goes through a pluggable backend. The C-accelerated ones are used
+when installed, in this order:
+- selectolax (pip install selectolax)
+- lxml (pip install lxml)
+- BeautifulSoup with html.parser and SoupStrainer (always available)
+
+Set STREAMVAULT_HTML_PARSER=selectolax|lxml|html.parser to force one.
+"""
+
+import os
+import re
+
+from bs4 import BeautifulSoup, SoupStrainer
+
+
+# WorthCrete is WordPress and always serves UTF-8, even when the
+# Content-Type header leaves the charset out
+SITE_ENCODING = 'utf-8'
+
+CHARSET_PATTERN = re.compile(r'charset=["\']?([\w.:-]+)', re.I)
+
+
+def response_encoding(response, site_encoding=SITE_ENCODING):
+    """Charset declared in the Content-Type header, or the site encoding"""
+    match = CHARSET_PATTERN.search(response.headers.get('Content-Type', ''))
+    return match.group(1) if match else site_encoding
+
+
+def decode_content(content, encoding=SITE_ENCODING, site_encoding=SITE_ENCODING):
+    """Decode raw page bytes with a known encoding"""
+    try:
+        return content.decode(encoding, errors='replace')
+    except LookupError:
+        return content.decode(site_encoding, errors='replace')
+
+
+def decode_page(response, site_encoding=SITE_ENCODING):
+    """Decode a response body once, without charset sniffing
+
+    Uses the charset declared in the Content-Type header, or the known
+    site encoding when the server leaves it out. Avoids response.text,
+    which runs charset detection over the whole body in that case.
+    """
+    return decode_content(response.content, response_encoding(response, site_encoding), site_encoding)
+
+
+class SoupBackend:
+    """Pure-Python fallback: BeautifulSoup + html.parser, strained"""
+
+    name = 'html.parser'
+
+    link_tags = SoupStrainer('a', href=True)
+    # <source> elements are kept as children of the <video> they belong to
+    media_tags = SoupStrainer(['iframe', 'video'])
+
+    def extract_hrefs(self, content):
+        soup = BeautifulSoup(content, 'html.parser', parse_only=self.link_tags)
+        return [link['href'] for link in soup.find_all('a', href=True)]
+
+    def extract_media(self, content):
+        soup = BeautifulSoup(content, 'html.parser', parse_only=self.media_tags)
+
+        iframes = [iframe['src'] for iframe in soup.find_all('iframe', src=True)]
+
+        video_src = None
+        video = soup.find('video')
+        if video:
+            video_src = video.get('src')
+            if not video_src:
+                source = video.find('source')
+                if source:
+                    video_src = source.get('src')
+
+        return {'iframes': iframes, 'video_src': video_src}
+
+
+class LxmlBackend:
+    """libxml2 HTML parser via lxml"""
+
+    name = 'lxml'
+
+    def __init__(self):
+        from lxml import etree
+        self.etree = etree
+        self.parser = etree.HTMLParser(recover=True, remove_comments=True)
+
+    def _parse(self, content):
+        if not content or not content.strip():
+            return None
+        try:
+            return self.etree.fromstring(content, self.parser)
+        except ValueError:
+            # Text that still carries an XML encoding declaration
+            return self.etree.fromstring(content.encode('utf-8'), self.parser)
+
+    def extract_hrefs(self, content):
+        root = self._parse(content)
+        if root is None:
+            return []
+        return [link.get('href') for link in root.iter('a') if link.get('href') is not None]
+
+    def extract_media(self, content):
+        root = self._parse(content)
+        if root is None:
+            return {'iframes': [], 'video_src': None}
+
+        iframes = [iframe.get('src') for iframe in root.iter('iframe') if iframe.get('src') is not None]
+
+        video_src = None
+        video = next(root.iter('video'), None)
+        if video is not None:
+            video_src = video.get('src')
+            if not video_src:
+                source = next(video.iter('source'), None)
+                if source is not None:
+                    video_src = source.get('src')
+
+        return {'iframes': iframes, 'video_src': video_src}
+
+
+class SelectolaxBackend:
+    """Lexbor HTML parser via selectolax"""
+
+    name = 'selectolax'
+
+    def __init__(self):
+        from selectolax.lexbor import LexborHTMLParser
+        self.HTMLParser = LexborHTMLParser
+
+    def extract_hrefs(self, content):
+        tree = self.HTMLParser(content)
+        return [node.attributes['href'] for node in tree.css('a[href]')
+                if node.attributes.get('href') is not None]
+
+    def extract_media(self, content):
+        tree = self.HTMLParser(content)
+
+        iframes = [node.attributes['src'] for node in tree.css('iframe[src]')
+                   if node.attributes.get('src') is not None]
+
+        video_src = None
+        video = tree.css_first('video')
+        if video is not None:
+            video_src = video.attributes.get('src')
+            if not video_src:
+                source = video.css_first('source')
+                if source is not None:
+                    video_src = source.attributes.get('src')
+
+        return {'iframes': iframes, 'video_src': video_src}
+
+
+BACKENDS = {
+    'selectolax': SelectolaxBackend,
+    'lxml': LxmlBackend,
+    'html.parser': SoupBackend,
+}
+
+_backend = None
+
+
+def get_backend(name=None):
+    """Return the requested backend, or the fastest one that is installed"""
+    if name:
+        return BACKENDS[name]()
+    for backend_class in BACKENDS.values():
+        try:
+            return backend_class()
+        except ImportError:
+            continue
+    return SoupBackend()
+
+
+def set_backend(name=None):
+    """Switch the backend used by the module-level helpers"""
+    global _backend
+    _backend = get_backend(name)
+    return _backend
+
+
+def current_backend():
+    if _backend is None:
+        set_backend(os.getenv('STREAMVAULT_HTML_PARSER') or None)
+    return _backend
+
+
+def extract_hrefs(content):
+    """Return the href of every <a href> in the page, in document order"""
+    return current_backend().extract_hrefs(content)
+
+
+def extract_media(content):
+    """Return iframe sources and the first <video> source of a page
+
+    Result: {'iframes': [src, ...], 'video_src': str or None}
+    where video_src is the src of the first <video>, or of its first
+    <source> child when the tag has no src of its own.
+    """
+    return current_backend().extract_media(content)
@@ -0,0 +1,285 @@
+"""
+Local HTTP job API for on-demand show extraction
+
+Accepts extraction jobs over HTTP, runs them on a worker pool and returns
+the result in the bulk-import JSON shape, also written to
+bulk-imports/<showSlug>.json so it can be passed straight to
+/api/admin/import-shows-episodes.
+
+    POST /jobs               {"slug": "money-heist", "seasons": [1, 2]}
+                             {"show_url": "https://www.worthcrete.com/...", "slug": "berlin", "episodes": [3]}
+                             optional: "category", "force" (re-fetch stored episodes)
+                             -> 202 {"id", "status", ...} (200 with "duplicate": true for a known job)
+    GET  /jobs               all jobs
+    GET  /jobs/<id>          status and progress
+    GET  /jobs/<id>/result   bulk-import JSON (409 until the job is done)
+    GET  /health
+
+A job identical to one that is queued, running or finished within the last
+--dedup-minutes returns that job instead of starting another. Episodes
+already in the state store are not fetched again unless "force" is set.
+
+Shows are looked up by slug in the show index (see reextract_show.py); a
+show_url skips the lookup, but one that is not in the index needs a
+"category". The server listens on localhost only by default.
+
+Usage:
+    python job_api.py --port 8765 --workers 2
+    curl -X POST localhost:8765/jobs -d '{"slug": "money-heist", "seasons": [1]}'
+"""
+
+import argparse
+import json
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from bulk_import import save_bulk_import, slug_from_url, to_bulk_import
+from reextract_show import ShowReextractor
+from rule_stats import RuleStats
+from universalv6 import WorthCreteExtractor
+
+
+class JobManager:
+    def __init__(self, workers=2, delay=1, output_dir="bulk-imports", dedup_seconds=600):
+        self.workers = workers
+        self.delay = delay
+        self.output_dir = output_dir
+        self.dedup_seconds = dedup_seconds
+        self.lock = threading.Lock()
+        self.jobs = {}
+        # job key -> id of the latest job with that key
+        self.by_key = {}
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="job")
+        # One extractor per worker thread (sessions and parse pools aren't shared),
+        # all counting into one RuleStats so there is a single writer of its file
+        self.local = threading.local()
+        self.extractors = []
+        self.rule_stats = RuleStats("extraction_rule_stats.json")
+
+    def extractor(self):
+        if not hasattr(self.local, 'extractor'):
+            self.local.extractor = WorthCreteExtractor(parse_workers=0)
+            self.local.extractor.rule_stats = self.rule_stats
+            with self.lock:
+                self.extractors.append(self.local.extractor)
+        return self.local.extractor
+
+    @staticmethod
+    def validate(request):
+        """Normalized job request, or raise ValueError"""
+        if not isinstance(request, dict):
+            raise ValueError("expected a JSON object")
+        slug = (request.get('slug') or '').strip().lower()
+        show_url = (request.get('show_url') or '').strip()
+        if not slug and not show_url:
+            raise ValueError("'slug' or 'show_url' is required")
+        if show_url and not show_url.startswith('http'):
+            raise ValueError("'show_url' must be an http(s) URL")
+
+        numbers = {}
+        for field in ('seasons', 'episodes'):
+            value = request.get(field)
+            if value is None:
+                numbers[field] = None
+            elif isinstance(value, list) and all(isinstance(n, int) and n > 0 for n in value):
+                numbers[field] = sorted(set(value)) or None
+            else:
+                raise ValueError(f"'{field}' must be a list of positive integers")
+
+        return {
+            'slug': slug or None,
+            'show_url': show_url or None,
+            'category': request.get('category'),
+            'seasons': numbers['seasons'],
+            'episodes': numbers['episodes'],
+            'force': bool(request.get('force')),
+        }
+
+    @staticmethod
+    def job_key(request):
+        show = (request['show_url'] or '').rstrip('/').lower() or request['slug']
+        return json.dumps([show, request['category'], request['seasons'], request['episodes'], request['force']])
+
+    def submit(self, request):
+        """(job, duplicate) for a validated request"""
+        key = self.job_key(request)
+        now = time.time()
+        with self.lock:
+            existing = self.jobs.get(self.by_key.get(key))
+            if existing and (existing['status'] in ('queued', 'running') or
+                             (existing['status'] == 'done' and now - existing['finished_at'] < self.dedup_seconds)):
+                return existing, True
+
+            job = {
+                'id': uuid.uuid4().hex[:12],
+                'request': request,
+                'status': 'queued',
+                'created_at': now,
+                'started_at': None,
+                'finished_at': None,
+                'show': None,
+                'progress': {'seasons_total': None, 'seasons_done': 0, 'episodes': 0},
+                'error': None,
+                'file': None,
+                'result': None,
+            }
+            self.jobs[job['id']] = job
+            self.by_key[key] = job['id']
+
+        self.pool.submit(self.run, job)
+        return job, False
+
+    def resolve_show(self, extractor, request):
+        """Index entry ({'slug', 'category', 'show_name', 'show_url'}) of the job's show"""
+        if request['show_url']:
+            show = extractor.state.find_show_by_url(request['show_url'])
+            if show is None:
+                # Stored episodes are keyed by category, so a guessed one would file them wrongly
+                if not request['category']:
+                    raise LookupError(f"'{request['show_url']}' is not in the show index, pass its 'category'")
+                show = {
+                    'category': request['category'],
+                    'show_name': request['show_url'].rstrip('/').split('/')[-1],
+                    'show_url': request['show_url'],
+                }
+            return dict(show, slug=request['slug'] or slug_from_url(request['show_url']))
+
+        show = ShowReextractor(extractor).resolve(request['slug'], request['category'])
+        if show is None:
+            raise LookupError(f"no show found for '{request['slug']}'")
+        # The requested slug is the StreamVault one; the index slug comes from the WorthCrete name
+        return dict(show, slug=request['slug'])
+
+    def run(self, job):
+        request = job['request']
+        job['status'] = 'running'
+        job['started_at'] = time.time()
+        try:
+            extractor = self.extractor()
+            show = self.resolve_show(extractor, request)
+            job['show'] = show
+
+            season_links = extractor.get_season_links_from_show_page(show['show_url'])
+            selected = [(num, url) for num, url in enumerate(season_links, 1)
+                        if not request['seasons'] or num in request['seasons']]
+            if not selected:
+                raise LookupError(f"show has {len(season_links)} season(s), none of {request['seasons']} found")
+            job['progress']['seasons_total'] = len(selected)
+
+            seasons = {}
+            for season_num, season_url in selected:
+                seasons[season_num] = extractor.extract_season(
+                    season_url, self.delay, show['category'], show['show_name'], f"Season {season_num}",
+                    resume=not request['force'], only_episodes=request['episodes'], refresh=True
+                )
+                job['progress']['seasons_done'] += 1
+                job['progress']['episodes'] += len(seasons[season_num])
+
+            result = to_bulk_import(show['slug'], seasons)
+            job['file'] = save_bulk_import(result, self.output_dir)
+            job['result'] = result
+            job['status'] = 'done'
+            print(f"✅ Job {job['id']}: {show['show_name']} -> {job['file']} ({len(result['episodes'])} episodes)")
+        except Exception as e:
+            job['status'] = 'failed'
+            job['error'] = str(e)
+            print(f"❌ Job {job['id']}: {e}")
+        finally:
+            job['finished_at'] = time.time()
+
+    def status(self, job):
+        """A job without its result payload"""
+        return {key: value for key, value in job.items() if key != 'result'}
+
+    def list(self):
+        with self.lock:
+            jobs = list(self.jobs.values())
+        return [self.status(job) for job in sorted(jobs, key=lambda job: job['created_at'], reverse=True)]
+
+    def close(self):
+        self.pool.shutdown(wait=True)
+        self.rule_stats.save()
+        for extractor in self.extractors:
+            extractor.parse_pool.close()
+
+
+class JobAPIHandler(BaseHTTPRequestHandler):
+    # Set by serve()
+    manager = None
+
+    def send_json(self, status, data):
+        body = json.dumps(data, indent=2, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        parts = [part for part in self.path.split('?')[0].split('/') if part]
+
+        if parts == ['health']:
+            return self.send_json(200, {'ok': True})
+        if parts == ['jobs']:
+            return self.send_json(200, self.manager.list())
+        if len(parts) in (2, 3) and parts[0] == 'jobs':
+            job = self.manager.jobs.get(parts[1])
+            if job is None:
+                return self.send_json(404, {'error': f"unknown job {parts[1]}"})
+            if len(parts) == 2:
+                return self.send_json(200, self.manager.status(job))
+            if parts[2] == 'result':
+                if job['status'] != 'done':
+                    return self.send_json(409, {'error': f"job is {job['status']}", 'status': job['status']})
+                return self.send_json(200, job['result'])
+        self.send_json(404, {'error': "not found"})
+
+    def do_POST(self):
+        if self.path.split('?')[0].rstrip('/') != '/jobs':
+            return self.send_json(404, {'error': "not found"})
+        try:
+            length = int(self.headers.get('Content-Length') or 0)
+            request = self.manager.validate(json.loads(self.rfile.read(length) or b'{}'))
+        except (ValueError, json.JSONDecodeError) as e:
+            return self.send_json(400, {'error': str(e)})
+
+        job, duplicate = self.manager.submit(request)
+        self.send_json(200 if duplicate else 202, dict(self.manager.status(job), duplicate=duplicate))
+
+    def log_message(self, format, *args):
+        print(f"🌐 {self.address_string()} {format % args}")
+
+
+def serve(manager, host="127.0.0.1", port=8765):
+    JobAPIHandler.manager = manager
+    server = ThreadingHTTPServer((host, port), JobAPIHandler)
+    print(f"🚀 Job API listening on http://{host}:{port} ({manager.workers} worker(s))")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n🛑 Shutting down (waiting for running jobs)...")
+    finally:
+        server.server_close()
+        manager.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Local HTTP API for on-demand show extraction jobs")
+    parser.add_argument('--host', default="127.0.0.1", help="address to listen on")
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--workers', type=int, default=2, help="jobs run at the same time")
+    parser.add_argument('--delay', type=float, default=1, help="seconds between episode requests")
+    parser.add_argument('--output-dir', default="bulk-imports", help="where bulk-import files are written")
+    parser.add_argument('--dedup-minutes', type=float, default=10,
+                        help="return a finished identical job instead of re-running it within this window")
+    args = parser.parse_args(argv)
+
+    manager = JobManager(args.workers, args.delay, args.output_dir, args.dedup_minutes * 60)
+    serve(manager, args.host, args.port)
+
+
+if __name__ == "__main__":
+    main()
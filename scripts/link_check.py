@@ -0,0 +1,382 @@
+"""
+Bulk liveness check of extracted media links
+
+Checks the direct_link / video_links[].url sources in extraction results
+before they become bulk imports or catalog patches. Every distinct source
+(link_store.canonical_link) is requested once however many episodes use
+it: a HEAD first and, when HEAD fails or is refused (many media hosts
+answer HEAD with 403 or 405), a GET of the first byte only
+(Range: bytes=0-0), so no video is downloaded. A 404/410 answer to HEAD
+is taken as final.
+
+Requests run on asyncio, at most `concurrency` at a time and at most
+`per_host` per host, so one slow host neither holds up the others nor gets
+hammered. aiohttp is used when it is installed; otherwise each request is
+a requests call on a worker thread.
+
+Result per canonical link:
+
+    {"url", "ok", "status", "method": "HEAD" | "GET", "content_length",
+     "content_type", "accept_ranges", "final_url", "error", "elapsed", "checked_at"}
+
+ok is True for a final status below 400, False for a 4xx/5xx answer (a
+404/410 to HEAD, or an error status to both requests) and None when the
+host could not be reached (timeouts, DNS or connection errors), which
+says nothing about the link itself.
+
+--prune writes each input result without its broken sources
+(<name>.live.json, or <name>.live.ndjson for a stream): dead video_links
+are dropped from non-Drive episodes, and episodes left without a working
+source are dropped.
+
+Usage:
+    python link_check.py english-seasons_non_drive_category.json all_categories_links.json \\
+        --output link_health.json --per-host 4 --prune
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from urllib.parse import urlsplit
+
+import requests
+
+from link_store import LinkIndex, canonical_link
+from result_files import episode_links
+from video_extraction import BASE_URL
+
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+
+# A single byte is enough to tell a served file from a missing one
+RANGE_HEADERS = {'Range': 'bytes=0-0'}
+
+# HEAD answers that are final: the file is gone, a GET would say the same
+GONE_STATUSES = (404, 410)
+
+CONTENT_RANGE_PATTERN = re.compile(r'bytes\s+\d+-\d+/(\d+)')
+
+STREAM_SUFFIXES = ('.ndjson', '.ndjson.gz', '.ndjson.zst', '.jsonl')
+
+
+def _aiohttp():
+    try:
+        import aiohttp
+    except ImportError:
+        return None
+    return aiohttp
+
+
+class RequestsTransport:
+    """requests on worker threads, one session per thread"""
+
+    name = 'requests'
+    errors = (requests.exceptions.RequestException,)
+
+    def __init__(self, timeout, concurrency):
+        self.timeout = timeout
+        self.local = threading.local()
+        self.executor = ThreadPoolExecutor(concurrency)
+
+    def session(self):
+        if not hasattr(self.local, 'session'):
+            self.local.session = requests.Session()
+            self.local.session.headers.update({'User-Agent': USER_AGENT})
+        return self.local.session
+
+    def _request(self, method, url, headers):
+        # stream=True so only the headers are read, whatever the server sends
+        response = self.session().request(method, url, headers=headers, timeout=self.timeout,
+                                          allow_redirects=True, stream=True)
+        response.close()
+        return response.status_code, response.headers, response.url
+
+    async def request(self, method, url, headers=None):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, self._request, method, url, headers)
+
+    async def close(self):
+        self.executor.shutdown(wait=False)
+
+
+class AiohttpTransport:
+    """One aiohttp session for all requests"""
+
+    name = 'aiohttp'
+
+    def __init__(self, aiohttp, timeout, concurrency):
+        self.errors = (aiohttp.ClientError, asyncio.TimeoutError)
+        self.session = aiohttp.ClientSession(
+            headers={'User-Agent': USER_AGENT},
+            timeout=aiohttp.ClientTimeout(total=timeout),
+            connector=aiohttp.TCPConnector(limit=concurrency),
+        )
+
+    async def request(self, method, url, headers=None):
+        async with self.session.request(method, url, headers=headers, allow_redirects=True) as response:
+            return response.status, response.headers, str(response.url)
+
+    async def close(self):
+        await self.session.close()
+
+
+def make_transport(timeout=15, concurrency=32):
+    aiohttp = _aiohttp()
+    if aiohttp is not None:
+        return AiohttpTransport(aiohttp, timeout, concurrency)
+    return RequestsTransport(timeout, concurrency)
+
+
+def content_length(method, status, headers):
+    """Size of the whole file; a ranged answer's Content-Length is just the range"""
+    if method == 'GET' and status == 206:
+        match = CONTENT_RANGE_PATTERN.match(headers.get('Content-Range') or '')
+        return int(match.group(1)) if match else None
+    length = headers.get('Content-Length')
+    return int(length) if length and length.isdigit() else None
+
+
+def accepts_ranges(status, headers):
+    return status == 206 or 'bytes' in (headers.get('Accept-Ranges') or '').lower()
+
+
+class LinkChecker:
+    """Checks links with a global and a per-host concurrency limit"""
+
+    def __init__(self, transport, concurrency=32, per_host=4):
+        self.transport = transport
+        self.limit = asyncio.Semaphore(concurrency)
+        self.per_host = per_host
+        self.host_limits = {}
+
+    def host_limit(self, url):
+        host = (urlsplit(url).hostname or '').lower()
+        if host not in self.host_limits:
+            self.host_limits[host] = asyncio.Semaphore(self.per_host)
+        return self.host_limits[host]
+
+    async def check(self, url):
+        """Result dict of one link: HEAD, then a one-byte GET if HEAD did not succeed"""
+        result = {'url': url, 'ok': None, 'status': None, 'method': None, 'content_length': None,
+                  'content_type': None, 'accept_ranges': None, 'final_url': None, 'error': None}
+        async with self.host_limit(url), self.limit:
+            started = time.monotonic()
+            for method, headers in (('HEAD', None), ('GET', RANGE_HEADERS)):
+                try:
+                    status, response_headers, final_url = await self.transport.request(method, url, headers)
+                except self.transport.errors as e:
+                    # Keep an earlier HTTP answer over a network error
+                    if result['status'] is None:
+                        result['error'] = f"{type(e).__name__}: {e}"[:200]
+                    continue
+                result.update({
+                    'ok': status < 400,
+                    'status': status,
+                    'method': method,
+                    'content_length': content_length(method, status, response_headers),
+                    'content_type': (response_headers.get('Content-Type') or '').split(';')[0].strip() or None,
+                    'accept_ranges': accepts_ranges(status, response_headers),
+                    'final_url': final_url if final_url != url else None,
+                    'error': None,
+                })
+                if result['ok'] or status in GONE_STATUSES:
+                    break
+            result['elapsed'] = round(time.monotonic() - started, 3)
+        result['checked_at'] = datetime.now(timezone.utc).isoformat()
+        return result
+
+    async def check_all(self, links, progress_every=100):
+        """{key: result} for (key, url) pairs"""
+        results = {}
+
+        async def check_one(key, url):
+            results[key] = await self.check(url)
+            if progress_every and len(results) % progress_every == 0:
+                print(f"🔎 Checked {len(results)}/{len(links)} link(s)")
+
+        await asyncio.gather(*(check_one(key, url) for key, url in links))
+        return results
+
+
+async def check_links_async(links, concurrency=32, per_host=4, timeout=15, progress_every=100):
+    transport = make_transport(timeout, concurrency)
+    try:
+        return await LinkChecker(transport, concurrency, per_host).check_all(links, progress_every)
+    finally:
+        await transport.close()
+
+
+def check_links(links, concurrency=32, per_host=4, timeout=15, progress_every=100):
+    """{key: result} for (canonical key, url) pairs, checked on a new event loop"""
+    return asyncio.run(check_links_async(list(links), concurrency, per_host, timeout, progress_every))
+
+
+# Pruning
+
+def is_broken(result, include_errors=False):
+    if result is None:
+        return False
+    return result['ok'] is False or (include_errors and result['ok'] is None)
+
+
+def prune_episode(episode, broken):
+    """Episode without its broken sources, or None if it has no working one left"""
+    links = episode_links(episode)
+    # Relative links resolve against the episode page, as in the link index
+    base_url = episode.get('episode_url') or BASE_URL
+    kept = [link for link in links if canonical_link(link[1], base_url)[0] not in broken]
+    if len(kept) == len(links):
+        return episode
+    if not kept:
+        return None
+    kept_urls = {url for _, url in kept}
+    return dict(episode, video_links=[link for link in episode['video_links'] if link.get('url') in kept_urls])
+
+
+def prune_result(value, broken):
+    """(pruned copy of a nested result, episodes dropped, sources dropped)"""
+    if isinstance(value, list):
+        kept, dropped_episodes, dropped_links = [], 0, 0
+        for episode in value:
+            pruned = prune_episode(episode, broken)
+            if pruned is None:
+                dropped_episodes += 1
+                dropped_links += len(episode_links(episode))
+                continue
+            dropped_links += len(episode_links(episode)) - len(episode_links(pruned))
+            kept.append(pruned)
+        return kept, dropped_episodes, dropped_links
+    if not isinstance(value, dict):
+        return value, 0, 0
+
+    result, dropped_episodes, dropped_links = {}, 0, 0
+    for key, child in value.items():
+        pruned, episodes, links = prune_result(child, broken)
+        dropped_episodes += episodes
+        dropped_links += links
+        # Drop seasons/shows that only pruning emptied
+        if pruned or not child:
+            result[key] = pruned
+    return result, dropped_episodes, dropped_links
+
+
+def pruned_path(path):
+    for suffix in STREAM_SUFFIXES:
+        if path.endswith(suffix):
+            return f"{path[:-len(suffix)]}.live{suffix}"
+    return f"{os.path.splitext(path)[0]}.live.json"
+
+
+def prune_file(path, broken):
+    """Write a pruned copy of a result file; returns (output path, episodes dropped, sources dropped)"""
+    output = pruned_path(path)
+    tmp_path = f"{output}.tmp{os.path.splitext(output)[1]}"
+    dropped_episodes = dropped_links = 0
+
+    if path.endswith(STREAM_SUFFIXES):
+        from result_stream import NDJSONWriter, iter_records
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        with NDJSONWriter(tmp_path, flush_every=1000) as writer:
+            for record in iter_records(path):
+                pruned = prune_episode(record, broken)
+                if pruned is None:
+                    dropped_episodes += 1
+                    dropped_links += len(episode_links(record))
+                    continue
+                dropped_links += len(episode_links(record)) - len(episode_links(pruned))
+                writer.write(pruned)
+    else:
+        from result_diff import load_snapshot
+        data, dropped_episodes, dropped_links = prune_result(load_snapshot(path), broken)
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, output)
+    return output, dropped_episodes, dropped_links
+
+
+def summarize(results):
+    summary = {
+        'checked': len(results),
+        'alive': sum(1 for result in results.values() if result['ok'] is True),
+        'broken': sum(1 for result in results.values() if result['ok'] is False),
+        'unreachable': sum(1 for result in results.values() if result['ok'] is None),
+        'range_get': sum(1 for result in results.values() if result['method'] == 'GET'),
+        'accept_ranges': sum(1 for result in results.values() if result['accept_ranges']),
+        'by_status': {},
+    }
+    for result in results.values():
+        status = str(result['status'] or 'error')
+        summary['by_status'][status] = summary['by_status'].get(status, 0) + 1
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check that extracted media links still work")
+    parser.add_argument('files', nargs='*', help="result files (JSON, NDJSON stream or non-Drive TXT)")
+    parser.add_argument('--state', action='store_true', help="also check the links in extraction_state.sqlite")
+    parser.add_argument('--output', default="link_health.json", help="health report output")
+    parser.add_argument('--concurrency', type=int, default=32, help="requests in flight")
+    parser.add_argument('--per-host', type=int, default=4, help="requests in flight per host")
+    parser.add_argument('--timeout', type=float, default=15, help="seconds per request")
+    parser.add_argument('--prune', action='store_true', help="write <name>.live.json copies without broken sources")
+    parser.add_argument('--prune-unreachable', action='store_true',
+                        help="also prune sources whose host could not be reached")
+    args = parser.parse_args(argv)
+
+    index = LinkIndex()
+    for path in args.files:
+        if not os.path.exists(path):
+            print(f"❌ No such file: {path}")
+            return 1
+        index.add_file(path)
+    if args.state:
+        index.add_state(extractor="universal")
+        index.add_state(extractor="non_drive")
+
+    links = index.unique_links()
+    transport = 'aiohttp' if _aiohttp() else 'requests'
+    print(f"🔗 {len(links)} unique link(s) from {sum(len(e['references']) for e in index.links.values())} reference(s)"
+          f" ({transport}, {args.concurrency} at once, {args.per_host} per host)")
+    results = check_links(links, args.concurrency, args.per_host, args.timeout)
+
+    summary = summarize(results)
+    print(f"✅ Alive: {summary['alive']}  ❌ Broken: {summary['broken']}  ⚠️  Unreachable: {summary['unreachable']}"
+          f"  ({summary['range_get']} answered a range GET only)")
+    broken = {key for key, result in results.items() if is_broken(result, args.prune_unreachable)}
+    for key in sorted(broken)[:20]:
+        references = index.links[key]['references']
+        ref = references[0]
+        reason = results[key]['status'] or results[key]['error'].split(':')[0]
+        print(f"   {reason}: {ref['show']} {ref['season']} "
+              f"Episode {ref['episode']} ({len(references)} reference(s)) {results[key]['url']}")
+    if len(broken) > 20:
+        print(f"   ... and {len(broken) - 20} more")
+
+    report = {
+        'generatedAt': datetime.now(timezone.utc).isoformat(),
+        'files': args.files,
+        'transport': transport,
+        'summary': summary,
+        'links': results,
+    }
+    tmp_path = f"{args.output}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, args.output)
+    print(f"💾 Report saved to: {args.output}")
+
+    if args.prune:
+        for path in args.files:
+            output, episodes, dropped = prune_file(path, broken)
+            print(f"✂️  {path} -> {output}: {dropped} broken source(s), {episodes} episode(s) dropped")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,406 @@
+"""
+TTL-based revalidation of stored media links
+
+Keeps a health history per canonical link (link_store.canonical_link) in
+link_health.sqlite and gives every link its own next-check time, so each
+run only rechecks the links that are due instead of the whole catalog:
+
+- working links are rechecked after OK_TTL, doubled for every further
+  check that still finds them working (up to MAX_TTL), and scaled down by
+  their host's reliability: a host whose files keep disappearing (the
+  wp-content/uploads hosts) is checked more often than a stable one
+- broken links are rechecked after BROKEN_TTL, backing off the same way,
+  in case a file comes back
+- unreachable hosts (timeouts, DNS or connection errors) are retried
+  after UNREACHABLE_TTL, backing off up to a day; they say nothing about
+  the link and do not change it from working to broken
+
+Host reliability is a decayed share of successful checks on that host.
+The last HISTORY_LIMIT checks of every link are kept.
+
+Due links are checked in batches of bounded size with link_check.py (HEAD,
+then a one-byte range GET; limited in total and per host). A link that
+turns broken goes into a feed, with the episodes that use it; --feed
+appends the new entries to an NDJSON file for re-extraction and marks them
+exported. scheduler_daemon.py runs the same revalidation on the state
+store, queues newly broken episodes for redrive.py and marks their feed
+entries exported (appending them to its own --feed file when given).
+Exported entries are deleted after FEED_RETENTION.
+
+Usage:
+    python link_health.py english-seasons_non_drive_category.json --state --batch 500 --feed newly_broken.ndjson
+    python link_health.py --status
+"""
+
+import argparse
+import json
+import random
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+from urllib.parse import urlsplit
+
+from link_check import check_links
+from link_store import LinkIndex, is_placeholder
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS links (
+    key TEXT PRIMARY KEY,
+    url TEXT NOT NULL,
+    host TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'unknown',
+    http_status INTEGER,
+    streak INTEGER NOT NULL DEFAULT 0,
+    misses INTEGER NOT NULL DEFAULT 0,
+    first_seen REAL NOT NULL,
+    last_seen REAL NOT NULL,
+    last_checked REAL,
+    last_ok REAL,
+    broken_since REAL,
+    next_check REAL NOT NULL,
+    refs TEXT
+);
+CREATE INDEX IF NOT EXISTS links_due ON links (next_check);
+CREATE TABLE IF NOT EXISTS checks (
+    key TEXT NOT NULL,
+    checked_at REAL NOT NULL,
+    status TEXT NOT NULL,
+    http_status INTEGER,
+    method TEXT,
+    content_length INTEGER,
+    content_type TEXT,
+    elapsed REAL,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS checks_key ON checks (key, checked_at);
+CREATE TABLE IF NOT EXISTS hosts (
+    host TEXT PRIMARY KEY,
+    ok_weight REAL NOT NULL DEFAULT 0,
+    total_weight REAL NOT NULL DEFAULT 0,
+    checks INTEGER NOT NULL DEFAULT 0,
+    updated_at REAL
+);
+CREATE TABLE IF NOT EXISTS broken_feed (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    key TEXT NOT NULL,
+    url TEXT NOT NULL,
+    http_status INTEGER,
+    broken_at REAL NOT NULL,
+    refs TEXT,
+    exported_at REAL
+);
+"""
+
+# Seconds until the next check
+MIN_TTL = 3600
+OK_TTL = 3 * 86400
+BROKEN_TTL = 6 * 3600
+UNREACHABLE_TTL = 3600
+MAX_TTL = 30 * 86400
+MAX_UNREACHABLE_TTL = 86400
+
+# Weight of a host's earlier checks against its latest one
+HOST_DECAY = 0.9
+
+HISTORY_LIMIT = 20
+
+# Seconds an exported feed entry is kept
+FEED_RETENTION = 30 * 86400
+
+REF_KEYS = ('category', 'show', 'season', 'episode', 'episode_url')
+
+LINK_COLUMNS = ('key', 'url', 'host', 'status', 'http_status', 'streak', 'misses', 'first_seen', 'last_seen',
+                'last_checked', 'last_ok', 'broken_since', 'next_check', 'refs')
+
+
+def link_status(result):
+    """'ok', 'broken' or 'unreachable' of a link_check result"""
+    if result['ok'] is None:
+        return 'unreachable'
+    return 'ok' if result['ok'] else 'broken'
+
+
+def next_check_delay(status, streak, reliability):
+    """Seconds until a link is checked again, after `streak` checks in a row with this status"""
+    doublings = max(streak - 1, 0)
+    if status == 'ok':
+        delay = min(OK_TTL * 2 ** min(doublings, 4), MAX_TTL) * max(reliability, 0.1)
+    elif status == 'broken':
+        delay = min(BROKEN_TTL * 2 ** min(doublings, 7), MAX_TTL)
+    else:
+        delay = min(UNREACHABLE_TTL * 2 ** min(doublings, 5), MAX_UNREACHABLE_TTL)
+    # Spread links found together over time, so they don't all come due at once again
+    return max(delay * random.uniform(0.9, 1.1), MIN_TTL)
+
+
+def iso(timestamp):
+    return datetime.fromtimestamp(timestamp, timezone.utc).isoformat() if timestamp else None
+
+
+class LinkHealthStore:
+    def __init__(self, health_file="link_health.sqlite"):
+        self.health_file = health_file
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(health_file, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.executescript(SCHEMA)
+
+    def sync(self, index):
+        """Add the links of a LinkIndex (due at once when new) and refresh their references; returns new links"""
+        now = time.time()
+        rows = []
+        for key, entry in index.links.items():
+            if is_placeholder(key):
+                continue
+            refs = [{name: ref[name] for name in REF_KEYS} for ref in entry['references']]
+            host = (urlsplit(entry['url']).hostname or '').lower()
+            rows.append((key, entry['url'], host, now, now, now, json.dumps(refs, ensure_ascii=False)))
+        with self.lock, self.db:
+            before = self.db.execute("SELECT COUNT(*) FROM links").fetchone()[0]
+            self.db.executemany(
+                "INSERT INTO links (key, url, host, first_seen, last_seen, next_check, refs) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (key) DO UPDATE SET url = excluded.url, last_seen = excluded.last_seen, "
+                "refs = excluded.refs",
+                rows
+            )
+            after = self.db.execute("SELECT COUNT(*) FROM links").fetchone()[0]
+        return after - before
+
+    def forget(self, older_than):
+        """Drop links no sync has seen for older_than seconds (gone from every result); returns how many"""
+        cutoff = time.time() - older_than
+        with self.lock, self.db:
+            keys = [key for key, in self.db.execute("SELECT key FROM links WHERE last_seen < ?", (cutoff,))]
+            self.db.executemany("DELETE FROM checks WHERE key = ?", [(key,) for key in keys])
+            self.db.execute("DELETE FROM links WHERE last_seen < ?", (cutoff,))
+        return len(keys)
+
+    def due(self, limit, now=None):
+        """(key, url) of the links due for a check, most overdue first"""
+        with self.lock:
+            return self.db.execute(
+                "SELECT key, url FROM links WHERE next_check <= ? ORDER BY next_check LIMIT ?",
+                (now or time.time(), limit)
+            ).fetchall()
+
+    def reliability(self, host):
+        """Decayed share of successful checks on a host (0.5 for an unknown host)"""
+        with self.lock:
+            row = self.db.execute("SELECT ok_weight, total_weight FROM hosts WHERE host = ?", (host,)).fetchone()
+        return self._reliability(row)
+
+    @staticmethod
+    def _reliability(row):
+        ok_weight, total_weight = row or (0, 0)
+        return (ok_weight + 1) / (total_weight + 2)
+
+    def record(self, results):
+        """Store link_check results {key: result}; returns the links that turned broken"""
+        newly_broken = []
+        now = time.time()
+        with self.lock, self.db:
+            for key, result in results.items():
+                row = self.db.execute(f"SELECT {', '.join(LINK_COLUMNS)} FROM links WHERE key = ?", (key,)).fetchone()
+                if row is None:
+                    continue
+                link = dict(zip(LINK_COLUMNS, row))
+                status = link_status(result)
+
+                host = self.db.execute("SELECT ok_weight, total_weight FROM hosts WHERE host = ?",
+                                       (link['host'],)).fetchone()
+                ok_weight, total_weight = host or (0, 0)
+                ok_weight = ok_weight * HOST_DECAY + (status == 'ok')
+                total_weight = total_weight * HOST_DECAY + 1
+                self.db.execute(
+                    "INSERT INTO hosts VALUES (?, ?, ?, 1, ?) ON CONFLICT (host) DO UPDATE SET "
+                    "ok_weight = excluded.ok_weight, total_weight = excluded.total_weight, "
+                    "checks = checks + 1, updated_at = excluded.updated_at",
+                    (link['host'], ok_weight, total_weight, now)
+                )
+                reliability = self._reliability((ok_weight, total_weight))
+
+                if status == 'unreachable':
+                    # The link keeps its last known status; only the retry backs off
+                    misses = link['misses'] + 1
+                    self.db.execute(
+                        "UPDATE links SET misses = ?, last_checked = ?, next_check = ? WHERE key = ?",
+                        (misses, now, now + next_check_delay(status, misses, reliability), key)
+                    )
+                else:
+                    streak = link['streak'] + 1 if status == link['status'] else 1
+                    self.db.execute(
+                        "UPDATE links SET status = ?, http_status = ?, streak = ?, misses = 0, last_checked = ?, "
+                        "last_ok = CASE WHEN ? = 'ok' THEN ? ELSE last_ok END, "
+                        "broken_since = CASE WHEN ? = 'ok' THEN NULL ELSE COALESCE(broken_since, ?) END, "
+                        "next_check = ? WHERE key = ?",
+                        (status, result['status'], streak, now, status, now, status, now,
+                         now + next_check_delay(status, streak, reliability), key)
+                    )
+
+                self.db.execute(
+                    "INSERT INTO checks VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (key, now, status, result['status'], result['method'], result['content_length'],
+                     result['content_type'], result.get('elapsed'), result['error'])
+                )
+                self.db.execute(
+                    "DELETE FROM checks WHERE key = ? AND rowid NOT IN "
+                    "(SELECT rowid FROM checks WHERE key = ? ORDER BY checked_at DESC LIMIT ?)",
+                    (key, key, HISTORY_LIMIT)
+                )
+
+                if status == 'broken' and link['status'] != 'broken':
+                    self.db.execute(
+                        "INSERT INTO broken_feed (key, url, http_status, broken_at, refs) VALUES (?, ?, ?, ?, ?)",
+                        (key, link['url'], result['status'], now, link['refs'])
+                    )
+                    newly_broken.append({'key': key, 'url': link['url'], 'status': result['status'],
+                                         'broken_at': iso(now), 'references': json.loads(link['refs'] or '[]')})
+        return newly_broken
+
+    def feed(self):
+        """Feed entries not exported yet whose link is still broken, oldest first, as (id, entry)"""
+        with self.lock:
+            rows = self.db.execute(
+                "SELECT f.id, f.key, f.url, f.http_status, f.broken_at, f.refs FROM broken_feed f "
+                "JOIN links l ON l.key = f.key "
+                "WHERE f.exported_at IS NULL AND l.status = 'broken' ORDER BY f.id"
+            ).fetchall()
+        return [(feed_id, {'key': key, 'url': url, 'status': http_status, 'broken_at': iso(broken_at),
+                           'references': json.loads(refs or '[]')})
+                for feed_id, key, url, http_status, broken_at, refs in rows]
+
+    def mark_exported(self, feed_ids):
+        now = time.time()
+        with self.lock, self.db:
+            self.db.executemany("UPDATE broken_feed SET exported_at = ? WHERE id = ?",
+                                [(now, feed_id) for feed_id in feed_ids])
+            # Entries whose link recovered before they were exported are dropped
+            self.db.execute(
+                "UPDATE broken_feed SET exported_at = ? WHERE exported_at IS NULL "
+                "AND key IN (SELECT key FROM links WHERE status != 'broken')", (now,)
+            )
+            self.db.execute("DELETE FROM broken_feed WHERE exported_at < ?", (now - FEED_RETENTION,))
+
+    def history(self, key, limit=HISTORY_LIMIT):
+        """Latest checks of a link, newest first"""
+        columns = ('checked_at', 'status', 'http_status', 'method', 'content_length', 'content_type', 'elapsed',
+                   'error')
+        with self.lock:
+            rows = self.db.execute(
+                f"SELECT {', '.join(columns)} FROM checks WHERE key = ? ORDER BY checked_at DESC LIMIT ?",
+                (key, limit)
+            ).fetchall()
+        return [dict(zip(columns, (iso(row[0]),) + row[1:])) for row in rows]
+
+    def counts(self):
+        """{status: links}, plus how many are due now"""
+        with self.lock:
+            counts = dict(self.db.execute("SELECT status, COUNT(*) FROM links GROUP BY status").fetchall())
+            counts['due'] = self.db.execute("SELECT COUNT(*) FROM links WHERE next_check <= ?",
+                                            (time.time(),)).fetchone()[0]
+        return counts
+
+    def hosts(self, limit=10):
+        """Least reliable hosts as (host, reliability, checks)"""
+        with self.lock:
+            rows = self.db.execute("SELECT host, ok_weight, total_weight, checks FROM hosts").fetchall()
+        ranked = [(host, self._reliability((ok, total)), checks) for host, ok, total, checks in rows]
+        return sorted(ranked, key=lambda item: item[1])[:limit]
+
+    def close(self):
+        with self.lock:
+            self.db.close()
+
+
+def revalidate(store, batch=500, max_batches=1, concurrency=32, per_host=4, timeout=15, stop_event=None):
+    """Check due links in batches of at most `batch` (max_batches=0: until none are due)
+
+    Returns (links checked, links that turned broken).
+    """
+    checked, newly_broken, batches = 0, [], 0
+    while not max_batches or batches < max_batches:
+        if stop_event is not None and stop_event.is_set():
+            break
+        due = store.due(batch)
+        if not due:
+            break
+        broken = store.record(check_links(due, concurrency, per_host, timeout, progress_every=0))
+        batches += 1
+        checked += len(due)
+        newly_broken.extend(broken)
+        print(f"🩺 Batch {batches}: {len(due)} link(s) checked, {len(broken)} newly broken")
+    return checked, newly_broken
+
+
+def export_feed(store, path):
+    """Append unexported newly broken links to an NDJSON feed; returns how many"""
+    from result_stream import NDJSONWriter
+    entries = store.feed()
+    if entries:
+        with NDJSONWriter(path, flush_every=1000) as writer:
+            for _, entry in entries:
+                writer.write(entry)
+    store.mark_exported([feed_id for feed_id, _ in entries])
+    return len(entries)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="TTL-based revalidation of stored media links")
+    parser.add_argument('files', nargs='*', help="result files whose links are tracked (JSON, NDJSON or non-Drive TXT)")
+    parser.add_argument('--state', action='store_true', help="also track the links in extraction_state.sqlite")
+    parser.add_argument('--health', default="link_health.sqlite", help="health history database")
+    parser.add_argument('--batch', type=int, default=500, help="links checked per batch")
+    parser.add_argument('--max-batches', type=int, default=1, help="batches per run (0: until no link is due)")
+    parser.add_argument('--concurrency', type=int, default=32, help="requests in flight")
+    parser.add_argument('--per-host', type=int, default=4, help="requests in flight per host")
+    parser.add_argument('--timeout', type=float, default=15, help="seconds per request")
+    parser.add_argument('--feed', default=None, help="append newly broken links to this NDJSON feed")
+    parser.add_argument('--forget-days', type=float, default=30,
+                        help="drop links missing from every sync for this many days")
+    parser.add_argument('--status', action='store_true', help="show link and host health, check nothing")
+    parser.add_argument('--history', default=None, metavar='KEY', help="show the check history of a canonical link")
+    args = parser.parse_args(argv)
+
+    store = LinkHealthStore(args.health)
+    try:
+        if args.history:
+            print(json.dumps(store.history(args.history), indent=2, ensure_ascii=False))
+            return
+        if not args.status:
+            index = LinkIndex()
+            for path in args.files:
+                index.add_file(path)
+            if args.state:
+                index.add_state(extractor="universal")
+                index.add_state(extractor="non_drive")
+            # Only after a sync: without one every link would look gone from the results
+            if index.links:
+                print(f"🔗 Tracking {len(index.links)} link(s), {store.sync(index)} new")
+                forgotten = store.forget(args.forget_days * 86400)
+                if forgotten:
+                    print(f"🗑️  Forgot {forgotten} link(s) no longer in any result")
+
+            checked, newly_broken = revalidate(store, args.batch, args.max_batches, args.concurrency,
+                                               args.per_host, args.timeout)
+            print(f"✅ Checked {checked} due link(s), {len(newly_broken)} newly broken")
+            for entry in newly_broken[:20]:
+                ref = (entry['references'] or [{}])[0]
+                print(f"   💀 HTTP {entry['status']}: {ref.get('show')} {ref.get('season')} "
+                      f"Episode {ref.get('episode')} {entry['url']}")
+            if args.feed:
+                print(f"📰 {export_feed(store, args.feed)} newly broken link(s) appended to {args.feed}")
+
+        counts = store.counts()
+        print(f"📊 {counts.get('ok', 0)} working, {counts.get('broken', 0)} broken, "
+              f"{counts.get('unknown', 0)} never checked, {counts['due']} due now")
+        for host, reliability, checks in store.hosts(5):
+            print(f"   {host}: {reliability:.0%} reliable over {checks} check(s)")
+    finally:
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,346 @@
+"""
+Canonical video links and a global link index
+
+The same source turns up in several forms: Drive /view, /preview and
+open?id= links, Mega file/ and embed/ links, YouTube watch/embed/youtu.be
+URLs, and <video> sources that are relative or absolute depending on the
+page. canonical_link() reduces each to one key:
+
+    drive:<file id>    mega:<file id>    youtube:<video id>
+    url:<host without www.><path>[?query]    (everything else, fragment dropped)
+
+LinkIndex maps every canonical key to each episode that references it,
+from extraction results (either layout, JSON or NDJSON streams), the
+state store and the StreamVault catalog, in one pass. From that index:
+
+    duplicates()     one source used by different episodes (or the same
+                     episode filed under several categories)
+    placeholders()   episodes pointing at a known placeholder file
+    mismatches()     links whose file name says another SxxEyy than the
+                     episode they are filed under
+    unique_links()   each canonical source once, for link checking
+
+Usage:
+    python link_store.py english-seasons_non_drive_category.json all_categories_links.json \\
+        --catalog data/streamvault-data.json --report link_report.json --index link_index.json
+"""
+
+import argparse
+import json
+import os
+import re
+from datetime import datetime, timezone
+from urllib.parse import parse_qs, quote, unquote, urljoin, urlsplit
+
+from result_files import episode_links
+from state_store import season_number
+from video_extraction import BASE_URL
+
+
+# Drive files the catalog uses while an episode has no real source
+PLACEHOLDER_IDS = ['1zcFHiGEOwgq2-j6hMqpsE0ov7qcIUqCd', 'PLACEHOLDER']
+
+DRIVE_ID_PATTERN = re.compile(r'/(?:file/d|d)/([A-Za-z0-9_-]{10,})')
+MEGA_PATTERN = re.compile(r'/(?:file|embed)/([A-Za-z0-9_-]+)')
+YOUTUBE_ID_PATTERN = re.compile(r'/(?:embed|shorts|v)/([A-Za-z0-9_-]{6,})')
+EPISODE_CODE_PATTERN = re.compile(r'S(\d{1,2})\s*E(\d{1,3})(?!\d)', re.IGNORECASE)
+
+# Characters left as they are when re-quoting a path
+SAFE_PATH_CHARS = "/:@!$&'()*+,;=-._~"
+
+
+def absolute_link(url, base_url=BASE_URL):
+    """Absolute http(s) URL for a stored link, or None for something that is not one ('mp4')"""
+    url = (url or '').strip()
+    if not url:
+        return None
+    if url.startswith('//'):
+        return 'https:' + url
+    if re.match(r'https?://', url, re.IGNORECASE):
+        return url
+    if '://' in url or url.startswith(('javascript:', 'data:', 'blob:')):
+        return None
+    if url.startswith(('/', './', '../')) or '/' in url:
+        return urljoin(base_url, url)
+    return None
+
+
+def canonical_link(url, base_url=BASE_URL):
+    """(canonical key, canonical URL) of a stored link, or (None, None)"""
+    url = absolute_link(url, base_url)
+    if url is None:
+        return None, None
+    parts = urlsplit(url)
+    host = (parts.hostname or '').lower()
+    bare_host = host[4:] if host.startswith('www.') else host
+
+    if bare_host in ('drive.google.com', 'docs.google.com'):
+        match = DRIVE_ID_PATTERN.search(parts.path)
+        drive_id = match.group(1) if match else (parse_qs(parts.query).get('id') or [None])[0]
+        if drive_id:
+            return f"drive:{drive_id}", f"https://drive.google.com/file/d/{drive_id}/view"
+
+    if bare_host in ('mega.nz', 'mega.co.nz'):
+        # /file/ID#KEY and /embed/ID#KEY, or the older #!ID!KEY
+        match = MEGA_PATTERN.search(parts.path)
+        if match:
+            mega_id, key = match.group(1), parts.fragment
+        else:
+            mega_id, _, key = parts.fragment.lstrip('!').partition('!')
+        if mega_id:
+            return f"mega:{mega_id}", f"https://mega.nz/file/{mega_id}" + (f"#{key}" if key else '')
+
+    if bare_host in ('youtube.com', 'm.youtube.com', 'youtube-nocookie.com', 'youtu.be'):
+        if bare_host == 'youtu.be':
+            video_id = parts.path.strip('/').split('/')[0]
+        else:
+            match = YOUTUBE_ID_PATTERN.search(parts.path)
+            video_id = match.group(1) if match else (parse_qs(parts.query).get('v') or [None])[0]
+        if video_id:
+            return f"youtube:{video_id}", f"https://www.youtube.com/embed/{video_id}"
+
+    netloc = host
+    if parts.port and not (parts.scheme == 'http' and parts.port == 80 or parts.scheme == 'https' and parts.port == 443):
+        netloc = f"{host}:{parts.port}"
+        bare_host = f"{bare_host}:{parts.port}"
+    path = quote(unquote(parts.path or '/'), safe=SAFE_PATH_CHARS)
+    query = f"?{parts.query}" if parts.query else ''
+    return f"url:{bare_host}{path}{query}", f"{parts.scheme.lower()}://{netloc}{path}{query}"
+
+
+def is_placeholder(key):
+    return bool(key) and any(placeholder in key for placeholder in PLACEHOLDER_IDS)
+
+
+def episode_code(url):
+    """(season, episode) named in a media file name (Show_S01E11-ENG.mp4), or None"""
+    name = unquote(urlsplit(url).path.rstrip('/').split('/')[-1])
+    match = EPISODE_CODE_PATTERN.search(name)
+    return (int(match.group(1)), int(match.group(2))) if match else None
+
+
+def iter_result_episodes(data):
+    """(category, show, season, episode) of a nested result in either layout"""
+    for key, value in data.items():
+        if not isinstance(value, dict):
+            continue
+        first = next(iter(value.values()), None)
+        if isinstance(first, list) or first is None:
+            # Show -> Season -> episodes
+            for season, episodes in value.items():
+                for episode in episodes:
+                    yield None, key, season, episode
+        else:
+            # Category -> Show -> Season -> episodes
+            for show, seasons in value.items():
+                for season, episodes in seasons.items():
+                    for episode in episodes:
+                        yield key, show, season, episode
+
+
+class LinkIndex:
+    """Canonical link key -> every episode referencing it"""
+
+    def __init__(self, base_url=BASE_URL):
+        self.base_url = base_url
+        self.links = {}
+        self.invalid = []
+
+    def add(self, url, source, category=None, show=None, season=None, episode=None, episode_url=None,
+            link_type=None):
+        """Index one reference; returns its canonical key (None if url is not a link)
+
+        A relative url is resolved against its episode page when known.
+        """
+        ref = {
+            'source': source,
+            'category': category,
+            'show': show,
+            'season': season,
+            'episode': episode,
+            'episode_url': episode_url,
+            'type': link_type,
+            'url': url,
+        }
+        key, canonical = canonical_link(url, episode_url or self.base_url)
+        if key is None:
+            self.invalid.append(ref)
+            return None
+        entry = self.links.setdefault(key, {'url': canonical, 'references': []})
+        entry['references'].append(ref)
+        return key
+
+    def add_episode(self, episode, source, category=None, show=None, season=None):
+        for link_type, url in episode_links(episode):
+            self.add(url, source, category, show, season, episode.get('episode'), episode.get('episode_url'),
+                     link_type)
+
+    def add_result(self, data, source):
+        """Index a nested result dict"""
+        for category, show, season, episode in iter_result_episodes(data):
+            self.add_episode(episode, source, category, show, season)
+
+    def add_file(self, path):
+        """Index a result JSON file, an NDJSON result stream or a non-Drive TXT export"""
+        if path.endswith(('.ndjson', '.ndjson.gz', '.ndjson.zst', '.jsonl')):
+            from result_stream import iter_records
+            for record in iter_records(path):
+                self.add_episode(record, path, record.get('category'), record.get('show'), record.get('season'))
+            return
+        from result_diff import load_snapshot
+        self.add_result(load_snapshot(path), path)
+
+    def add_state(self, state_file="extraction_state.sqlite", extractor="universal"):
+        """Index every stored episode result of the state store"""
+        from state_store import StateStore
+        state = StateStore(state_file, extractor)
+        try:
+            self.add_result(state.results(), f"{state_file}:{extractor}")
+        finally:
+            state.close()
+
+    def add_catalog(self, data_file='data/streamvault-data.json'):
+        """Index the videoUrl/googleDriveUrl of every catalog episode"""
+        with open(data_file, encoding='utf-8') as f:
+            data = json.load(f)
+        titles = {show['id']: show.get('title') for show in data.get('shows', [])}
+        for ep in data.get('episodes', []):
+            for field in ('videoUrl', 'googleDriveUrl'):
+                if ep.get(field):
+                    self.add(ep[field], data_file, 'catalog', titles.get(ep.get('showId'), ep.get('showId')),
+                             f"Season {ep.get('season')}", ep.get('episodeNumber'), None, field)
+
+    # Reports
+
+    def unique_links(self):
+        """(key, canonical URL) of every indexed source, placeholders excluded"""
+        return [(key, entry['url']) for key, entry in self.links.items() if not is_placeholder(key)]
+
+    def duplicates(self):
+        """Sources referenced by more than one episode
+
+        kind is 'cross_episode' when different episodes share the source
+        (usually a wrong link), 'cross_category' when it is one episode
+        filed under several categories and 'repeated' when the same
+        episode is listed more than once (in several files, or as both
+        an embed and a file link).
+        """
+        groups = []
+        for key, entry in self.links.items():
+            if is_placeholder(key) or len(entry['references']) < 2:
+                continue
+            episodes = {(str(ref['show']).lower(), season_number(ref['season']), ref['episode'])
+                        for ref in entry['references']}
+            if len(episodes) > 1:
+                kind = 'cross_episode'
+            elif len({ref['category'] for ref in entry['references']}) > 1:
+                kind = 'cross_category'
+            else:
+                kind = 'repeated'
+            groups.append({
+                'key': key,
+                'url': entry['url'],
+                'kind': kind,
+                'count': len(entry['references']),
+                'references': entry['references'],
+            })
+        groups.sort(key=lambda group: (group['kind'] != 'cross_episode', -group['count']))
+        return groups
+
+    def placeholders(self):
+        """Placeholder sources and the episodes reusing them, by show"""
+        report = {}
+        for key, entry in self.links.items():
+            if not is_placeholder(key):
+                continue
+            shows = {}
+            for ref in entry['references']:
+                shows.setdefault(ref['show'], []).append(
+                    {'season': ref['season'], 'episode': ref['episode'], 'source': ref['source']})
+            report[key] = {'count': len(entry['references']), 'shows': shows}
+        return report
+
+    def mismatches(self):
+        """References whose file name names another episode than the one they are filed under"""
+        found = []
+        for key, entry in self.links.items():
+            code = episode_code(entry['url'])
+            if code is None:
+                continue
+            for ref in entry['references']:
+                season = season_number(ref['season'])
+                if ref['episode'] is not None and season is not None and code != (season, ref['episode']):
+                    found.append(dict(ref, key=key, file_episode=f"S{code[0]:02d}E{code[1]:02d}"))
+        return found
+
+    def report(self):
+        duplicates = self.duplicates()
+        placeholders = self.placeholders()
+        mismatches = self.mismatches()
+        return {
+            'generatedAt': datetime.now(timezone.utc).isoformat(),
+            'summary': {
+                'references': sum(len(entry['references']) for entry in self.links.values()),
+                'unique_links': len(self.links),
+                'duplicate_links': len(duplicates),
+                'cross_episode_duplicates': sum(1 for group in duplicates if group['kind'] == 'cross_episode'),
+                'placeholder_references': sum(item['count'] for item in placeholders.values()),
+                'mismatched_episodes': len(mismatches),
+                'invalid_links': len(self.invalid),
+            },
+            'duplicates': duplicates,
+            'placeholders': placeholders,
+            'mismatches': mismatches,
+            'invalid': self.invalid,
+        }
+
+    def save(self, path):
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.links, f, indent=2, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Canonical link index with duplicate/placeholder reports")
+    parser.add_argument('files', nargs='*', help="result files (JSON, NDJSON stream or non-Drive TXT)")
+    parser.add_argument('--catalog', default=None, help="also index a StreamVault catalog (data/streamvault-data.json)")
+    parser.add_argument('--state', action='store_true', help="also index extraction_state.sqlite")
+    parser.add_argument('--report', default="link_report.json", help="report output")
+    parser.add_argument('--index', default=None, help="also write the canonical link index")
+    args = parser.parse_args(argv)
+
+    index = LinkIndex()
+    for path in args.files:
+        if not os.path.exists(path):
+            print(f"❌ No such file: {path}")
+            return 1
+        index.add_file(path)
+    if args.catalog:
+        index.add_catalog(args.catalog)
+    if args.state:
+        index.add_state(extractor="universal")
+        index.add_state(extractor="non_drive")
+
+    report = index.report()
+    summary = report['summary']
+    print(f"🔗 {summary['references']} reference(s) to {summary['unique_links']} unique link(s)")
+    print(f"♊ Duplicate links: {summary['duplicate_links']} ({summary['cross_episode_duplicates']} across episodes)")
+    print(f"⚠️  Placeholder references: {summary['placeholder_references']}")
+    print(f"🔀 Links naming another episode: {summary['mismatched_episodes']}")
+    print(f"❌ Not a link: {summary['invalid_links']}")
+    for ref in report['mismatches'][:20]:
+        print(f"   {ref['show']} {ref['season']} Episode {ref['episode']} -> {ref['file_episode']} ({ref['url']})")
+
+    tmp_path = f"{args.report}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, args.report)
+    print(f"💾 Report saved to: {args.report}")
+    if args.index:
+        index.save(args.index)
+        print(f"💾 Link index saved to: {args.index}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+"""
+Multi-pattern keyword prefilter for WorthCrete pages
+
+Classifies a page in a single pass over the HTML, reporting which keyword
+families (video hosts, video file extensions, Drive markers, player tags)
+appear and at which offsets. Extractors use the result to skip parsing and
+regex work on pages, and regions of pages, that cannot match.
+
+Uses the C `ahocorasick` automaton (pip install pyahocorasick) when it is
+installed, otherwise a single compiled alternation run once over the page.
+"""
+
+import re
+
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
+
+# keyword -> family
+DEFAULT_KEYWORDS = {
+    # Hosts
+    'mega.nz': 'mega',
+    'drive.google.com': 'drive',
+    'youtube.com': 'youtube',
+    'youtu.be': 'youtube',
+    'vimeo.com': 'video_host',
+    'dailymotion.com': 'video_host',
+    'streamtape.com': 'video_host',
+    'doodstream.com': 'video_host',
+    'mixdrop.co': 'video_host',
+    'upstream.to': 'video_host',
+    # Direct video files
+    '.mp4': 'video_file',
+    '.m3u8': 'video_file',
+    '.webm': 'video_file',
+    '.mkv': 'video_file',
+    '.avi': 'video_file',
+    '.mov': 'video_file',
+    # Only the html5 rule's DIRECT_VIDEO_PATTERN reads .ogg, so it is not a non-Drive indicator
+    '.ogg': 'ogg_file',
+    # Markers used by the Drive ID fallback patterns
+    'drive-video-': 'drive_marker',
+    '/file/d/': 'drive_marker',
+    '/d/': 'drive_marker',
+    'data-id=': 'drive_marker',
+    'fileid': 'drive_marker',
+    'video_id': 'drive_marker',
+    'video-id': 'drive_marker',
+    'videoid': 'drive_marker',
+    # Player tags
+    '<iframe': 'iframe_tag',
+    '<video': 'video_tag',
+    '<source': 'source_tag',
+}
+
+# Families that indicate a non-Drive video on the page
+NON_DRIVE_FAMILIES = ('mega', 'video_file', 'video_host')
+
+
+class PageClassification:
+    """Keyword hits found in one page, grouped by family"""
+
+    def __init__(self, length):
+        self.length = length
+        self.keywords = {}
+        self.families = {}
+
+    def add(self, offset, keyword, family):
+        self.keywords.setdefault(keyword, []).append(offset)
+        self.families.setdefault(family, []).append(offset)
+
+    def has(self, family):
+        """Check if any keyword of a family appears in the page"""
+        return family in self.families
+
+    def has_any(self, families):
+        """Check if any keyword of any of the given families appears"""
+        return any(family in self.families for family in families)
+
+    def offsets(self, family):
+        """Sorted offsets at which keywords of a family start"""
+        return sorted(self.families.get(family, []))
+
+    def regions(self, family, before=0, after=256):
+        """Merged (start, end) windows around every hit of a family"""
+        windows = []
+        for offset in self.offsets(family):
+            start = max(0, offset - before)
+            end = min(self.length, offset + after)
+            if windows and start <= windows[-1][1]:
+                windows[-1] = (windows[-1][0], max(windows[-1][1], end))
+            else:
+                windows.append((start, end))
+        return windows
+
+    def search(self, pattern, text, family, before=0, after=256, flags=re.IGNORECASE):
+        """Run a regex only inside the windows around a family's hits"""
+        compiled = re.compile(pattern, flags) if isinstance(pattern, str) else pattern
+        for start, end in self.regions(family, before, after):
+            match = compiled.search(text, start, end)
+            if match:
+                return match
+        return None
+
+    def summary(self):
+        """Family -> hit count"""
+        return {family: len(offsets) for family, offsets in self.families.items()}
+
+
+class KeywordAutomaton:
+    """Case-insensitive multi-keyword matcher that scans a page once"""
+
+    def __init__(self, keywords=None):
+        self.keywords = {k.lower(): family for k, family in (keywords or DEFAULT_KEYWORDS).items()}
+
+        if ahocorasick is not None:
+            self._automaton = ahocorasick.Automaton()
+            for keyword, family in self.keywords.items():
+                self._automaton.add_word(keyword, (keyword, family))
+            self._automaton.make_automaton()
+            self._pattern = None
+        else:
+            self._automaton = None
+            # Longest first so overlapping keywords prefer the specific one
+            ordered = sorted(self.keywords, key=len, reverse=True)
+            self._pattern = re.compile('|'.join(re.escape(k) for k in ordered), re.IGNORECASE)
+
+    def iter_matches(self, text):
+        """Yield (offset, keyword, family) for every keyword occurrence"""
+        if self._automaton is not None:
+            for end, (keyword, family) in self._automaton.iter(text.lower()):
+                yield end - len(keyword) + 1, keyword, family
+        else:
+            for match in self._pattern.finditer(text):
+                keyword = match.group(0).lower()
+                yield match.start(), keyword, self.keywords[keyword]
+
+    def classify(self, text):
+        """Classify a page in one pass"""
+        result = PageClassification(len(text))
+        for offset, keyword, family in self.iter_matches(text):
+            result.add(offset, keyword, family)
+        return result
+
+
+_default_automaton = None
+
+
+def classify_page(html_content):
+    """Classify a page with the shared default automaton"""
+    global _default_automaton
+    if _default_automaton is None:
+        _default_automaton = KeywordAutomaton()
+    return _default_automaton.classify(html_content)
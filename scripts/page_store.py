@@ -0,0 +1,114 @@
+"""
+Local store of fetched WorthCrete pages
+
+Keeps the raw bytes of every season and episode page an extractor fetched,
+so extraction rules can be re-run offline (see reextract_corpus.py).
+
+Layout under the store directory:
+- blobs/ab/abcdef....html.gz   page bytes, gzip, named by SHA-256 of the bytes
+- index.sqlite                 url -> blob hash, encoding, kind and the
+                               category/show/season/episode it belongs to
+
+Identical pages are stored once however many URLs point at them. The
+extractors write to the store given to them, or to the directory named by
+STREAMVAULT_PAGE_STORE when that is set.
+"""
+
+import gzip
+import hashlib
+import os
+import sqlite3
+import time
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS pages (
+    url TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    content_hash TEXT NOT NULL,
+    encoding TEXT NOT NULL,
+    category TEXT,
+    show TEXT,
+    season TEXT,
+    episode INTEGER,
+    fetched_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS pages_kind ON pages (kind);
+CREATE INDEX IF NOT EXISTS pages_show ON pages (category, show);
+"""
+
+
+def open_page_store(root=None):
+    """PageStore at root or $STREAMVAULT_PAGE_STORE, or None if neither is set"""
+    root = root or os.getenv('STREAMVAULT_PAGE_STORE')
+    return PageStore(root) if root else None
+
+
+def content_hash(content):
+    return hashlib.sha256(content).hexdigest()
+
+
+class PageStore:
+    def __init__(self, root="page_store"):
+        self.root = root
+        os.makedirs(os.path.join(root, 'blobs'), exist_ok=True)
+        self.db = sqlite3.connect(os.path.join(root, 'index.sqlite'), check_same_thread=False)
+        self.db.executescript(SCHEMA)
+
+    def blob_path(self, digest):
+        return os.path.join(self.root, 'blobs', digest[:2], f"{digest}.html.gz")
+
+    def put(self, url, content, encoding, kind, category=None, show=None, season=None, episode=None):
+        """Store one fetched page and return its content hash"""
+        digest = content_hash(content)
+        path = self.blob_path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.tmp"
+            with gzip.open(tmp_path, 'wb', compresslevel=6) as f:
+                f.write(content)
+            os.replace(tmp_path, path)
+
+        with self.db:
+            self.db.execute(
+                "INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (url, kind, digest, encoding, category, show, season, episode, time.time())
+            )
+        return digest
+
+    def put_response(self, response, kind, url=None, **context):
+        """Store a requests response (see put for the context keywords)"""
+        from html_parsing import response_encoding
+        return self.put(url or response.url, response.content, response_encoding(response), kind, **context)
+
+    def read_blob(self, digest):
+        with gzip.open(self.blob_path(digest), 'rb') as f:
+            return f.read()
+
+    def get(self, url):
+        """Return (content, encoding) of a stored page, or None"""
+        row = self.db.execute("SELECT content_hash, encoding FROM pages WHERE url = ?", (url,)).fetchone()
+        if row is None:
+            return None
+        return self.read_blob(row[0]), row[1]
+
+    def iter_pages(self, kind=None):
+        """Yield stored page rows as dicts, ordered by category/show/season/episode"""
+        query = "SELECT url, kind, content_hash, encoding, category, show, season, episode FROM pages"
+        params = ()
+        if kind:
+            query += " WHERE kind = ?"
+            params = (kind,)
+        query += " ORDER BY category, show, season, episode, url"
+
+        columns = ('url', 'kind', 'content_hash', 'encoding', 'category', 'show', 'season', 'episode')
+        for row in self.db.execute(query, params):
+            yield dict(zip(columns, row))
+
+    def count(self, kind=None):
+        if kind:
+            return self.db.execute("SELECT COUNT(*) FROM pages WHERE kind = ?", (kind,)).fetchone()[0]
+        return self.db.execute("SELECT COUNT(*) FROM pages").fetchone()[0]
+
+    def close(self):
+        self.db.close()
@@ -0,0 +1,99 @@
+"""
+Persistent parse-result cache
+
+Maps (page kind, SHA-256 of the raw page bytes, extraction rule version,
+key) to the record the parse stage produced for it, so unchanged season and
+episode pages are not parsed again on the next run. `key` carries whatever
+else the record depends on besides the page bytes (the season URL for
+episode-link lists).
+
+The rule version is video_extraction.rule_version(), derived from the
+extraction code, its keyword table and the HTML backend in use. Entries
+written under any other version are never returned and are dropped the
+next time the cache is opened.
+
+Episode records do not depend on the rule order they were parsed with
+(video_extraction returns the default-order winner), so one cached record
+serves every order.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+
+import video_extraction
+
+
+# Returned by ParseCache.get when a page has no cached record
+MISS = object()
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS parse_results (
+    kind TEXT NOT NULL,
+    content_hash TEXT NOT NULL,
+    rule_version TEXT NOT NULL,
+    key TEXT NOT NULL,
+    result TEXT NOT NULL,
+    PRIMARY KEY (kind, content_hash, rule_version, key)
+);
+"""
+
+
+def default_cache_file():
+    return os.getenv('STREAMVAULT_PARSE_CACHE', 'parse_cache.sqlite')
+
+
+class ParseCache:
+    def __init__(self, cache_file=None, rule_version=None, commit_every=50):
+        self.cache_file = cache_file or default_cache_file()
+        self.rule_version = rule_version or video_extraction.rule_version()
+        self.commit_every = commit_every
+        self.pending = 0
+        self.hits = 0
+        self.misses = 0
+        # Results arrive from the parse pool's result thread
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(self.cache_file, check_same_thread=False)
+        self.db.executescript(SCHEMA)
+        with self.db:
+            self.db.execute("DELETE FROM parse_results WHERE rule_version != ?", (self.rule_version,))
+
+    @staticmethod
+    def content_hash(content):
+        return hashlib.sha256(content).hexdigest()
+
+    def get(self, kind, digest, key=''):
+        """Cached record for a page, or MISS"""
+        with self.lock:
+            row = self.db.execute(
+                "SELECT result FROM parse_results WHERE kind = ? AND content_hash = ? AND rule_version = ? AND key = ?",
+                (kind, digest, self.rule_version, key)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return MISS
+            self.hits += 1
+            return json.loads(row[0])
+
+    def put(self, kind, digest, result, key=''):
+        """Remember the record parsed from a page"""
+        with self.lock:
+            self.db.execute(
+                "INSERT OR REPLACE INTO parse_results VALUES (?, ?, ?, ?, ?)",
+                (kind, digest, self.rule_version, key, json.dumps(result))
+            )
+            self.pending += 1
+            if self.pending >= self.commit_every:
+                self.db.commit()
+                self.pending = 0
+
+    def flush(self):
+        with self.lock:
+            self.db.commit()
+            self.pending = 0
+
+    def close(self):
+        self.flush()
+        self.db.close()
@@ -0,0 +1,136 @@
+"""
+Process-pool parse/extract stage
+
+Fetching stays in the extractor; the raw page bytes are handed to a pool of
+worker processes that decode them, parse them and run the extraction rules
+from video_extraction, so parsing scales across cores instead of running
+under one GIL. Pages cross the process boundary once, as the undecoded
+response bytes (no text copy, no soup), and results come back as compact
+records:
+
+- 'episode'        -> (type, direct_link, rule, drive_pattern) or None
+- 'episode_links'  -> [episode_url, ...] or None
+- 'season_links'   -> [season_url, ...]
+- 'show_links'     -> [(name, url), ...]
+
+Pool size comes from the `workers` argument or STREAMVAULT_PARSE_WORKERS.
+0 (the default) parses inline in the calling process.
+
+With a ParseCache, pages whose bytes were already parsed under the current
+rule version are answered from the cache without reaching a worker. Such
+futures are marked, see from_cache(), so callers can leave replayed
+results out of the rule statistics.
+"""
+
+import os
+from concurrent.futures import Future, ProcessPoolExecutor
+
+import video_extraction
+from html_parsing import SITE_ENCODING, decode_content, response_encoding
+from parse_cache import MISS
+
+
+def parse_page(kind, content, encoding, url, base_url, rule_order=None, drive_pattern_order=None):
+    """Worker entry point: decode, parse and extract one page"""
+    html = decode_content(content, encoding)
+
+    if kind == 'episode':
+        return video_extraction.match_video_source(html, base_url, rule_order, drive_pattern_order)
+    if kind == 'episode_links':
+        return video_extraction.parse_episode_links(html, url, base_url)
+    if kind == 'season_links':
+        return video_extraction.parse_season_links(html, base_url)
+    if kind == 'show_links':
+        return [(show['name'], show['url']) for show in video_extraction.parse_show_links(html, base_url)]
+
+    raise ValueError(f"Unknown page kind: {kind}")
+
+
+def cache_key(kind, encoding, url):
+    """What a record depends on besides the page bytes
+
+    Not the rule order: it changes which rules run first, never the record.
+    """
+    # Episode-link lists are filtered by the season number in the URL
+    if kind == 'episode_links':
+        return f"{encoding}|{url}"
+    return encoding
+
+
+def from_cache(future):
+    """Whether a future from ParsePool.submit was answered from the cache"""
+    return getattr(future, 'cached', False)
+
+
+def default_workers():
+    try:
+        return int(os.getenv('STREAMVAULT_PARSE_WORKERS', '0'))
+    except ValueError:
+        return 0
+
+
+class ParsePool:
+    """Parse pages on a pool of worker processes (or inline when workers=0)"""
+
+    def __init__(self, workers=None, base_url=video_extraction.BASE_URL, cache=None):
+        self.workers = default_workers() if workers is None else workers
+        self.base_url = base_url
+        self.cache = cache
+        self.executor = ProcessPoolExecutor(max_workers=self.workers) if self.workers > 0 else None
+
+    def submit(self, kind, content, encoding=SITE_ENCODING, url=None, rule_order=None, drive_pattern_order=None):
+        """Queue one page for parsing and return a Future for its record"""
+        if self.cache is not None:
+            digest = self.cache.content_hash(content)
+            key = cache_key(kind, encoding, url)
+            cached = self.cache.get(kind, digest, key)
+            if cached is not MISS:
+                future = Future()
+                future.set_result(cached)
+                future.cached = True
+                return future
+
+        args = (kind, content, encoding, url, self.base_url, rule_order, drive_pattern_order)
+        if self.executor is not None:
+            future = self.executor.submit(parse_page, *args)
+        else:
+            future = Future()
+            try:
+                future.set_result(parse_page(*args))
+            except Exception as e:
+                future.set_exception(e)
+
+        if self.cache is not None:
+            def remember(done):
+                if done.exception() is None:
+                    self.cache.put(kind, digest, done.result(), key)
+            future.add_done_callback(remember)
+        return future
+
+    def submit_response(self, kind, response, url=None, rule_order=None, drive_pattern_order=None):
+        """Queue a fetched requests response for parsing"""
+        return self.submit(kind, response.content, response_encoding(response), url or response.url,
+                           rule_order, drive_pattern_order)
+
+    def map(self, kind, pages):
+        """Parse (content, encoding, url) tuples, yielding records in order"""
+        futures = [self.submit(kind, content, encoding, url) for content, encoding, url in pages]
+        for future in futures:
+            yield future.result()
+
+    def flush(self):
+        """Write cached records out (they are otherwise committed in batches)"""
+        if self.cache is not None:
+            self.cache.flush()
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=True)
+            self.executor = None
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,206 @@
+"""
+Re-drive failed episodes from the dead-letter queue
+
+Re-processes only the episodes recorded in dead_letters.sqlite, fetching
+them concurrently (one request per entry), and merges every success into
+the existing output file of the extractor that failed on it:
+
+- universal      all_categories_links.json   Category -> Show -> Season -> episodes
+                 (also stored in extraction_state.sqlite)
+- non_drive      --output FILE               Show -> Season -> episodes
+                                             (Season -> episodes / episodes for show / season mode)
+- missing_shows  scripts/missing_shows_links.json
+                                             Category -> Show -> seasons -> Season -> episodes
+
+Entries that fail again stay queued with their attempt count bumped.
+
+Usage:
+    python redrive.py --list
+    python redrive.py --extractor universal --workers 8
+    python redrive.py --extractor non_drive --output english-seasons_non_drive_category.json
+"""
+
+import argparse
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import requests
+
+import video_extraction
+from dead_letter import DeadLetterQueue
+from html_parsing import decode_page
+from state_store import StateStore
+
+
+def universal_record(html, entry):
+    found = video_extraction.find_video_source(html)
+    if not found:
+        return None
+    return {
+        'episode': entry['episode'],
+        'episode_url': entry['episode_url'],
+        'video_source': video_extraction.build_video_source(*found)
+    }
+
+
+def non_drive_record(html, entry):
+    video_links = video_extraction.find_video_links(html)
+    if not video_links:
+        return None
+    return {
+        'episode': entry['episode'],
+        'episode_url': entry['episode_url'],
+        'video_links': video_links
+    }
+
+
+def missing_shows_record(html, entry):
+    video = video_extraction.extract_video_source(html)
+    if not video:
+        return None
+    return {
+        'episode': entry['episode'],
+        'url': entry['episode_url'],
+        'video': video
+    }
+
+
+# extractor -> (record builder, path of keys to the episode list, URL key, default output)
+EXTRACTORS = {
+    'universal': (universal_record,
+                  lambda e: [e['category'], e['show_name'], e['season_label']],
+                  'episode_url', "all_categories_links.json"),
+    # Show and season mode files have no show (or season) level, and their entries no show name
+    'non_drive': (non_drive_record,
+                  lambda e: [key for key in (e['show_name'], e['season_label']) if key],
+                  'episode_url', None),
+    'missing_shows': (missing_shows_record,
+                      lambda e: [e['category'], e['show_name'], 'seasons', e['season_label']],
+                      'url', "scripts/missing_shows_links.json"),
+}
+
+
+def merge_episode(data, path, record, url_key):
+    """Put an episode record into a nested results tree, replacing an older copy"""
+    node = data
+    for key in path[:-1]:
+        node = node.setdefault(key or 'Unknown', {})
+    episodes = node.setdefault(path[-1] or 'Unknown', []) if path else data
+
+    episodes[:] = [ep for ep in episodes if ep.get(url_key) != record[url_key]]
+    episodes.append(record)
+    episodes.sort(key=lambda ep: ep.get('episode') or 0)
+
+
+class Redriver:
+    def __init__(self, dead_letters=None, workers=4, timeout=15):
+        self.dead_letters = dead_letters or DeadLetterQueue()
+        self.workers = workers
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.headers.update({
+            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+        })
+
+    def fetch(self, entry):
+        """(html, error) for one dead-lettered episode"""
+        try:
+            response = self.session.get(entry['episode_url'], timeout=self.timeout)
+            response.raise_for_status()
+            return decode_page(response), None
+        except requests.exceptions.RequestException as e:
+            return None, f"fetch_failed: {str(e)[:80]}"
+
+    def redrive(self, extractor, output=None, max_attempts=None):
+        """Re-process the pending entries of one extractor, returning (fixed, still failing)"""
+        build_record, path_of, url_key, default_output = EXTRACTORS[extractor]
+        output = output or default_output
+        entries = self.dead_letters.pending(extractor, max_attempts)
+        if not entries:
+            print(f"✅ No pending failures for {extractor}")
+            return 0, 0
+        if not output:
+            print(f"❌ {extractor}: --output is required to merge results")
+            return 0, len(entries)
+
+        print(f"🔁 Re-driving {len(entries)} {extractor} episode(s) with {self.workers} worker(s)...")
+
+        data = None
+        if os.path.exists(output):
+            with open(output, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+
+        state = StateStore("extraction_state.sqlite", extractor) if extractor in ('universal', 'non_drive') else None
+        fixed = 0
+        failed = 0
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            futures = {pool.submit(self.fetch, entry): entry for entry in entries}
+            for future in as_completed(futures):
+                entry = futures[future]
+                html, error = future.result()
+                record = build_record(html, entry) if html is not None else None
+
+                if record is None:
+                    failed += 1
+                    self.dead_letters.add(extractor, entry['episode_url'], error or 'no_video_source')
+                    print(f"✗ {entry['show_name']} {entry['season_label']} Episode {entry['episode']}: "
+                          f"{error or 'no video source'}")
+                    continue
+
+                path = path_of(entry)
+                if data is None:
+                    data = {} if path else []
+                merge_episode(data, path, record, url_key)
+                if state is not None:
+                    result = {key: value for key, value in record.items() if key not in ('episode', 'episode_url')}
+                    state.record_episode(entry['episode_url'], result, entry['category'], entry['show_name'],
+                                         entry['season_label'], entry['season_url'], entry['episode'])
+                self.dead_letters.resolve(extractor, entry['episode_url'])
+                fixed += 1
+                print(f"✓ {entry['show_name']} {entry['season_label']} Episode {entry['episode']}")
+
+        if fixed:
+            tmp_output = f"{output}.tmp"
+            with open(tmp_output, 'w', encoding='utf-8') as f:
+                json.dump(data, f, indent=2, ensure_ascii=False)
+            os.replace(tmp_output, output)
+            print(f"💾 Merged {fixed} episode(s) into {output}")
+
+        print(f"📊 {extractor}: {fixed} fixed, {failed} still failing")
+        return fixed, failed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Re-process failed episodes from the dead-letter queue")
+    parser.add_argument('--extractor', choices=list(EXTRACTORS), action='append',
+                        help="extractor whose failures to re-drive (repeatable, default: all)")
+    parser.add_argument('--output', default=None, help="results file to merge into (default per extractor)")
+    parser.add_argument('--workers', type=int, default=4, help="concurrent fetches")
+    parser.add_argument('--max-attempts', type=int, default=None, help="skip entries that failed this often")
+    parser.add_argument('--list', action='store_true', help="only show queue counts")
+    args = parser.parse_args(argv)
+
+    dead_letters = DeadLetterQueue()
+
+    if args.list:
+        counts = dead_letters.counts()
+        if not counts:
+            print("✅ Dead-letter queue is empty")
+        for (extractor, status), n in sorted(counts.items()):
+            print(f"{extractor:15} {status:10} {n}")
+        return
+
+    extractors = args.extractor or list(EXTRACTORS)
+    if args.output and len(extractors) > 1:
+        print("❌ --output needs a single --extractor")
+        return
+
+    redriver = Redriver(dead_letters, args.workers)
+    for extractor in extractors:
+        redriver.redrive(extractor, args.output, args.max_attempts)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""
+Offline re-extraction over the stored page corpus
+
+Re-runs the video_extraction rules over every episode page in a PageStore
+(see page_store.py), on all CPU cores, without touching the network. Use it
+after changing an extraction rule to rebuild the results in minutes instead
+of re-crawling the site.
+
+Output has the same layout as the extractors:
+- video_source mode (universalv6):  Category -> Show -> "Season N" -> episodes
+                                     with 'video_source'
+- video_links mode (non-Drive):     Category -> Show -> "Season N" -> episodes
+                                     with 'video_links'
+
+Usage:
+    python reextract_corpus.py --store page_store --output all_categories_links.json
+    python reextract_corpus.py --mode video_links --workers 8
+"""
+
+import argparse
+import gzip
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import video_extraction
+from html_parsing import decode_content
+from page_store import PageStore
+from state_store import season_sort_key
+
+
+def reextract_page(mode, blob_path, encoding, base_url=video_extraction.BASE_URL):
+    """Worker entry point: read one stored page and run the extraction rules
+
+    Workers read the page from disk themselves, so only the path crosses the
+    process boundary.
+    """
+    with gzip.open(blob_path, 'rb') as f:
+        html = decode_content(f.read(), encoding)
+
+    if mode == 'video_links':
+        return video_extraction.find_video_links(html)
+
+    found = video_extraction.find_video_source(html, base_url)
+    return list(found) if found else None
+
+
+class CorpusReextractor:
+    def __init__(self, store, workers=None, mode='video_source', base_url=video_extraction.BASE_URL):
+        self.store = store
+        self.workers = workers or os.cpu_count() or 1
+        self.mode = mode
+        self.base_url = base_url
+
+    def run(self, category=None, show=None):
+        """Re-extract every stored episode page, returning the nested results"""
+        pages = [page for page in self.store.iter_pages('episode')
+                 if (category is None or page['category'] == category)
+                 and (show is None or page['show'] == show)]
+
+        print(f"🔁 Re-extracting {len(pages)} stored episode pages on {self.workers} worker(s)...")
+        start = time.time()
+
+        args = [(self.mode, self.store.blob_path(page['content_hash']), page['encoding'], self.base_url)
+                for page in pages]
+        chunksize = max(1, len(args) // (self.workers * 8))
+
+        results = {}
+        failed = 0
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            records = pool.map(reextract_page, *zip(*args), chunksize=chunksize) if args else []
+            for page, record in zip(pages, records):
+                if not record:
+                    failed += 1
+                    continue
+
+                episode = {
+                    'episode': page['episode'],
+                    'episode_url': page['url'],
+                }
+                if self.mode == 'video_links':
+                    episode['video_links'] = record
+                else:
+                    episode['video_source'] = video_extraction.build_video_source(*record)
+
+                category_results = results.setdefault(page['category'] or 'Uncategorized', {})
+                show_results = category_results.setdefault(page['show'] or 'Unknown Show', {})
+                show_results.setdefault(page['season'] or 'Season 1', []).append(episode)
+
+        # Same ordering as a live extraction: seasons and episodes by number
+        for category_results in results.values():
+            for show_name, seasons in category_results.items():
+                for episodes in seasons.values():
+                    episodes.sort(key=lambda ep: ep['episode'] or 0)
+                category_results[show_name] = dict(sorted(seasons.items(), key=lambda item: season_sort_key(item[0])))
+
+        elapsed = time.time() - start
+        print(f"✅ Re-extracted {len(pages) - failed}/{len(pages)} episodes in {elapsed:.1f}s")
+        if failed:
+            print(f"⚠️  No video found in {failed} stored pages")
+
+        return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Re-run extraction rules over stored episode pages (no network)")
+    parser.add_argument('--store', default=os.getenv('STREAMVAULT_PAGE_STORE', 'page_store'),
+                        help="page store directory (default: $STREAMVAULT_PAGE_STORE or page_store)")
+    parser.add_argument('--output', default=None, help="output JSON file")
+    parser.add_argument('--mode', choices=['video_source', 'video_links'], default='video_source',
+                        help="video_source (universalv6 layout) or video_links (non-Drive layout)")
+    parser.add_argument('--workers', type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument('--category', default=None, help="only re-extract this category")
+    parser.add_argument('--show', default=None, help="only re-extract this show")
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(os.path.join(args.store, 'index.sqlite')):
+        print(f"❌ No page store found at {args.store}")
+        return
+
+    store = PageStore(args.store)
+    results = CorpusReextractor(store, args.workers, args.mode).run(args.category, args.show)
+    store.close()
+
+    output = args.output or ('all_categories_links_reextracted.json' if args.mode == 'video_source'
+                             else 'non_drive_video_links_reextracted.json')
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2, ensure_ascii=False)
+    print(f"💾 Saved to {output}")
+
+
+if __name__ == "__main__":
+    main()
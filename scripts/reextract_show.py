@@ -0,0 +1,165 @@
+"""
+Targeted re-extraction of one show, season or episode
+
+Takes a StreamVault slug or a show name, looks it up in the show index
+(slug -> category, name and WorthCrete URL, filled in by every category
+listing universalv6 and crawl_pipeline.py fetch), extracts only the
+requested seasons / episodes and merges them into the existing results
+file in place. Re-extracted episodes replace their old entries; everything
+else in the file is left alone.
+
+If the show is not in the index yet, the category listings are fetched
+once to rebuild it (or pass --refresh-index). A query that matches more
+than one show is refused with the candidates listed; narrow it down with
+--category or the exact slug.
+
+Usage:
+    python reextract_show.py money-heist
+    python reextract_show.py "Stranger Things" --season 4
+    python reextract_show.py berlin --season 1 --episode 3 --episode 4
+"""
+
+import argparse
+import json
+import os
+import sys
+
+from redrive import merge_episode
+from state_store import season_sort_key
+from universalv6 import CATEGORIES, WorthCreteExtractor
+
+
+class AmbiguousShowError(LookupError):
+    """A slug or show name that matches more than one indexed show"""
+
+    def __init__(self, query, candidates):
+        self.query = query
+        self.candidates = candidates
+        listed = "; ".join(f"[{match['category']}] {match['show_name']} ({match['slug']})" for match in candidates)
+        super().__init__(f"{len(candidates)} shows match '{query}': {listed}. "
+                         f"Pass a category or the exact slug")
+
+
+class ShowReextractor:
+    def __init__(self, extractor=None, output="all_categories_links.json", delay=1):
+        self.extractor = extractor or WorthCreteExtractor()
+        self.output = output
+        self.delay = delay
+
+    def refresh_index(self, categories=CATEGORIES):
+        """Fetch the category listings to (re)build the show index"""
+        print("🔄 Rebuilding show index from category listings...")
+        for category_name, category_url in categories.items():
+            for _ in self.extractor.iter_show_links_from_category(category_url, category_name):
+                pass
+        print(f"✅ Show index: {self.extractor.state.show_index_size()} entries")
+
+    def resolve(self, query, category=None, refresh=False):
+        """Index entry for a slug or show name, or None
+
+        Raises AmbiguousShowError when more than one show matches.
+        """
+        state = self.extractor.state
+        if refresh or state.show_index_size() == 0:
+            self.refresh_index()
+
+        matches = state.find_shows(query, category)
+        if not matches and not refresh:
+            # Maybe a show added to the site since the index was built
+            self.refresh_index()
+            matches = state.find_shows(query, category)
+
+        if not matches:
+            return None
+        if len(matches) > 1:
+            raise AmbiguousShowError(query, matches)
+        return matches[0]
+
+    def reextract(self, query, seasons=None, episodes=None, category=None, refresh=False):
+        """Re-extract a show (or some of its seasons/episodes) and merge it into the output"""
+        show = self.resolve(query, category, refresh)
+        if show is None:
+            print(f"❌ No show found for '{query}'")
+            return None
+
+        print(f"🎬 {show['show_name']} [{show['category']}]: {show['show_url']}")
+        season_links = self.extractor.get_season_links_from_show_page(show['show_url'])
+        if not season_links:
+            print("❌ No seasons found!")
+            return None
+
+        show_results = {}
+        for season_num, season_url in enumerate(season_links, 1):
+            if seasons and season_num not in seasons:
+                continue
+            season_label = f"Season {season_num}"
+            print(f"\n🎯 {season_label.upper()}")
+            show_results[season_label] = self.extractor.extract_season(
+                season_url, self.delay, show['category'], show['show_name'], season_label,
+                resume=False, only_episodes=episodes
+            )
+
+        if seasons and not show_results:
+            print(f"❌ Show has {len(season_links)} seasons, none of {sorted(seasons)} found")
+            return None
+
+        self.merge(show['category'], show['show_name'], show_results)
+        return show_results
+
+    def merge(self, category, show_name, show_results):
+        """Merge re-extracted seasons into the results file in place"""
+        data = {}
+        if os.path.exists(self.output):
+            with open(self.output, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+
+        merged = 0
+        for season_label, episodes in show_results.items():
+            for episode in episodes:
+                merge_episode(data, [category, show_name, season_label], episode, 'episode_url')
+                merged += 1
+
+        # Keep seasons in order when a new one was added
+        seasons = data.get(category, {}).get(show_name)
+        if seasons:
+            data[category][show_name] = dict(sorted(seasons.items(), key=lambda item: season_sort_key(item[0])))
+
+        tmp_output = f"{self.output}.tmp"
+        with open(tmp_output, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+        os.replace(tmp_output, self.output)
+        print(f"\n💾 Merged {merged} episode(s) into {self.output}")
+
+        # Keep the TXT export next to it in step
+        txt_output = os.path.splitext(self.output)[0] + ".txt"
+        if os.path.exists(txt_output):
+            self.extractor.save_to_txt(data, txt_output)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Re-extract one show (or some seasons/episodes) by slug or name")
+    parser.add_argument('show', help="StreamVault slug or show name")
+    parser.add_argument('--season', type=int, action='append', help="season number (repeatable, default: all)")
+    parser.add_argument('--episode', type=int, action='append', help="episode number (repeatable, default: all)")
+    parser.add_argument('--category', choices=list(CATEGORIES), help="only look in this category")
+    parser.add_argument('--output', default="all_categories_links.json", help="results file to merge into")
+    parser.add_argument('--delay', type=float, default=1, help="seconds between episode requests")
+    parser.add_argument('--refresh-index', action='store_true', help="rebuild the show index first")
+    args = parser.parse_args(argv)
+
+    extractor = WorthCreteExtractor()
+    try:
+        ShowReextractor(extractor, args.output, args.delay).reextract(
+            args.show, args.season, args.episode, args.category, args.refresh_index
+        )
+    except AmbiguousShowError as e:
+        print(f"❌ {len(e.candidates)} shows match '{e.query}', pass --category or the exact slug:")
+        for match in e.candidates:
+            print(f"   - [{match['category']}] {match['show_name']} ({match['slug']})")
+        return 1
+    finally:
+        extractor.parse_pool.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,353 @@
+"""
+Snapshot diff and patch for extraction results
+
+Compares two result snapshots (say english-seasons_non_drive_category.json
+and its backup) by hashing every subtree: each episode is hashed from its
+canonical JSON, each season from its episodes' keys and hashes, each show
+from its seasons' and so on up to the whole file. Subtrees whose hashes
+match are skipped with one comparison, so only the shows and seasons that
+actually changed are walked.
+
+The delta is written as a patch of episode operations, plus container
+operations for shows and seasons that appear empty or disappear:
+
+    {"format": "streamvault-result-patch", "version": 2,
+     "base": {"file", "hash"}, "target": {"file", "hash"},
+     "summary": {"added", "removed", "changed", "links_added", "links_removed"},
+     "ops": [{"op": "add", "path": [show, season, episode], "episode": {...}},
+             {"op": "remove", "path": [...], "old": {...}},
+             {"op": "replace", "path": [...], "old": {...}, "episode": {...},
+              "links": {"added": [[type, url]], "removed": [[type, url]]}},
+             {"op": "add_container", "path": [show, season], "value": []},
+             {"op": "remove_container", "path": [show]}]}
+
+apply_patch() replays it on the base snapshot, which then hashes to the
+target hash (version 1 patches, without container operations, drop the
+seasons and shows they emptied instead); --changed writes only the
+added and changed episodes in the nested result layout, so the rest of
+the pipeline (dag_runner.py, bulk imports) handles just those.
+
+Snapshots are result JSON files of either layout (Show -> Season, or
+Category -> Show -> Season) or non-Drive TXT exports.
+
+Usage:
+    python result_diff.py diff english-seasons_non_drive_category_backup.json english-seasons_non_drive_category.json \\
+        --patch results.patch.json --changed changed_episodes.json
+    python result_diff.py apply english-seasons_non_drive_category_backup.json results.patch.json --output patched.json
+"""
+
+import argparse
+import hashlib
+import json
+import os
+
+from result_files import episode_links, parse_non_drive_txt
+
+
+PATCH_FORMAT = "streamvault-result-patch"
+PATCH_VERSION = 2
+
+
+# Loading
+
+def load_snapshot(path):
+    """Nested result dict of a JSON result file or a non-Drive TXT export"""
+    with open(path, encoding='utf-8') as f:
+        content = f.read()
+    if content.lstrip().startswith('{'):
+        return json.loads(content)
+    return parse_non_drive_txt(content)
+
+
+# Hashing
+
+def digest(text):
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+
+def episode_key(episode, seen):
+    """Key of an episode within its season: its number, made unique if repeated"""
+    key = episode.get('episode')
+    if key is None:
+        key = episode.get('episode_url') or episode.get('url')
+    seen[key] = seen.get(key, 0) + 1
+    return key if seen[key] == 1 else f"{key}#{seen[key]}"
+
+
+class HashNode:
+    """Hash of a subtree plus its children's nodes (None for an episode)"""
+
+    # value: the episode (or scalar), or an empty container of the subtree's type
+    __slots__ = ('hash', 'children', 'value')
+
+    def __init__(self, hash, children=None, value=None):
+        self.hash = hash
+        self.children = children
+        self.value = value
+
+
+def hash_tree(value):
+    """HashNode tree of a nested result; list levels hold episodes"""
+    if isinstance(value, dict):
+        children = {key: hash_tree(child) for key, child in value.items()}
+    elif isinstance(value, list):
+        seen = {}
+        children = {}
+        for episode in value:
+            children[episode_key(episode, seen)] = HashNode(
+                digest(json.dumps(episode, sort_keys=True, ensure_ascii=False)), value=episode)
+    else:
+        return HashNode(digest(json.dumps(value, sort_keys=True, ensure_ascii=False)), value=value)
+    # Child order does not matter: a reordered season or show is not a change
+    combined = "\n".join(f"{json.dumps(key, ensure_ascii=False)}:{node.hash}"
+                         for key, node in sorted(children.items(), key=lambda item: str(item[0])))
+    return HashNode(digest(combined), children, type(value)())
+
+
+# Diff
+
+def diff_nodes(old, new, path, ops):
+    if old.hash == new.hash:
+        return
+    if (old.children is None) != (new.children is None) or type(old.value) is not type(new.value):
+        # An episode (or scalar) replaced by a subtree, a subtree by an episode, or seasons by episodes
+        removed(old, path, ops)
+        added(new, path, ops)
+        return
+    if old.children is None:
+        # Episodes
+        old_links, new_links = episode_links(old.value), episode_links(new.value)
+        ops.append({
+            'op': 'replace',
+            'path': path,
+            'old': old.value,
+            'episode': new.value,
+            'links': {
+                'added': [list(link) for link in new_links if link not in old_links],
+                'removed': [list(link) for link in old_links if link not in new_links],
+            }
+        })
+        return
+
+    for key, node in old.children.items():
+        if key in new.children:
+            diff_nodes(node, new.children[key], path + [key], ops)
+        else:
+            removed(node, path + [key], ops)
+    for key, node in new.children.items():
+        if key not in old.children:
+            added(node, path + [key], ops)
+
+
+def added(node, path, ops):
+    if node.children is None:
+        ops.append({'op': 'add', 'path': path, 'episode': node.value})
+        return
+    if not node.children:
+        # Adding its episodes would not create an empty show or season
+        ops.append({'op': 'add_container', 'path': path, 'value': node.value})
+        return
+    for key, child in node.children.items():
+        added(child, path + [key], ops)
+
+
+def removed(node, path, ops):
+    if node.children is None:
+        ops.append({'op': 'remove', 'path': path, 'old': node.value})
+        return
+    for key, child in node.children.items():
+        removed(child, path + [key], ops)
+    ops.append({'op': 'remove_container', 'path': path})
+
+
+def diff_snapshots(old, new, old_file=None, new_file=None):
+    """Patch dict turning the old nested result into the new one"""
+    old_tree, new_tree = hash_tree(old), hash_tree(new)
+    ops = []
+    diff_nodes(old_tree, new_tree, [], ops)
+
+    summary = {op: sum(1 for o in ops if o['op'] == op) for op in ('add', 'remove', 'replace')}
+    return {
+        'format': PATCH_FORMAT,
+        'version': PATCH_VERSION,
+        'base': {'file': old_file, 'hash': old_tree.hash},
+        'target': {'file': new_file, 'hash': new_tree.hash},
+        'summary': {
+            'added': summary['add'],
+            'removed': summary['remove'],
+            'changed': summary['replace'],
+            'links_added': sum(len(o['links']['added']) for o in ops if o['op'] == 'replace'),
+            'links_removed': sum(len(o['links']['removed']) for o in ops if o['op'] == 'replace'),
+        },
+        'ops': ops,
+    }
+
+
+# Patch
+
+def find_episode(episodes, key):
+    seen = {}
+    for index, episode in enumerate(episodes):
+        if episode_key(episode, seen) == key:
+            return index
+    return None
+
+
+def apply_patch(data, patch, check=True):
+    """Apply a patch to a nested result in place; returns data
+
+    With check, the base must hash to the patch's base hash, and a
+    ValueError is raised otherwise.
+    """
+    if patch.get('format') != PATCH_FORMAT:
+        raise ValueError("not a result patch")
+    if check and hash_tree(data).hash != patch['base']['hash']:
+        raise ValueError("the snapshot is not the one this patch was made from")
+
+    for op in patch['ops']:
+        *parents, key = op['path']
+        if op['op'] in ('add_container', 'remove_container'):
+            apply_container_op(data, op)
+            continue
+        container = data
+        for parent in parents[:-1]:
+            container = container.setdefault(parent, {})
+        episodes = container.setdefault(parents[-1], []) if parents else None
+        if not isinstance(episodes, list):
+            # A scalar at the top level of the result
+            if op['op'] == 'remove':
+                data.pop(key, None)
+            else:
+                data[key] = op['episode']
+            continue
+
+        index = find_episode(episodes, key)
+        if op['op'] == 'remove' and op.get('old') in episodes:
+            # Repeated episode numbers shift their keys as earlier ones are removed
+            index = episodes.index(op['old'])
+        if op['op'] == 'remove':
+            if index is not None:
+                episodes.pop(index)
+        elif index is not None:
+            episodes[index] = op['episode']
+        else:
+            episodes.append(op['episode'])
+            episodes.sort(key=lambda ep: (ep.get('episode') is None, ep.get('episode') or 0))
+
+    if patch.get('version', 1) < 2:
+        prune_empty(data, patch)
+    return data
+
+
+def apply_container_op(data, op):
+    """Create an (empty) show or season, or drop one with whatever it still holds"""
+    *parents, key = op['path']
+    container = data
+    for parent in parents:
+        if op['op'] == 'add_container':
+            container = container.setdefault(parent, {})
+        elif isinstance(container, dict) and parent in container:
+            container = container[parent]
+        else:
+            return
+    if not isinstance(container, dict):
+        return
+    if op['op'] == 'add_container':
+        container.setdefault(key, type(op['value'])())
+    else:
+        container.pop(key, None)
+
+
+def prune_empty(data, patch):
+    """Drop seasons/shows a version 1 patch emptied (ones that were empty to begin with are kept)"""
+    emptied = {tuple(op['path'][:-1]) for op in patch['ops'] if op['op'] == 'remove'}
+    for path in sorted(emptied, key=len, reverse=True):
+        for depth in range(len(path), 0, -1):
+            container = data
+            for key in path[:depth - 1]:
+                container = container.get(key, {})
+            if path[depth - 1] in container and not container[path[depth - 1]]:
+                del container[path[depth - 1]]
+
+
+def changed_episodes(patch):
+    """Nested result holding only the added and changed episodes of a patch"""
+    result = {}
+    for op in patch['ops']:
+        if op['op'] not in ('add', 'replace') or len(op['path']) < 2:
+            continue
+        *parents, _ = op['path']
+        container = result
+        for parent in parents[:-1]:
+            container = container.setdefault(parent, {})
+        container.setdefault(parents[-1], []).append(op['episode'])
+    return result
+
+
+def write_json(data, path):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def print_patch(patch, limit=50):
+    summary = patch['summary']
+    print(f"📊 {summary['added']} added, {summary['removed']} removed, {summary['changed']} changed episode(s) "
+          f"({summary['links_added']} link(s) added, {summary['links_removed']} removed)")
+    symbols = {'add': '🆕', 'remove': '🗑️ ', 'replace': '✏️ ', 'add_container': '📁', 'remove_container': '🗑️ '}
+    for op in patch['ops'][:limit]:
+        print(f"  {symbols[op['op']]} {' / '.join(str(key) for key in op['path'])}")
+        for link in op.get('links', {}).get('removed', []):
+            print(f"       - [{link[0]}] {link[1]}")
+        for link in op.get('links', {}).get('added', []):
+            print(f"       + [{link[0]}] {link[1]}")
+    if len(patch['ops']) > limit:
+        print(f"  ... and {len(patch['ops']) - limit} more")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Diff extraction result snapshots and apply result patches")
+    commands = parser.add_subparsers(dest='command', metavar='command')
+    commands.required = True
+
+    diff = commands.add_parser('diff', help="compare two snapshots")
+    diff.add_argument('old', help="older snapshot (JSON or non-Drive TXT)")
+    diff.add_argument('new', help="newer snapshot (JSON or non-Drive TXT)")
+    diff.add_argument('--patch', default=None, help="write the patch to this file")
+    diff.add_argument('--changed', default=None, help="write the added/changed episodes as a nested result")
+    diff.add_argument('--limit', type=int, default=50, help="operations to print")
+
+    apply = commands.add_parser('apply', help="apply a patch to a snapshot")
+    apply.add_argument('base', help="snapshot the patch was made from")
+    apply.add_argument('patch', help="patch file")
+    apply.add_argument('--output', required=True, help="patched JSON result")
+    apply.add_argument('--force', action='store_true', help="apply even if the base does not match the patch")
+    args = parser.parse_args(argv)
+
+    if args.command == 'diff':
+        patch = diff_snapshots(load_snapshot(args.old), load_snapshot(args.new), args.old, args.new)
+        print_patch(patch, args.limit)
+        if args.patch:
+            write_json(patch, args.patch)
+            print(f"💾 Patch saved to: {args.patch}")
+        if args.changed:
+            write_json(changed_episodes(patch), args.changed)
+            print(f"💾 Changed episodes saved to: {args.changed}")
+        return
+
+    with open(args.patch, encoding='utf-8') as f:
+        patch = json.load(f)
+    try:
+        data = apply_patch(load_snapshot(args.base), patch, check=not args.force)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return 1
+    write_json(data, args.output)
+    matches = hash_tree(data).hash == patch['target']['hash']
+    print(f"✅ Applied {len(patch['ops'])} operation(s) -> {args.output}"
+          f"{'' if matches else ' (result differs from the patch target)'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+"""
+Readers shared by the tools that take extraction results
+
+Results come as JSON in either layout (Show -> Season -> episodes, or
+Category -> Show -> Season -> episodes) or as the non-Drive TXT export,
+and an episode holds its link as a universal video_source or as non-Drive
+video_links.
+"""
+
+import re
+
+
+def parse_non_drive_txt(content):
+    """Show -> Season -> [episodes] from a non-Drive TXT export (episodes without links are dropped)"""
+    data = {}
+    show_sections = re.split(r'={60,}\nSHOW: (.+?)\n={60,}', content)
+
+    for i in range(1, len(show_sections), 2):
+        show_name = show_sections[i].strip()
+        data[show_name] = {}
+
+        season_sections = re.split(r'Season (\d+) \((\d+) episodes\)\n-{40,}', show_sections[i + 1])
+        for j in range(1, len(season_sections), 3):
+            season_key = f"Season {int(season_sections[j])}"
+            data[show_name][season_key] = []
+
+            episode_sections = re.split(r'Episode (\d+):', season_sections[j + 2])
+            for k in range(1, len(episode_sections), 2):
+                video_links = []
+                for line in episode_sections[k + 1].strip().split('\n'):
+                    match = re.match(r'\[(.+?)\] (.+)', line.strip())
+                    if match:
+                        video_links.append({'type': match.group(1), 'url': match.group(2)})
+                if video_links:
+                    data[show_name][season_key].append({
+                        'episode': int(episode_sections[k]),
+                        'video_links': video_links
+                    })
+    return data
+
+
+def episode_links(episode):
+    """(type, url) pairs of an extracted episode in either layout"""
+    source = episode.get('video_source')
+    if source:
+        return [(source.get('type'), source.get('direct_link'))]
+    return [(link.get('type'), link.get('url')) for link in episode.get('video_links') or []]
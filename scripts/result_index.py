@@ -0,0 +1,228 @@
+"""
+Byte-range index for extraction result files
+
+Result files such as english-seasons_non_drive_category.json are one big
+nested object (Show -> Season -> [episodes], or Category -> Show ->
+Season -> [episodes] for universalv6). Scripts that only need a few shows
+used to json.load the whole file. A sidecar index records where every
+nested object and episode list starts and ends in the file:
+
+    english-seasons_non_drive_category.json.idx
+    {"version": 1, "size": ..., "mtime_ns": ...,
+     "entries": {"ALMOST HUMAN": {"range": [start, end],
+                                  "entries": {"Season 1": {"range": [start, end], "count": 12}}}}}
+
+ResultIndex memory-maps the result file and decodes only the ranges that
+are asked for. It reads like the dict json.load would return
+(index["ALMOST HUMAN"]["Season 1"]), and names()/count() answer from the
+index alone. The index is rebuilt automatically when the result file's
+size or modification time no longer match it.
+
+Usage:
+    python result_index.py english-seasons_non_drive_category.json
+    python result_index.py english-seasons_non_drive_category.json "ALMOST HUMAN" "Season 1"
+"""
+
+import argparse
+import json
+import mmap
+import os
+import re
+from collections.abc import Mapping
+
+
+INDEX_VERSION = 1
+
+# A JSON string (a key when followed by a colon) or a bracket; everything
+# else (numbers, literals, commas) does not change the structure
+TOKEN_PATTERN = re.compile(rb'"([^"\\]*(?:\\.[^"\\]*)*)"(\s*:)?|[{}\[\]]', re.DOTALL)
+
+
+def index_path(path):
+    return f"{path}.idx"
+
+
+def scan(data):
+    """Index entries of a JSON object held in bytes (or an mmap)
+
+    Objects get {"range", "entries"}; lists get {"range", "count"} and are
+    not descended into. Scalar values are not indexed.
+    """
+    if not re.match(rb'\s*\{', data):
+        raise ValueError("not a JSON object (result files are Show/Category -> ... objects)")
+    root = {}
+    # (entry or None, child entries or None) per open container
+    stack = []
+    pending = None
+    for match in TOKEN_PATTERN.finditer(data):
+        token = match.group(0)[:1]
+        if token == b'"':
+            if match.group(2):
+                # Keys inside episodes are never looked up
+                if stack and stack[-1][1] is not None:
+                    pending = json.loads(b'"' + match.group(1) + b'"')
+                continue
+            entry = stack[-1][0] if stack else None
+            if entry is not None and 'count' in entry:
+                entry['count'] += 1
+            pending = None
+        elif token in (b'{', b'['):
+            entry = children = None
+            if not stack:
+                children = root if token == b'{' else None
+            else:
+                parent, siblings = stack[-1]
+                if siblings is not None and pending is not None:
+                    entry = {'range': [match.start(), None]}
+                    if token == b'{':
+                        children = entry['entries'] = {}
+                    else:
+                        entry['count'] = 0
+                    siblings[pending] = entry
+                elif parent is not None and 'count' in parent:
+                    parent['count'] += 1
+            stack.append((entry, children))
+            pending = None
+        else:
+            entry, _ = stack.pop()
+            if entry is not None:
+                entry['range'][1] = match.end()
+            pending = None
+    return root
+
+
+def build_index(path, save=True):
+    """Scan a result file and write its sidecar index; returns the index"""
+    stat = os.stat(path)
+    entries = {}
+    if stat.st_size:
+        with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            entries = scan(data)
+    index = {'version': INDEX_VERSION, 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'entries': entries}
+
+    if save:
+        sidecar = index_path(path)
+        try:
+            tmp_path = f"{sidecar}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(index, f, ensure_ascii=False)
+            os.replace(tmp_path, sidecar)
+        except OSError as e:
+            print(f"⚠️  Could not write {sidecar}: {e}")
+    return index
+
+
+def load_index(path):
+    """Sidecar index of a result file, rebuilt if missing or out of date"""
+    stat = os.stat(path)
+    try:
+        with open(index_path(path), encoding='utf-8') as f:
+            index = json.load(f)
+        if (index.get('version') == INDEX_VERSION and index.get('size') == stat.st_size
+                and index.get('mtime_ns') == stat.st_mtime_ns):
+            return index
+    except (OSError, ValueError):
+        pass
+    print(f"🔄 Indexing {path}...")
+    return build_index(path)
+
+
+class ResultIndex(Mapping):
+    """Read-only, lazily decoded view of a result file"""
+
+    def __init__(self, path):
+        self.path = path
+        self.index = load_index(path)
+        self.file = open(path, 'rb')
+        self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ) if self.index['size'] else b''
+
+    def close(self):
+        if isinstance(self.data, mmap.mmap):
+            self.data.close()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def entry(self, *path):
+        """Index entry at a key path; raises KeyError"""
+        entries = self.index['entries']
+        entry = None
+        for key in path:
+            if entries is None or key not in entries:
+                raise KeyError(key)
+            entry = entries[key]
+            entries = entry.get('entries')
+        return entry
+
+    def get_path(self, *path):
+        """Decoded value at a key path"""
+        start, end = self.entry(*path)['range']
+        return json.loads(self.data[start:end])
+
+    def names(self, *path):
+        """Keys of the object at a key path, without decoding it"""
+        entries = self.entry(*path).get('entries') if path else self.index['entries']
+        return list(entries or ())
+
+    def count(self, *path):
+        """Number of episodes under a key path, without decoding it"""
+        entry = self.entry(*path) if path else {'entries': self.index['entries']}
+        if 'count' in entry:
+            return entry['count']
+        return sum(self.count(*path, key) for key in entry.get('entries') or ())
+
+    # Mapping interface over the top level
+
+    def __getitem__(self, key):
+        return self.get_path(key)
+
+    def __iter__(self):
+        return iter(self.index['entries'])
+
+    def __len__(self):
+        return len(self.index['entries'])
+
+    def __contains__(self, key):
+        return key in self.index['entries']
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Index an extraction result file or read entries through its index")
+    parser.add_argument('file', help="result JSON file")
+    parser.add_argument('path', nargs='*', help="keys to print (e.g. a show, then a season)")
+    parser.add_argument('--rebuild', action='store_true', help="rebuild the index even if it is up to date")
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.file):
+        print(f"❌ No such file: {args.file}")
+        return 1
+    if args.rebuild and os.path.exists(index_path(args.file)):
+        os.remove(index_path(args.file))
+
+    try:
+        result = ResultIndex(args.file)
+    except ValueError as e:
+        print(f"❌ {args.file}: {e}")
+        return 1
+
+    with result:
+        if args.path:
+            try:
+                print(json.dumps(result.get_path(*args.path), indent=2, ensure_ascii=False))
+            except KeyError as e:
+                print(f"❌ Not found: {e}")
+                return 1
+            return
+
+        print(f"📇 {index_path(args.file)}: {len(result)} entries, {result.count()} episodes")
+        for name in result.names():
+            children = result.names(name)
+            print(f"  {name}: {len(children)} child(ren), {result.count(name)} episodes")
+
+
+if __name__ == "__main__":
+    main()
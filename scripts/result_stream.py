@@ -0,0 +1,350 @@
+"""
+Streaming extraction results
+
+Extractors append one NDJSON line per episode as soon as it is extracted
+(see NDJSONWriter), so a crash loses nothing that was already written. A
+finalizer later turns the stream into the legacy nested JSON and TXT
+exports without loading the crawl into memory.
+
+Each line is one episode with the keys it is nested under in the legacy
+layout:
+
+    universalv6 / crawl_pipeline   {"category", "show", "season", "episode", "episode_url", "video_source"}
+    non-Drive, category mode       {"show", "season", "episode", "episode_url", "video_links"}
+    non-Drive, show mode           {"season", "episode", "episode_url", "video_links"}
+
+Files ending in .gz are gzip compressed and files ending in .zst are
+zstd compressed (needs `pip install zstandard`). Appending to a
+compressed stream adds a new gzip member / zstd frame, which readers
+treat as one continuous stream.
+
+When an episode URL appears more than once (a re-extraction appended to
+the same stream), the last line wins.
+
+Usage:
+    STREAMVAULT_STREAM_OUTPUT=all_categories_links.ndjson.gz python universalv6.py
+    python result_stream.py all_categories_links.ndjson.gz --json all_categories_links.json --txt all_categories_links.txt
+"""
+
+import argparse
+import gzip
+import io
+import json
+import os
+import re
+import sqlite3
+import tempfile
+import threading
+
+from state_store import season_number
+
+
+# Keys an episode line is nested under, outermost first
+PATH_KEYS = ('category', 'show', 'season')
+
+SCHEMA = """
+CREATE TABLE groups (
+    path TEXT PRIMARY KEY,
+    seq INTEGER NOT NULL
+);
+CREATE TABLE episodes (
+    episode_url TEXT PRIMARY KEY,
+    k0 TEXT, k1 TEXT, k2 TEXT,
+    s0 INTEGER, s1 INTEGER,
+    season_num INTEGER,
+    episode INTEGER,
+    line INTEGER NOT NULL,
+    body TEXT NOT NULL
+);
+"""
+
+
+def _zstandard():
+    try:
+        import zstandard
+    except ImportError:
+        raise ImportError("zstd streams need the zstandard package: pip install zstandard")
+    return zstandard
+
+
+def open_stream(path, mode='r'):
+    """Text file object for a result stream; mode is 'r', 'a' or 'w'"""
+    if path.endswith('.gz'):
+        return gzip.open(path, mode + 't', encoding='utf-8')
+    if path.endswith('.zst'):
+        zstandard = _zstandard()
+        raw = open(path, mode + 'b')
+        if mode == 'r':
+            stream = zstandard.ZstdDecompressor().stream_reader(raw, read_across_frames=True)
+        else:
+            stream = zstandard.ZstdCompressor().stream_writer(raw)
+        return io.TextIOWrapper(stream, encoding='utf-8')
+    return open(path, mode, encoding='utf-8')
+
+
+class NDJSONWriter:
+    """Appends one JSON line per record; safe to share between threads
+
+    Plain files are flushed after every line. Compressed streams are
+    flushed every flush_every lines, since each flush ends a compression
+    block.
+    """
+
+    def __init__(self, path, flush_every=None):
+        self.path = path
+        self.file = open_stream(path, 'a')
+        compressed = path.endswith(('.gz', '.zst'))
+        self.flush_every = flush_every or (100 if compressed else 1)
+        self.pending = 0
+        self.lock = threading.Lock()
+
+    def write(self, record):
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        with self.lock:
+            if self.file is None:
+                raise ValueError(f"{self.path} is closed")
+            self.file.write(line)
+            self.pending += 1
+            if self.pending >= self.flush_every:
+                self.file.flush()
+                self.pending = 0
+
+    def close(self):
+        with self.lock:
+            if self.file is not None:
+                self.file.close()
+                self.file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def open_writer(path=None):
+    """Writer for path, or for STREAMVAULT_STREAM_OUTPUT; None when neither is set"""
+    path = path or os.getenv('STREAMVAULT_STREAM_OUTPUT')
+    return NDJSONWriter(path) if path else None
+
+
+def iter_records(path):
+    """Records of a result stream, skipping a line cut short by a crash"""
+    with open_stream(path, 'r') as f:
+        line_num = 0
+        try:
+            for line_num, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    print(f"⚠️  {path}:{line_num}: skipping unreadable line")
+        except EOFError:
+            # A gzip member that was never closed
+            print(f"⚠️  {path}: stream ends early after line {line_num}")
+
+
+def dumps_at(value, depth):
+    """json.dump(indent=2) text of value nested depth levels deep"""
+    return json.dumps(value, indent=2, ensure_ascii=False).replace('\n', '\n' + '  ' * depth)
+
+
+class StreamFinalizer:
+    """Sorts a result stream through a temporary SQLite file into the nested layouts
+
+    Categories and shows keep the order they first appear in, seasons are
+    ordered by number and episodes by episode number, as the extractors
+    build them.
+    """
+
+    def __init__(self, stream_path):
+        self.stream_path = stream_path
+        fd, self.db_path = tempfile.mkstemp(suffix='.sqlite', prefix='finalize-',
+                                            dir=os.path.dirname(os.path.abspath(stream_path)))
+        os.close(fd)
+        self.conn = sqlite3.connect(self.db_path)
+        self.conn.executescript(SCHEMA)
+        self.path_keys = None
+        self.layout = None
+        self.load()
+
+    def close(self):
+        self.conn.close()
+        os.remove(self.db_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def group_seq(self, path):
+        key = json.dumps(path, ensure_ascii=False)
+        row = self.conn.execute("SELECT seq FROM groups WHERE path = ?", (key,)).fetchone()
+        if row:
+            return row[0]
+        seq = self.conn.execute("SELECT COUNT(*) FROM groups").fetchone()[0]
+        self.conn.execute("INSERT INTO groups (path, seq) VALUES (?, ?)", (key, seq))
+        return seq
+
+    def load(self):
+        for line_num, record in enumerate(iter_records(self.stream_path), 1):
+            if self.path_keys is None:
+                self.path_keys = [key for key in PATH_KEYS if key in record]
+                self.layout = 'universal' if 'video_source' in record else 'non_drive'
+            keys = [str(record.get(key)) for key in self.path_keys]
+            body = {key: value for key, value in record.items() if key not in PATH_KEYS}
+            # Outer levels keep first-seen order; the season level sorts by number
+            seqs = [self.group_seq(keys[:depth + 1]) for depth in range(len(keys) - 1)]
+            padded = keys + [None] * (3 - len(keys))
+            seqs += [None] * (2 - len(seqs))
+            self.conn.execute(
+                "INSERT OR REPLACE INTO episodes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (record.get('episode_url') or f"#{line_num}", *padded, *seqs,
+                 season_number(keys[-1]) if keys else None, record.get('episode'), line_num,
+                 json.dumps(body, ensure_ascii=False))
+            )
+        self.conn.commit()
+
+    def rows(self):
+        """(path keys, episode) in nested-layout order"""
+        depth = len(self.path_keys or ())
+        cursor = self.conn.execute(
+            "SELECT k0, k1, k2, body FROM episodes "
+            "ORDER BY s0, s1, season_num, k0, k1, k2, episode, line"
+        )
+        for row in cursor:
+            yield tuple(row[:depth]), json.loads(row[3])
+
+    def season_counts(self):
+        depth = len(self.path_keys or ())
+        columns = ", ".join(['k0', 'k1', 'k2'][:depth]) or "''"
+        return {tuple(row[:depth]): row[-1] for row in self.conn.execute(
+            f"SELECT {columns}, COUNT(*) FROM episodes GROUP BY {columns}")}
+
+    def write_json(self, f):
+        """Same text json.dump(nested, f, indent=2, ensure_ascii=False) would write"""
+        depth = len(self.path_keys or ())
+        previous = None
+        for keys, episode in self.rows():
+            if depth == 0:
+                # No nesting keys: a plain list of episodes
+                f.write(("[" if previous is None else ",") + "\n  " + dumps_at(episode, 1))
+                previous = keys
+                continue
+
+            if previous is None:
+                f.write("{")
+                common = 0
+            else:
+                common = next((i for i in range(depth) if keys[i] != previous[i]), depth)
+                if common == depth:
+                    f.write(",")
+                else:
+                    f.write("\n" + "  " * depth + "]")
+                    for level in range(depth - 1, common, -1):
+                        f.write("\n" + "  " * level + "}")
+                    f.write(",")
+
+            if common < depth:
+                for level in range(common, depth):
+                    f.write("\n" + "  " * (level + 1) + dumps_at(keys[level], 0) + ": " +
+                            ("[" if level == depth - 1 else "{"))
+            f.write("\n" + "  " * (depth + 1) + dumps_at(episode, depth + 1))
+            previous = keys
+
+        if previous is None:
+            # An empty stream has no layout; the extractors' exports are objects
+            f.write("[]" if self.path_keys == [] else "{}")
+        elif depth == 0:
+            f.write("\n]")
+        else:
+            f.write("\n" + "  " * depth + "]")
+            for level in range(depth - 1, 0, -1):
+                f.write("\n" + "  " * level + "}")
+            f.write("\n}")
+
+    def write_txt(self, f):
+        """Same text as the extractors' save_to_txt for this layout"""
+        counts = self.season_counts()
+        previous = None
+        for keys, ep in self.rows():
+            if self.layout == 'universal':
+                category, show, season = keys
+                if previous is None or category != previous[0]:
+                    f.write(f"\n{'='*80}\n")
+                    f.write(f"CATEGORY: {category.upper()}\n")
+                    f.write(f"{'='*80}\n")
+                if previous is None or keys[:2] != previous[:2]:
+                    f.write(f"\n📺 SHOW: {show}\n")
+                    f.write("-" * 50 + "\n")
+                if keys != previous:
+                    f.write(f"{season} ({counts[keys]} episodes)\n")
+                    f.write("-" * 30 + "\n")
+                vs = ep['video_source']
+                f.write(f"  Episode {ep['episode']} ({vs['type']}): {vs['direct_link']}\n")
+                f.write(f"    Embed: {vs['embed_code']}\n")
+            else:
+                if len(keys) == 2:
+                    if previous is None or keys[0] != previous[0]:
+                        f.write(f"\n{'='*60}\n")
+                        f.write(f"SHOW: {keys[0].upper()}\n")
+                        f.write(f"{'='*60}\n")
+                    if keys != previous:
+                        f.write(f"\n{keys[1]} ({counts[keys]} episodes)\n")
+                        f.write(f"{'-'*40}\n")
+                elif len(keys) == 1 and keys != previous:
+                    f.write(f"\n{'='*60}\n")
+                    f.write(f"{keys[0].upper()} ({counts[keys]} episodes)\n")
+                    f.write(f"{'='*60}\n")
+                f.write(f"\nEpisode {ep['episode']}:\n")
+                for video in ep['video_links']:
+                    f.write(f"  [{video['type']}] {video['url']}\n")
+            previous = keys
+
+
+def _write_atomic(path, write):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        write(f)
+    os.replace(tmp_path, path)
+
+
+def finalize(stream_path, json_file=None, txt_file=None):
+    """Write the legacy nested JSON and/or TXT export of a result stream; returns the episode count"""
+    with StreamFinalizer(stream_path) as finalizer:
+        if json_file:
+            _write_atomic(json_file, finalizer.write_json)
+            print(f"💾 Data saved to: {json_file}")
+        if txt_file:
+            _write_atomic(txt_file, finalizer.write_txt)
+            print(f"💾 Data saved to: {txt_file}")
+        count = finalizer.conn.execute("SELECT COUNT(*) FROM episodes").fetchone()[0]
+    print(f"📊 {count} episode(s) from {stream_path}")
+    return count
+
+
+def export_paths(stream_path):
+    """Default JSON/TXT paths next to a stream (x.ndjson.gz -> x.json, x.txt)"""
+    base = re.sub(r'(\.ndjson|\.jsonl)?(\.gz|\.zst)?$', '', stream_path)
+    return f"{base}.json", f"{base}.txt"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build the nested JSON/TXT exports from an NDJSON result stream")
+    parser.add_argument('stream', help="NDJSON result stream (.ndjson, .ndjson.gz or .ndjson.zst)")
+    parser.add_argument('--json', default=None, help="nested JSON output (default: next to the stream)")
+    parser.add_argument('--txt', default=None, help="TXT output (default: next to the stream)")
+    parser.add_argument('--no-txt', action='store_true', help="only write the JSON export")
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.stream):
+        print(f"❌ No such stream: {args.stream}")
+        return 1
+    json_file, txt_file = export_paths(args.stream)
+    finalize(args.stream, args.json or json_file, None if args.no_txt else args.txt or txt_file)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Extraction rule hit-rate statistics
+
+Records which video_extraction rule (and which Drive ID pattern) matched each
+episode page, per category, per show and per show season, and turns those
+counts into a "most likely first" order for the next pages of the same
+season or show. The order only decides what is tried first:
+video_extraction returns the default-order winner whatever the order, so
+the counts record the rule that really decides each page. Counts are
+persisted to a JSON file between runs; one RuleStats can be shared by
+extractors on several threads (its methods hold a lock), so there is only
+one writer of the file.
+"""
+
+import json
+import os
+import threading
+
+
+class RuleStats:
+    def __init__(self, stats_file="extraction_rule_stats.json", min_hits=3):
+        self.stats_file = stats_file
+        # A scope needs this many recorded hits before its order is trusted
+        self.min_hits = min_hits
+        self.dirty = False
+        self.lock = threading.RLock()
+        self.load()
+
+    def load(self):
+        """Load rule statistics from JSON file"""
+        if os.path.exists(self.stats_file):
+            try:
+                with open(self.stats_file, 'r', encoding='utf-8') as f:
+                    self.stats = json.load(f)
+            except Exception as e:
+                print(f"⚠️  Error loading rule stats: {e}. Starting fresh.")
+                self.stats = {}
+        else:
+            self.stats = {}
+
+    def save(self):
+        """Save rule statistics to JSON file (only if anything changed)"""
+        with self.lock:
+            if not self.dirty:
+                return
+            try:
+                with open(self.stats_file, 'w', encoding='utf-8') as f:
+                    json.dump(self.stats, f, indent=2, ensure_ascii=False)
+                self.dirty = False
+            except Exception as e:
+                print(f"❌ Error saving rule stats: {e}")
+
+    @staticmethod
+    def scopes(category=None, show=None, season=None):
+        """Scope keys from most to least specific"""
+        keys = []
+        if show is not None and season is not None:
+            keys.append(f"season:{category}|{show}|{season}")
+        if show is not None:
+            keys.append(f"show:{category}|{show}")
+        if category is not None:
+            keys.append(f"category:{category}")
+        keys.append("all")
+        return keys
+
+    def record(self, table, rule, category=None, show=None, season=None):
+        """Count one hit of a rule in every scope it belongs to"""
+        if rule is None:
+            return
+        rule = str(rule)
+        with self.lock:
+            counts = self.stats.setdefault(table, {})
+            for key in self.scopes(category, show, season):
+                scope = counts.setdefault(key, {})
+                scope[rule] = scope.get(rule, 0) + 1
+            self.dirty = True
+
+    def order(self, table, category=None, show=None, season=None):
+        """Rules of the most specific well-sampled scope, most hits first"""
+        with self.lock:
+            counts = self.stats.get(table, {})
+            for key in self.scopes(category, show, season):
+                scope = counts.get(key)
+                if scope and sum(scope.values()) >= self.min_hits:
+                    return sorted(scope, key=lambda rule: -scope[rule])
+        return []
+
+    def video_rule_order(self, category=None, show=None, season=None):
+        return self.order('video_rule', category, show, season)
+
+    def drive_pattern_order(self, category=None, show=None, season=None):
+        return [int(index) for index in self.order('drive_pattern', category, show, season)]
+
+    def record_match(self, match, category=None, show=None, season=None):
+        """Record a (type, link, rule, drive_pattern) record from video_extraction"""
+        if not match:
+            return
+        self.record('video_rule', match[2], category, show, season)
+        if match[3] is not None:
+            self.record('drive_pattern', match[3], category, show, season)
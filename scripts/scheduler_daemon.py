@@ -0,0 +1,446 @@
+"""
+Resident scheduler for continuous catalog ingestion
+
+Keeps one WorthCreteExtractor (HTTP session, parse pool and cache, state
+store) alive and runs three kinds of work on their own schedules:
+
+- category scan   list each category and queue every show not extracted yet
+- recrawl         queue finished shows last extracted more than N days ago;
+                  their seasons are listed again so new episodes are picked
+                  up, stored episodes are not fetched again
+- revalidate      recheck the stored links that are due by their TTL in
+                  link_health.sqlite (see link_health.py) and queue the
+                  episodes of newly broken ones in the dead-letter queue for
+                  redrive.py (their link health feed entries are marked
+                  exported, and appended to --feed when given)
+
+Scheduled runs and queued jobs live in scheduler.sqlite, so a restart
+carries on with the same queue and timings (a job that was running when the
+daemon stopped is queued again). Failed jobs are retried with backoff.
+
+The daemon writes its state (current job, queue counts, next runs) to a
+status file after every job and while idle; `--status` prints it. When the
+queue drains after extracting, all_categories_links.json/.txt are exported
+from the state store.
+
+Usage:
+    python scheduler_daemon.py
+    python scheduler_daemon.py --scan-hours 12 --recrawl-days 3 --revalidate-hours 2
+    python scheduler_daemon.py --once          # run what is due, drain the queue, exit (cron)
+    python scheduler_daemon.py --status
+"""
+
+import argparse
+import json
+import os
+import signal
+import sqlite3
+import threading
+import time
+
+from link_health import LinkHealthStore, export_feed, revalidate
+from link_store import LinkIndex, canonical_link
+from result_files import episode_links
+from universalv6 import CATEGORIES, WorthCreteExtractor
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    key TEXT NOT NULL,
+    payload TEXT,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    due_at REAL NOT NULL,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    last_error TEXT
+);
+CREATE UNIQUE INDEX IF NOT EXISTS jobs_open ON jobs (kind, key) WHERE status IN ('pending', 'running');
+CREATE INDEX IF NOT EXISTS jobs_due ON jobs (status, due_at);
+CREATE TABLE IF NOT EXISTS schedules (
+    name TEXT PRIMARY KEY,
+    next_run REAL NOT NULL,
+    last_run REAL,
+    last_result TEXT
+);
+"""
+
+# Shows are recrawled before new shows are scanned, links are checked last
+PRIORITY = {'show': 0, 'category_scan': 1, 'revalidate': 2}
+
+
+class JobQueue:
+    """Persistent job queue and schedule table"""
+
+    def __init__(self, queue_file="scheduler.sqlite", max_attempts=5):
+        self.queue_file = queue_file
+        self.max_attempts = max_attempts
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(queue_file, check_same_thread=False)
+        self.db.executescript(SCHEMA)
+        # Jobs interrupted by a stop or crash run again
+        with self.lock, self.db:
+            self.db.execute("UPDATE jobs SET status = 'pending' WHERE status = 'running'")
+
+    def put(self, kind, key, payload=None, due_at=None):
+        """Queue a job unless the same (kind, key) is already open; True when queued"""
+        now = time.time()
+        with self.lock, self.db:
+            cursor = self.db.execute(
+                "INSERT OR IGNORE INTO jobs (kind, key, payload, due_at, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (kind, key, json.dumps(payload or {}, ensure_ascii=False), due_at or now, now, now)
+            )
+        return cursor.rowcount == 1
+
+    def take(self):
+        """Next due job as a dict (marked running), or None"""
+        order = " ".join(f"WHEN '{kind}' THEN {rank}" for kind, rank in PRIORITY.items())
+        with self.lock, self.db:
+            row = self.db.execute(
+                "SELECT id, kind, key, payload, attempts FROM jobs WHERE status = 'pending' AND due_at <= ? "
+                f"ORDER BY CASE kind {order} ELSE 9 END, due_at, id LIMIT 1",
+                (time.time(),)
+            ).fetchone()
+            if row is None:
+                return None
+            self.db.execute("UPDATE jobs SET status = 'running', updated_at = ? WHERE id = ?", (time.time(), row[0]))
+        job_id, kind, key, payload, attempts = row
+        return {'id': job_id, 'kind': kind, 'key': key, 'payload': json.loads(payload), 'attempts': attempts}
+
+    def finish(self, job, error=None):
+        """Mark a job done, or schedule its retry with backoff after an error"""
+        now = time.time()
+        with self.lock, self.db:
+            if error is None:
+                self.db.execute("UPDATE jobs SET status = 'done', updated_at = ? WHERE id = ?", (now, job['id']))
+                return
+            attempts = job['attempts'] + 1
+            status = 'failed' if attempts >= self.max_attempts else 'pending'
+            retry_at = now + min(300 * 2 ** (attempts - 1), 6 * 3600)
+            self.db.execute(
+                "UPDATE jobs SET status = ?, attempts = ?, due_at = ?, updated_at = ?, last_error = ? WHERE id = ?",
+                (status, attempts, retry_at, now, str(error)[:500], job['id'])
+            )
+
+    def release(self, job):
+        """Put a job interrupted by a stop back in the queue without counting an attempt"""
+        with self.lock, self.db:
+            self.db.execute("UPDATE jobs SET status = 'pending', updated_at = ? WHERE id = ?", (time.time(), job['id']))
+
+    def counts(self):
+        """{kind: {status: n}}"""
+        with self.lock:
+            rows = self.db.execute("SELECT kind, status, COUNT(*) FROM jobs GROUP BY kind, status").fetchall()
+        counts = {}
+        for kind, status, n in rows:
+            counts.setdefault(kind, {})[status] = n
+        return counts
+
+    def next_due(self):
+        with self.lock:
+            row = self.db.execute("SELECT MIN(due_at) FROM jobs WHERE status = 'pending'").fetchone()
+        return row[0]
+
+    # Schedules
+
+    def schedule_due(self, name, now):
+        """True when the named schedule should run (a new schedule runs right away)"""
+        with self.lock:
+            row = self.db.execute("SELECT next_run FROM schedules WHERE name = ?", (name,)).fetchone()
+        return row is None or row[0] <= now
+
+    def schedule_ran(self, name, interval, result=None):
+        now = time.time()
+        with self.lock, self.db:
+            self.db.execute(
+                "INSERT OR REPLACE INTO schedules VALUES (?, ?, ?, ?)",
+                (name, now + interval, now, json.dumps(result, ensure_ascii=False))
+            )
+
+    def schedules(self):
+        with self.lock:
+            rows = self.db.execute("SELECT name, next_run, last_run, last_result FROM schedules").fetchall()
+        return {name: {'next_run': next_run, 'last_run': last_run, 'last_result': json.loads(last_result or 'null')}
+                for name, next_run, last_run, last_result in rows}
+
+    def close(self):
+        with self.lock:
+            self.db.close()
+
+
+class SchedulerDaemon:
+    def __init__(self, extractor=None, queue=None, link_health=None, categories=CATEGORIES, scan_hours=24,
+                 recrawl_days=7, revalidate_hours=1, revalidate_batch=200, delay=2,
+                 output="all_categories_links.json", status_file="scheduler_status.json", poll=60, feed=None,
+                 forget_days=30):
+        self.extractor = extractor or WorthCreteExtractor()
+        self.queue = queue or JobQueue()
+        self.link_health = link_health or LinkHealthStore()
+        self.categories = categories
+        # At least a minute apart, so a schedule can't fire on every loop
+        self.intervals = {
+            'category_scan': max(scan_hours * 3600, 60),
+            'recrawl': max(recrawl_days * 86400, 60),
+            'revalidate': max(revalidate_hours * 3600, 60),
+        }
+        self.recrawl_age = recrawl_days * 86400
+        self.revalidate_batch = revalidate_batch
+        self.delay = delay
+        self.output = output
+        self.feed = feed
+        self.forget_age = forget_days * 86400
+        self.status_file = status_file
+        self.poll = poll
+        self.stop_event = threading.Event()
+        self.started_at = time.time()
+        self.current = None
+        self.totals = {'jobs': 0, 'failed_jobs': 0, 'shows': 0, 'links_checked': 0, 'links_dead': 0}
+        # Results changed since the last export
+        self.dirty = False
+
+    def stop(self, *_):
+        if self.stop_event.is_set():
+            # Second signal: stop now, the running job is queued again on restart
+            raise KeyboardInterrupt
+        print("\n🛑 Stopping after the current job (again to stop now)...")
+        self.stop_event.set()
+
+    # Schedules -> jobs
+
+    def enqueue_due(self):
+        now = time.time()
+
+        if self.queue.schedule_due('category_scan', now):
+            queued = sum(self.queue.put('category_scan', name, {'category': name, 'url': url})
+                         for name, url in self.categories.items())
+            self.queue.schedule_ran('category_scan', self.intervals['category_scan'], {'queued': queued})
+
+        if self.queue.schedule_due('recrawl', now):
+            queued = 0
+            for category, show_name, show_url in self.extractor.state.due_shows(now - self.recrawl_age):
+                if category in self.categories:
+                    queued += self.queue.put('show', f"{category}|{show_name}", {
+                        'category': category, 'show_name': show_name, 'show_url': show_url, 'refresh': True
+                    })
+            if queued:
+                print(f"🔁 {queued} show(s) due for a recrawl")
+            self.queue.schedule_ran('recrawl', self.intervals['recrawl'], {'queued': queued})
+
+        if self.queue.schedule_due('revalidate', now):
+            self.queue.put('revalidate', 'links', {'batch': self.revalidate_batch})
+            self.queue.schedule_ran('revalidate', self.intervals['revalidate'])
+
+    # Jobs
+
+    def run_category_scan(self, payload):
+        """Queue every show of a category that has not been extracted yet"""
+        category = payload['category']
+        queued = 0
+        for show in self.extractor.iter_show_links_from_category(payload['url'], category):
+            if self.stop_event.is_set():
+                raise InterruptedError("stopped during category scan")
+            if not self.extractor.is_show_extracted(category, show['name']):
+                queued += self.queue.put('show', f"{category}|{show['name']}", {
+                    'category': category, 'show_name': show['name'], 'show_url': show['url'], 'refresh': False
+                })
+        print(f"🌐 {category}: {queued} new show(s) queued")
+        return {'queued': queued}
+
+    def run_show(self, payload):
+        results = self.extractor.extract_show(
+            payload['show_url'], payload['show_name'], self.delay, payload['category'],
+            resume=True, refresh=payload.get('refresh', False)
+        )
+        if not results:
+            raise RuntimeError("no seasons extracted")
+        self.extractor.mark_show_extracted(payload['category'], payload['show_name'], payload['show_url'])
+        self.totals['shows'] += 1
+        self.dirty = True
+        return {'seasons': len(results), 'episodes': sum(len(eps) for eps in results.values())}
+
+    def run_revalidate(self, payload):
+        """Recheck the stored links that are due, queueing episodes of newly broken ones for redrive.py"""
+        state = self.extractor.state
+        index = LinkIndex()
+        index.add_result(state.results(), f"{state.state_file}:{state.extractor}")
+        added = self.link_health.sync(index)
+        if added:
+            print(f"🔗 {added} new link(s) to check")
+        # Links the state store dropped (re-extracted episodes) stop being checked
+        if index.links:
+            forgotten = self.link_health.forget(self.forget_age)
+            if forgotten:
+                print(f"🗑️  Forgot {forgotten} link(s) no longer in any result")
+
+        # Batches of at most `batch` links, until no link is due (or the daemon stops)
+        checked, newly_broken = revalidate(self.link_health, payload.get('batch', self.revalidate_batch),
+                                           max_batches=0, concurrency=8, per_host=2,
+                                           stop_event=self.stop_event)
+        dead = 0
+        for link in newly_broken:
+            for ref in link['references']:
+                entry = state.episode_entry(ref['episode_url']) if ref['episode_url'] else None
+                if entry is None:
+                    continue
+                # The episode has been re-extracted with another link since this one was synced
+                current = {canonical_link(url, entry['episode_url'])[0] for _, url in episode_links(entry['result'])}
+                if link['key'] not in current:
+                    continue
+                dead += 1
+                self.extractor.dead_letters.add('universal', entry['episode_url'], f"link_dead: HTTP {link['status']}",
+                                                entry['category'], entry['show_name'], entry['season_label'],
+                                                entry['season_url'], entry['episode'])
+                print(f"💀 {entry['show_name']} {entry['season_label']} Episode {entry['episode']}: "
+                      f"HTTP {link['status']}")
+        # Handled here: without this the feed of a daemon-only setup would never drain
+        if self.feed:
+            export_feed(self.link_health, self.feed)
+        else:
+            self.link_health.mark_exported([feed_id for feed_id, _ in self.link_health.feed()])
+        self.totals['links_checked'] += checked
+        self.totals['links_dead'] += dead
+        print(f"🩺 Revalidated {checked} due link(s), {dead} episode(s) newly dead")
+        return {'checked': checked, 'dead': dead}
+
+    def run_job(self, job):
+        handlers = {
+            'category_scan': self.run_category_scan,
+            'show': self.run_show,
+            'revalidate': self.run_revalidate,
+        }
+        self.current = dict(job, started_at=time.time())
+        self.write_status()
+        print(f"\n▶️  {job['kind']}: {job['key']}")
+        try:
+            result = handlers[job['kind']](job['payload'])
+        except InterruptedError:
+            self.queue.release(job)
+        except Exception as e:
+            print(f"❌ {job['kind']} {job['key']}: {e}")
+            self.queue.finish(job, e)
+            self.totals['failed_jobs'] += 1
+        else:
+            self.queue.finish(job)
+            if result is not None:
+                print(f"✅ {job['kind']} {job['key']}: {result}")
+        finally:
+            self.totals['jobs'] += 1
+            self.current = None
+
+    # Output
+
+    def export(self):
+        results = self.extractor.state.results(set(self.categories))
+        self.extractor.save_to_json(results, self.output)
+        self.extractor.save_to_txt(results, os.path.splitext(self.output)[0] + ".txt")
+        self.dirty = False
+
+    def write_status(self, state="running"):
+        status = {
+            'pid': os.getpid(),
+            'state': state,
+            'started_at': self.started_at,
+            'updated_at': time.time(),
+            'current_job': self.current,
+            'queue': self.queue.counts(),
+            'schedules': self.queue.schedules(),
+            'totals': self.totals,
+        }
+        tmp_file = f"{self.status_file}.tmp"
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(status, f, indent=2, ensure_ascii=False)
+        os.replace(tmp_file, self.status_file)
+
+    def run(self, once=False):
+        """Run until stopped (or, with once, until nothing is due)"""
+        print(f"🚀 Scheduler started (pid {os.getpid()}), status in {self.status_file}")
+        try:
+            while not self.stop_event.is_set():
+                self.enqueue_due()
+                job = self.queue.take()
+                if job is not None:
+                    self.run_job(job)
+                    self.write_status()
+                    continue
+
+                if self.dirty:
+                    self.export()
+                if once:
+                    break
+
+                # Idle until the next job or schedule is due
+                self.write_status("idle")
+                next_due = min([t for t in [self.queue.next_due()] if t] +
+                               [s['next_run'] for s in self.queue.schedules().values()] +
+                               [time.time() + self.poll])
+                self.stop_event.wait(max(1, min(self.poll, next_due - time.time())))
+        finally:
+            if self.dirty:
+                self.export()
+            self.extractor.rule_stats.save()
+            self.extractor.parse_pool.close()
+            self.link_health.close()
+            self.write_status("stopped")
+            print("👋 Scheduler stopped")
+
+
+def print_status(status_file):
+    if not os.path.exists(status_file):
+        print(f"❌ No status file at {status_file}")
+        return
+    with open(status_file, 'r', encoding='utf-8') as f:
+        status = json.load(f)
+    age = time.time() - status['updated_at']
+    print(f"State: {status['state']} (pid {status['pid']}, updated {age:.0f}s ago)")
+    if status.get('current_job'):
+        job = status['current_job']
+        print(f"Current job: {job['kind']} {job['key']} ({time.time() - job['started_at']:.0f}s)")
+    for kind, counts in sorted(status['queue'].items()):
+        print(f"  {kind:15} " + ", ".join(f"{s}: {n}" for s, n in sorted(counts.items())))
+    for name, schedule in sorted(status['schedules'].items()):
+        print(f"  next {name:13} {time.strftime('%Y-%m-%d %H:%M', time.localtime(schedule['next_run']))}")
+    print("Totals: " + ", ".join(f"{key}: {n}" for key, n in status['totals'].items()))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Resident scheduler for category scans, recrawls and link revalidation")
+    parser.add_argument('--category', action='append', choices=list(CATEGORIES),
+                        help="category to scan (repeatable, default: all)")
+    parser.add_argument('--scan-hours', type=float, default=24, help="hours between category scans")
+    parser.add_argument('--recrawl-days', type=float, default=7, help="recrawl shows extracted longer ago than this")
+    parser.add_argument('--revalidate-hours', type=float, default=1,
+                        help="hours between link revalidations (each checks only the links that are due)")
+    parser.add_argument('--revalidate-batch', type=int, default=200, help="links checked per revalidation batch")
+    parser.add_argument('--delay', type=float, default=2, help="seconds between requests")
+    parser.add_argument('--queue', default="scheduler.sqlite", help="persistent queue file")
+    parser.add_argument('--link-health', default="link_health.sqlite", help="link health history file")
+    parser.add_argument('--feed', default=None, help="append newly broken links to this NDJSON feed")
+    parser.add_argument('--forget-days', type=float, default=30,
+                        help="drop links missing from the state store for this many days")
+    parser.add_argument('--status-file', default="scheduler_status.json", help="status file")
+    parser.add_argument('--output', default="all_categories_links.json", help="JSON export after new results")
+    parser.add_argument('--once', action='store_true', help="run what is due, drain the queue and exit")
+    parser.add_argument('--status', action='store_true', help="print the status of a running daemon and exit")
+    args = parser.parse_args(argv)
+
+    if args.status:
+        print_status(args.status_file)
+        return
+
+    categories = {name: CATEGORIES[name] for name in (args.category or CATEGORIES)}
+    daemon = SchedulerDaemon(
+        queue=JobQueue(args.queue), link_health=LinkHealthStore(args.link_health), categories=categories, scan_hours=args.scan_hours,
+        recrawl_days=args.recrawl_days, revalidate_hours=args.revalidate_hours,
+        revalidate_batch=args.revalidate_batch, delay=args.delay, output=args.output,
+        status_file=args.status_file, feed=args.feed, forget_days=args.forget_days
+    )
+    signal.signal(signal.SIGTERM, daemon.stop)
+    signal.signal(signal.SIGINT, daemon.stop)
+    daemon.run(once=args.once)
+
+
+if __name__ == "__main__":
+    main()
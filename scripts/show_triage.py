@@ -0,0 +1,154 @@
+"""
+Sampling triage for non-Drive show extraction
+
+Decides whether a show is worth extracting by sampling a few episodes spread
+across all of its seasons, fetched in parallel, instead of judging it on the
+first episode of each season. Sampling stops as soon as the show's source
+type is settled at the configured confidence:
+
+- drive_only  every sampled episode is Drive-only (no non-Drive links)
+- non_drive   every sampled episode has non-Drive links (direct video
+              files, Mega or other embeds)
+- mixed       both kinds were seen
+- unknown     no episode could be sampled (season or episode pages failed
+              to load); the show is extracted and the episodes decide
+
+With all samples agreeing so far, the chance that the next episode agrees
+too is estimated by Laplace's rule of succession, (n + 1) / (n + 2); the
+verdict is settled once that reaches `confidence`, which takes
+samples_needed(confidence) agreeing samples (3 at 0.8); max_samples must
+allow that many. Seeing both kinds settles the show as mixed immediately.
+Episodes whose page could not be fetched are not samples.
+
+Season pages and sampled episodes are handed back so the main extraction
+loop does not download them again. A season page that failed to load is
+handed back as None, so the extraction fetches it again itself.
+"""
+
+import math
+from concurrent.futures import ThreadPoolExecutor
+
+from html_parsing import decode_page
+
+
+def samples_needed(confidence):
+    """Agreeing samples after which (n + 1) / (n + 2) reaches confidence"""
+    if not 0 < confidence < 1:
+        raise ValueError(f"confidence must be between 0 and 1, got {confidence}")
+    # Rounded first so 0.8 needs 3, not 4 from 2.0000000000000004
+    return max(math.ceil(round((2 * confidence - 1) / (1 - confidence), 9)), 0)
+
+
+class TriageResult:
+    def __init__(self, verdict, episode_links, samples, confidence):
+        self.verdict = verdict
+        # season_url -> [episode_url, ...], or None if the season page failed
+        self.episode_links = episode_links
+        # episode_url -> video_links ([] for Drive-only episodes)
+        self.samples = samples
+        self.confidence = confidence
+
+    @property
+    def worth_extracting(self):
+        return self.verdict in ('non_drive', 'mixed', 'unknown')
+
+
+class ShowTriage:
+    def __init__(self, extractor, confidence=0.8, max_samples=8, workers=4):
+        needed = samples_needed(confidence)
+        if needed > max_samples:
+            raise ValueError(f"confidence {confidence} needs {needed} agreeing samples, "
+                             f"more than max_samples={max_samples}")
+        self.extractor = extractor
+        self.confidence = confidence
+        self.max_samples = max_samples
+        self.workers = workers
+
+    def fetch_season(self, season_url):
+        """Fetch a season page once: (has non-Drive indicators, episode links), or None on error"""
+        try:
+            response = self.extractor.session.get(season_url, timeout=15)
+            response.raise_for_status()
+            html = decode_page(response)
+            episode_links = self.extractor.parse_episode_links(html, season_url) or []
+            return self.extractor.has_non_drive_videos_quick_check(html), episode_links
+        except Exception as e:
+            print(f"⚠️  Error fetching season page: {e}")
+            return None
+
+    @staticmethod
+    def sample_order(episode_links):
+        """Episodes in sampling order, spread across and within seasons
+
+        Takes the first, last and then middle episodes of each season in
+        turn, round-robin over seasons.
+        """
+        per_season = []
+        for links in episode_links.values():
+            links = links or []
+            order = []
+            pending = [(0, len(links) - 1)]
+            if links:
+                order.append(links[0])
+                if len(links) > 1:
+                    order.append(links[-1])
+            while pending:
+                low, high = pending.pop(0)
+                if high - low < 2:
+                    continue
+                mid = (low + high) // 2
+                order.append(links[mid])
+                pending.extend([(low, mid), (mid, high)])
+            per_season.append(order)
+
+        ordered = []
+        for depth in range(max((len(order) for order in per_season), default=0)):
+            for order in per_season:
+                if depth < len(order):
+                    ordered.append(order[depth])
+        return ordered
+
+    def settled(self, samples):
+        """Verdict and whether it is settled, from the samples so far"""
+        non_drive = sum(1 for links in samples.values() if links)
+        drive_only = len(samples) - non_drive
+
+        if non_drive and drive_only:
+            return 'mixed', True
+
+        verdict = 'non_drive' if non_drive else 'drive_only'
+        n = len(samples)
+        return verdict, (n + 1) / (n + 2) >= self.confidence
+
+    def triage(self, season_links):
+        """Sample a show's episodes until its source type is settled"""
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            seasons = list(pool.map(self.fetch_season, season_links))
+            episode_links = {url: season[1] if season else None for url, season in zip(season_links, seasons)}
+
+            # Every season page loaded and none hints at non-Drive video: Drive-only
+            if all(seasons) and not any(indicator for indicator, _ in seasons):
+                return TriageResult('drive_only', episode_links, {}, 1.0)
+
+            # Failed episodes are replaced by later candidates, up to twice max_samples fetches
+            candidates = self.sample_order(episode_links)[:self.max_samples * 2]
+            samples = {}
+            verdict, done = None, False
+            start = 0
+
+            while not done and start < len(candidates) and len(samples) < self.max_samples:
+                batch = candidates[start:start + min(self.workers, self.max_samples - len(samples))]
+                start += len(batch)
+                for url, links in zip(batch, pool.map(self.extractor.extract_video_links_from_episode, batch)):
+                    # None: the page could not be fetched, which says nothing about the show
+                    if links is not None:
+                        samples[url] = links
+
+                if samples:
+                    verdict, done = self.settled(samples)
+
+        if not samples:
+            return TriageResult('unknown', episode_links, {}, 0.0)
+        n = len(samples)
+        confidence = 1.0 if verdict == 'mixed' else (n + 1) / (n + 2)
+        return TriageResult(verdict, episode_links, samples, confidence)
@@ -0,0 +1,371 @@
+"""
+SQLite extraction state store
+
+One transactional file holding what the JSON history and checkpoint files
+used to: which shows are done, which seasons are complete, and the result of
+every episode, keyed by show name, season URL and episode URL. Each episode
+is one indexed row written as soon as it is extracted, so bookkeeping costs
+the same at the first episode as at the ten-thousandth, and an interrupted
+run resumes at the exact episode it stopped on instead of at an index into
+the show list.
+
+Rows are scoped by `extractor` ('universal' for universalv6, 'non_drive'
+for the non-Drive extractor) since both can visit the same episode URL.
+An episode is stored once however many categories list its show; every
+category it was extracted or resumed under gets an episode_categories row,
+so results() returns it under each of them.
+Episode results are stored as the JSON of the extractor's own record
+({'video_source': ...} or {'video_links': [...]}), minus an embed_code that
+can be rebuilt from the source type and link (see episode_record.py).
+"""
+
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+
+from episode_record import EpisodeRecord, compact_result, expand_result
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS shows (
+    extractor TEXT NOT NULL,
+    category TEXT NOT NULL,
+    show_name TEXT NOT NULL,
+    show_url TEXT,
+    done INTEGER NOT NULL DEFAULT 0,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (extractor, category, show_name)
+);
+CREATE TABLE IF NOT EXISTS seasons (
+    extractor TEXT NOT NULL,
+    season_url TEXT NOT NULL,
+    category TEXT,
+    show_name TEXT,
+    season_label TEXT,
+    done INTEGER NOT NULL DEFAULT 0,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (extractor, season_url)
+);
+CREATE TABLE IF NOT EXISTS episodes (
+    extractor TEXT NOT NULL,
+    episode_url TEXT NOT NULL,
+    category TEXT,
+    show_name TEXT,
+    season_label TEXT,
+    season_url TEXT,
+    episode INTEGER,
+    status TEXT NOT NULL,
+    result TEXT,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (extractor, episode_url)
+);
+CREATE INDEX IF NOT EXISTS episodes_season ON episodes (extractor, season_url);
+CREATE INDEX IF NOT EXISTS episodes_show ON episodes (extractor, category, show_name, season_label);
+CREATE TABLE IF NOT EXISTS episode_categories (
+    extractor TEXT NOT NULL,
+    category TEXT NOT NULL,
+    episode_url TEXT NOT NULL,
+    show_name TEXT,
+    season_label TEXT,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (extractor, category, episode_url)
+);
+CREATE TABLE IF NOT EXISTS show_index (
+    slug TEXT NOT NULL,
+    category TEXT NOT NULL,
+    show_name TEXT NOT NULL,
+    show_url TEXT NOT NULL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (slug, category)
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+def show_slug(name):
+    """StreamVault-style slug of a show name ("Money Heist" -> "money-heist")"""
+    return re.sub(r'[^a-z0-9]+', '-', name.lower()).strip('-')
+
+
+def season_number(label):
+    """Number of a season label ("Season 3" -> 3), or None"""
+    match = re.search(r'\d+', str(label or ''))
+    return int(match.group()) if match else None
+
+
+def season_sort_key(label):
+    return season_number(label) or 0
+
+
+class StateStore:
+    def __init__(self, state_file="extraction_state.sqlite", extractor="universal"):
+        self.state_file = state_file
+        self.extractor = extractor
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(state_file, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript(SCHEMA)
+
+    def execute(self, query, params=()):
+        """Run one statement in its own transaction"""
+        with self.lock, self.db:
+            return self.db.execute(query, params)
+
+    def query(self, query, params=()):
+        with self.lock:
+            return self.db.execute(query, params).fetchall()
+
+    # Shows
+
+    def is_show_done(self, category, show_name):
+        return bool(self.query(
+            "SELECT 1 FROM shows WHERE extractor = ? AND category = ? AND show_name = ? AND done = 1",
+            (self.extractor, category, show_name)
+        ))
+
+    def mark_show_done(self, category, show_name, show_url=None):
+        self.execute(
+            "INSERT INTO shows VALUES (?, ?, ?, ?, 1, ?) "
+            "ON CONFLICT (extractor, category, show_name) DO UPDATE SET "
+            "done = 1, show_url = COALESCE(excluded.show_url, show_url), updated_at = excluded.updated_at",
+            (self.extractor, category, show_name, show_url, time.time())
+        )
+
+    def done_shows(self):
+        """{category: [show_name, ...]} of finished shows"""
+        history = {}
+        for category, show_name in self.query(
+                "SELECT category, show_name FROM shows WHERE extractor = ? AND done = 1 ORDER BY updated_at",
+                (self.extractor,)):
+            history.setdefault(category, []).append(show_name)
+        return history
+
+    def due_shows(self, older_than):
+        """(category, show_name, show_url) of finished shows last extracted before `older_than`"""
+        return self.query(
+            "SELECT category, show_name, show_url FROM shows "
+            "WHERE extractor = ? AND done = 1 AND show_url IS NOT NULL AND updated_at < ? ORDER BY updated_at",
+            (self.extractor, older_than)
+        )
+
+    # Seasons
+
+    def is_season_done(self, season_url):
+        return bool(self.query(
+            "SELECT 1 FROM seasons WHERE extractor = ? AND season_url = ? AND done = 1",
+            (self.extractor, season_url)
+        ))
+
+    def mark_season_done(self, season_url, category=None, show_name=None, season_label=None):
+        self.execute(
+            "INSERT OR REPLACE INTO seasons VALUES (?, ?, ?, ?, ?, 1, ?)",
+            (self.extractor, season_url, category, show_name, season_label, time.time())
+        )
+
+    # Episodes
+
+    def record_episode(self, episode_url, result, category=None, show_name=None, season_label=None,
+                       season_url=None, episode=None, status=None):
+        """Store one episode's result (None for a failed episode)
+
+        status defaults to 'ok' / 'failed' by the result; the non-Drive
+        extractor stores 'drive_only' for a page without a non-Drive link.
+        """
+        now = time.time()
+        with self.lock, self.db:
+            self.db.execute(
+                "INSERT OR REPLACE INTO episodes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (self.extractor, episode_url, category, show_name, season_label, season_url, episode,
+                 status or ('ok' if result else 'failed'),
+                 json.dumps(compact_result(result), ensure_ascii=False) if result else None, now)
+            )
+            if category:
+                self.db.execute(
+                    "INSERT OR REPLACE INTO episode_categories VALUES (?, ?, ?, ?, ?, ?)",
+                    (self.extractor, category, episode_url, show_name, season_label, now)
+                )
+
+    def add_episode_category(self, episode_url, category, show_name=None, season_label=None):
+        """List an already stored episode under one more category (a show found in two categories)"""
+        self.execute(
+            "INSERT OR REPLACE INTO episode_categories VALUES (?, ?, ?, ?, ?, ?)",
+            (self.extractor, category, episode_url, show_name, season_label, time.time())
+        )
+
+    def episode_status(self, episode_url):
+        """Stored status of an episode ('ok', 'failed', 'drive_only'), or None"""
+        rows = self.query(
+            "SELECT status FROM episodes WHERE extractor = ? AND episode_url = ?",
+            (self.extractor, episode_url)
+        )
+        return rows[0][0] if rows else None
+
+    def episode_result(self, episode_url):
+        """Stored result of a successfully extracted episode, or None"""
+        rows = self.query(
+            "SELECT result FROM episodes WHERE extractor = ? AND episode_url = ? AND status = 'ok'",
+            (self.extractor, episode_url)
+        )
+        return expand_result(json.loads(rows[0][0])) if rows else None
+
+    def season_results(self, season_url):
+        """Episode records of a season, by episode number"""
+        rows = self.query(
+            "SELECT episode, episode_url, result FROM episodes "
+            "WHERE extractor = ? AND season_url = ? AND status = 'ok' ORDER BY episode",
+            (self.extractor, season_url)
+        )
+        return [dict({'episode': episode, 'episode_url': url}, **expand_result(json.loads(result)))
+                for episode, url, result in rows]
+
+    def results(self, categories=None):
+        """All stored results as Category -> Show -> Season -> [episodes]
+
+        video_source episodes come back as compact EpisodeRecords, so a
+        whole-catalog result stays small until it is written out.
+        """
+        # Each episode under the category it was stored with and every other one it was listed under
+        rows = self.query(
+            "SELECT category, show_name, season_label, episode, episode_url, result FROM episodes "
+            "WHERE extractor = ? AND status = 'ok' "
+            "UNION "
+            "SELECT m.category, m.show_name, m.season_label, e.episode, e.episode_url, e.result "
+            "FROM episode_categories m JOIN episodes e "
+            "ON e.extractor = m.extractor AND e.episode_url = m.episode_url "
+            "WHERE m.extractor = ? AND e.status = 'ok' "
+            "ORDER BY 1, 2, 4",
+            (self.extractor, self.extractor)
+        )
+        results = {}
+        for category, show_name, season_label, episode, url, result in rows:
+            if categories is not None and category not in categories:
+                continue
+            seasons = results.setdefault(category, {}).setdefault(show_name, {})
+            seasons.setdefault(season_label, []).append(EpisodeRecord.from_dict(
+                dict({'episode': episode, 'episode_url': url}, **json.loads(result))))
+
+        for shows in results.values():
+            for show_name, seasons in shows.items():
+                shows[show_name] = dict(sorted(seasons.items(), key=lambda item: season_sort_key(item[0])))
+        return results
+
+    def episode_entry(self, episode_url):
+        """Stored episode as a dict of the columns below (result decoded), or None"""
+        columns = ('episode_url', 'category', 'show_name', 'season_label', 'season_url', 'episode', 'result')
+        rows = self.query(
+            "SELECT episode_url, category, show_name, season_label, season_url, episode, result FROM episodes "
+            "WHERE extractor = ? AND episode_url = ? AND status = 'ok'",
+            (self.extractor, episode_url)
+        )
+        return dict(zip(columns, rows[0][:-1] + (expand_result(json.loads(rows[0][-1])),))) if rows else None
+
+    # Show index (slug -> source URL), shared by all extractors
+
+    def index_show(self, category, show_name, show_url):
+        self.execute(
+            "INSERT OR REPLACE INTO show_index VALUES (?, ?, ?, ?, ?)",
+            (show_slug(show_name), category, show_name, show_url, time.time())
+        )
+
+    def find_shows(self, slug_or_name, category=None):
+        """Index entries ({'slug', 'category', 'show_name', 'show_url'}) for a slug or show name
+
+        Exact slug matches win; otherwise shows whose slug contains the
+        query (or is contained in it) are returned. Callers treat more than
+        one entry as ambiguous (see reextract_show.AmbiguousShowError).
+        """
+        slug = show_slug(slug_or_name)
+        columns = ('slug', 'category', 'show_name', 'show_url')
+        query = "SELECT slug, category, show_name, show_url FROM show_index WHERE slug = ?"
+        params = [slug]
+        if category:
+            query += " AND category = ?"
+            params.append(category)
+        rows = self.query(query, params)
+
+        if not rows and len(slug) > 3:
+            query = ("SELECT slug, category, show_name, show_url FROM show_index "
+                     "WHERE (instr(slug, ?) > 0 OR (length(slug) > 3 AND instr(?, slug) > 0))")
+            params = [slug, slug]
+            if category:
+                query += " AND category = ?"
+                params.append(category)
+            rows = self.query(query + " ORDER BY length(slug)", params)
+
+        return [dict(zip(columns, row)) for row in rows]
+
+    def find_show_by_url(self, show_url):
+        """Index entry of a WorthCrete show URL, or None"""
+        columns = ('slug', 'category', 'show_name', 'show_url')
+        rows = self.query(
+            "SELECT slug, category, show_name, show_url FROM show_index WHERE show_url = ? OR show_url = ?",
+            (show_url.rstrip('/'), show_url.rstrip('/') + '/')
+        )
+        return dict(zip(columns, rows[0])) if rows else None
+
+    def show_index_size(self):
+        return self.query("SELECT COUNT(*) FROM show_index")[0][0]
+
+    # Checkpoint
+
+    def set_meta(self, key, value):
+        self.execute("INSERT OR REPLACE INTO meta VALUES (?, ?)", (f"{self.extractor}:{key}", json.dumps(value)))
+
+    def get_meta(self, key, default=None):
+        rows = self.query("SELECT value FROM meta WHERE key = ?", (f"{self.extractor}:{key}",))
+        return json.loads(rows[0][0]) if rows else default
+
+    # Migration from the JSON files
+
+    def import_history(self, history_file):
+        """Import a legacy extracted_history.json ({category: [show_name, ...]}) once"""
+        if not os.path.exists(history_file) or self.get_meta('imported_history'):
+            return 0
+        try:
+            with open(history_file, 'r', encoding='utf-8') as f:
+                history = json.load(f)
+        except Exception as e:
+            print(f"⚠️  Error importing history: {e}")
+            return 0
+
+        count = 0
+        for category, show_names in history.items():
+            for show_name in show_names:
+                self.mark_show_done(category, show_name)
+                count += 1
+        self.set_meta('imported_history', history_file)
+        return count
+
+    def import_checkpoint(self, checkpoint_file):
+        """Import the results of a legacy extraction_checkpoint.json once"""
+        if not os.path.exists(checkpoint_file) or self.get_meta('imported_checkpoint'):
+            return 0
+        try:
+            with open(checkpoint_file, 'r', encoding='utf-8') as f:
+                checkpoint = json.load(f)
+        except Exception as e:
+            print(f"⚠️  Error importing checkpoint: {e}")
+            return 0
+
+        count = 0
+        for category, shows in (checkpoint.get('all_results') or {}).items():
+            for show_name, seasons in shows.items():
+                for season_label, episodes in seasons.items():
+                    for ep in episodes:
+                        result = {key: value for key, value in ep.items() if key not in ('episode', 'episode_url')}
+                        self.record_episode(ep['episode_url'], result, category, show_name, season_label,
+                                            episode=ep.get('episode'))
+                        count += 1
+        self.set_meta('imported_checkpoint', checkpoint_file)
+        return count
+
+    def close(self):
+        with self.lock:
+            self.db.close()
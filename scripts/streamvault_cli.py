@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+"""
+StreamVault command line
+
+One non-interactive entry point for the extraction, comparison, catalog
+patch and Internet Archive upload scripts, so they can run from cron or
+several at a time. Each subcommand imports the script it drives only when
+it runs (requests/BeautifulSoup for extraction, internetarchive for
+uploads), so `--help` and light subcommands start instantly.
+
+Usage:
+    python streamvault_cli.py extract universal [--force] [--category "Hindi Seasons"]
+    python streamvault_cli.py extract non-drive --category-url URL | --show-url URL | --season-url URL [--force]
+    python streamvault_cli.py extract missing [--dry-run]
+    python streamvault_cli.py compare [--extracted FILE] [--data FILE] [--output FILE]
+    python streamvault_cli.py patch banshee | his-hers | MAP.json [--show-id ID] [--dry-run]
+    python streamvault_cli.py upload video FILE --title TITLE [--show NAME --season 1 --episode 2]
+    python streamvault_cli.py upload folder DIR --identifier ID --title TITLE
+    python streamvault_cli.py upload batch FILE.csv [--output FILE]
+
+The argparse tools are available as subcommands too and take their own
+options (see `python streamvault_cli.py <tool> --help`):
+    pipeline   crawl_pipeline.py     streaming crawl to NDJSON
+    reextract  reextract_show.py     re-extract one show/season/episode
+    redrive    redrive.py            re-process the dead-letter queue
+    corpus     reextract_corpus.py   re-run extraction over stored pages
+    hls        hls_resolver.py       fill bulk-import durations from HLS playlists
+    daemon     scheduler_daemon.py   resident scheduler for scans, recrawls and revalidation
+    api        job_api.py            local HTTP API for on-demand extraction jobs
+    dag        dag_runner.py         extract -> match -> validate -> upload -> patch pipeline
+    finalize   result_stream.py      nested JSON/TXT exports from an NDJSON result stream
+    index      result_index.py       byte-range index of a result file / read single shows
+    diff       result_diff.py        hash-based diff/patch between result snapshots
+    links      link_store.py         canonical link index with duplicate/placeholder reports
+    health     link_check.py         async liveness check of extracted links, prune broken ones
+    revalidate link_health.py        TTL-based link revalidation with a newly-broken feed
+"""
+
+import argparse
+import importlib
+import os
+import sys
+
+
+# subcommand -> (module, description); these parse their own arguments
+TOOLS = {
+    'pipeline': ('crawl_pipeline', "streaming crawl to NDJSON"),
+    'reextract': ('reextract_show', "re-extract one show/season/episode"),
+    'redrive': ('redrive', "re-process the dead-letter queue"),
+    'corpus': ('reextract_corpus', "re-run extraction over stored pages"),
+    'hls': ('hls_resolver', "fill bulk-import durations from HLS playlists"),
+    'daemon': ('scheduler_daemon', "resident scheduler for scans, recrawls and revalidation"),
+    'api': ('job_api', "local HTTP API for on-demand extraction jobs"),
+    'dag': ('dag_runner', "extract -> match -> validate -> upload -> patch pipeline"),
+    'finalize': ('result_stream', "nested JSON/TXT exports from an NDJSON result stream"),
+    'index': ('result_index', "byte-range index of a result file / read single shows"),
+    'diff': ('result_diff', "hash-based diff/patch between result snapshots"),
+    'links': ('link_store', "canonical link index with duplicate/placeholder reports"),
+    'health': ('link_check', "async liveness check of extracted links, prune broken ones"),
+    'revalidate': ('link_health', "TTL-based link revalidation with a newly-broken feed"),
+}
+
+# Built-in URL maps for `patch`
+PATCH_SCRIPTS = {
+    'banshee': 'update-banshee-urls',
+    'his-hers': 'update-his-hers-urls',
+}
+
+UNIVERSAL_CATEGORIES = ("English Seasons", "Hindi Seasons", "Hindi Dubbed Seasons")
+
+
+def load(module_name):
+    """Import a script module on demand (works for the hyphenated file names too)"""
+    return importlib.import_module(module_name)
+
+
+# extract
+
+def cmd_extract_universal(args):
+    universalv6 = load('universalv6')
+    categories = {name: universalv6.CATEGORIES[name] for name in (args.category or universalv6.CATEGORIES)}
+    universalv6.extract_all(categories, delay=args.delay, force=args.force, output=args.output)
+
+
+def cmd_extract_non_drive(args):
+    if args.season_url:
+        mode, url = 'season', args.season_url
+    elif args.show_url:
+        mode, url = 'show', args.show_url
+    else:
+        mode, url = 'category', args.category_url
+    load('extract-non-drive-videos').extract(mode, url, delay=args.delay, output=args.output, force=args.force)
+
+
+def cmd_extract_missing(args):
+    missing = load('extract_missing_shows')
+    if args.dry_run:
+        missing.dry_run()
+    else:
+        missing.extract_missing(delay=args.delay)
+
+
+# compare
+
+def cmd_compare(args):
+    load('compare-shows').compare_shows(args.extracted, args.data, args.output)
+
+
+# patch
+
+def cmd_patch(args):
+    catalog_patch = load('catalog_patch')
+    if args.target in PATCH_SCRIPTS:
+        script = load(PATCH_SCRIPTS[args.target])
+        show_id = getattr(script, 'BANSHEE_SHOW_ID', None) or script.SHOW_ID
+        url_map = script.URL_MAP
+        skip = {(1, 1)} if args.target == 'banshee' else ()
+    else:
+        if not os.path.exists(args.target):
+            print(f"❌ No such URL map: {args.target} (or use one of: {', '.join(PATCH_SCRIPTS)})")
+            return 1
+        show_id, url_map = catalog_patch.load_url_map(args.target)
+        show_id = args.show_id or show_id
+        skip = ()
+        if not show_id:
+            print("❌ --show-id is required when the URL map has no showId")
+            return 1
+
+    if not os.path.exists(args.data):
+        print(f"❌ Catalog not found: {args.data}")
+        return 1
+    catalog_patch.apply_url_map(show_id, url_map, args.data, skip=skip, field=args.field, dry_run=args.dry_run)
+
+
+# upload
+
+def cmd_upload_video(args):
+    uploader = load('upload-to-archive')
+    result = uploader.upload_video(
+        file_path=args.file,
+        title=args.title,
+        description=args.description,
+        show_name=args.show,
+        season=args.season,
+        episode=args.episode,
+        year=args.year,
+        genres=args.genres,
+        custom_identifier=args.identifier
+    )
+    if not result.get('success'):
+        return 1
+    uploader.append_result(result, args.results)
+
+
+def cmd_upload_folder(args):
+    import json
+
+    uploader = load('upload-to-archive')
+    result = uploader.upload_folder(
+        folder_path=args.folder,
+        identifier=args.identifier,
+        title=args.title,
+        description=args.description,
+        show_name=args.show,
+        year=args.year,
+        genres=args.genres
+    )
+    if not result.get('success'):
+        return 1
+    with open(args.results, 'w', encoding='utf-8') as f:
+        json.dump(result, f, indent=2)
+    print(f"\n💾 Results saved to {args.results}")
+
+
+def cmd_upload_batch(args):
+    load('upload-to-archive').upload_batch(args.csv, args.output)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="streamvault_cli.py",
+        description="StreamVault extraction, comparison, catalog patch and upload tools",
+        epilog="tools with their own options: " + ", ".join(
+            f"{name} ({description})" for name, (_, description) in TOOLS.items()),
+    )
+    commands = parser.add_subparsers(dest='command', metavar='command')
+    commands.required = True
+
+    # extract
+    extract = commands.add_parser('extract', help="extract video links from WorthCrete")
+    extractors = extract.add_subparsers(dest='extractor', metavar='extractor')
+    extractors.required = True
+
+    universal = extractors.add_parser('universal', help="all categories, every player type (universalv6.py)")
+    universal.add_argument('--category', action='append', choices=UNIVERSAL_CATEGORIES,
+                           help="category to extract (repeatable, default: all)")
+    universal.add_argument('--force', action='store_true', help="re-extract shows already in the history")
+    universal.add_argument('--delay', type=float, default=2, help="seconds between requests")
+    universal.add_argument('--output', default="all_categories_links.json",
+                           help="JSON output (the TXT export goes next to it)")
+    universal.set_defaults(func=cmd_extract_universal)
+
+    non_drive = extractors.add_parser('non-drive', help="non-Drive links only (extract-non-drive-videos.py)")
+    target = non_drive.add_mutually_exclusive_group(required=True)
+    target.add_argument('--season-url', help="extract a single season")
+    target.add_argument('--show-url', help="extract all seasons of a show")
+    target.add_argument('--category-url', help="extract all shows of a category")
+    non_drive.add_argument('--force', action='store_true', help="re-fetch episodes already in the state store")
+    non_drive.add_argument('--delay', type=float, default=2, help="seconds between requests")
+    non_drive.add_argument('--output', default=None,
+                           help="JSON output (default: named after the URL; the TXT export goes next to it)")
+    non_drive.set_defaults(func=cmd_extract_non_drive)
+
+    missing = extractors.add_parser('missing', help="shows not yet in StreamVault (extract_missing_shows.py)")
+    missing.add_argument('--dry-run', action='store_true', help="only list which shows would be extracted")
+    missing.add_argument('--delay', type=float, default=1, help="seconds between requests")
+    missing.set_defaults(func=cmd_extract_missing)
+
+    # compare
+    compare = commands.add_parser('compare', help="compare extracted shows with the catalog (compare-shows.py)")
+    compare.add_argument('--extracted', default='english-seasons_non_drive_category.json', help="extraction result")
+    compare.add_argument('--data', default='data/streamvault-data.json', help="StreamVault catalog")
+    compare.add_argument('--output', default='show_comparison_results.json', help="comparison output")
+    compare.set_defaults(func=cmd_compare)
+
+    # patch
+    patch = commands.add_parser('patch', help="set episode URLs in the catalog (update-*-urls.py)")
+    patch.add_argument('target', help=f"built-in map ({', '.join(PATCH_SCRIPTS)}) or a URL map JSON file")
+    patch.add_argument('--show-id', default=None, help="show to patch (overrides the map's showId)")
+    patch.add_argument('--data', default='data/streamvault-data.json', help="StreamVault catalog")
+    patch.add_argument('--field', default='googleDriveUrl', help="episode field to set")
+    patch.add_argument('--dry-run', action='store_true', help="report the changes without saving")
+    patch.set_defaults(func=cmd_patch)
+
+    # upload
+    upload = commands.add_parser('upload', help="upload videos to Internet Archive (upload-to-archive.py)")
+    uploads = upload.add_subparsers(dest='mode', metavar='mode')
+    uploads.required = True
+
+    def metadata_options(sub):
+        sub.add_argument('--title', required=True)
+        sub.add_argument('--description', default="")
+        sub.add_argument('--show', default=None, help="show name (for TV episodes)")
+        sub.add_argument('--year', default=None)
+        sub.add_argument('--genres', default=None, help="comma-separated")
+
+    video = uploads.add_parser('video', help="upload a single video")
+    video.add_argument('file')
+    metadata_options(video)
+    video.add_argument('--season', type=int, default=None)
+    video.add_argument('--episode', type=int, default=None)
+    video.add_argument('--identifier', default=None, help="archive identifier (default: generated)")
+    video.add_argument('--results', default="upload_results.json", help="results file to append to")
+    video.set_defaults(func=cmd_upload_video)
+
+    folder = uploads.add_parser('folder', help="upload every video in a folder as one item")
+    folder.add_argument('folder')
+    folder.add_argument('--identifier', required=True, help="archive identifier (e.g. banshee-season-1)")
+    metadata_options(folder)
+    folder.add_argument('--results', default="folder_upload_results.json", help="results file")
+    folder.set_defaults(func=cmd_upload_folder)
+
+    batch = uploads.add_parser('batch', help="upload the videos listed in a CSV")
+    batch.add_argument('csv')
+    batch.add_argument('--output', default="upload_results.json", help="results file")
+    batch.set_defaults(func=cmd_upload_batch)
+
+    for name, (module_name, description) in TOOLS.items():
+        commands.add_parser(name, help=f"{description} ({module_name}.py)", add_help=False)
+
+    return parser
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+
+    # Tools with their own argparse CLI get the rest of the command line as is
+    if argv and argv[0] in TOOLS:
+        return load(TOOLS[argv[0]][0]).main(argv[1:])
+
+    args = build_parser().parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,274 +1,130 @@
-import re
 import requests
-from bs4 import BeautifulSoup
-from urllib.parse import urljoin
 import json
 import time
 import os
 
+import video_extraction
+from dead_letter import DeadLetterQueue
+from embed_resolver import EmbedResolver
+from episode_record import compact_episodes, json_default
+from hls_resolver import HLSResolver
+from html_parsing import decode_page
+from page_store import open_page_store
+from parse_cache import ParseCache
+from parse_pool import ParsePool, from_cache
+from result_stream import open_writer
+from rule_stats import RuleStats
+from state_store import StateStore
+
+CATEGORIES = {
+    "English Seasons": "https://www.worthcrete.com/literature/seasons/english-seasons/",
+    "Hindi Seasons": "https://www.worthcrete.com/literature/seasons/hindi-seasons/",
+    "Hindi Dubbed Seasons": "https://www.worthcrete.com/literature/seasons/hindi-dubbed-seasons/"
+}
+
 class WorthCreteExtractor:
-    def __init__(self, base_url="https://www.worthcrete.com/"):
+    def __init__(self, base_url="https://www.worthcrete.com/", parse_workers=None, page_store=None,
+                 resolve_embeds=None, resolve_hls=None):
         self.base_url = base_url
         self.session = requests.Session()
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
         })
+        # Legacy JSON history/checkpoint, imported into the state store once
         self.history_file = "extracted_history.json"
         self.checkpoint_file = "extraction_checkpoint.json"
+        self.state_file = "extraction_state.sqlite"
+        # Page parsing runs on worker processes when parse_workers > 0;
+        # pages parsed on an earlier run with the same rules come from the cache
+        self.parse_pool = ParsePool(parse_workers, base_url, ParseCache())
+        # Learned per-category/show/season rule hit rates, most likely rule first
+        self.rule_stats = RuleStats("extraction_rule_stats.json")
+        # Fetched episode pages are kept for offline re-extraction when set
+        self.page_store = page_store or open_page_store()
+        # Generic iframe embeds are followed to their media URL when enabled
+        if resolve_embeds is None:
+            resolve_embeds = os.getenv('STREAMVAULT_RESOLVE_EMBEDS', '') not in ('', '0')
+        self.embed_resolver = EmbedResolver(self.session) if resolve_embeds else None
+        # HLS sources get variant, duration and segment info when enabled
+        if resolve_hls is None:
+            resolve_hls = os.getenv('STREAMVAULT_RESOLVE_HLS', '') not in ('', '0')
+        self.hls_resolver = HLSResolver(self.session) if resolve_hls else None
+        # Failed episodes are kept for redrive.py instead of being discarded
+        self.dead_letters = DeadLetterQueue()
+        # Episodes are appended to STREAMVAULT_STREAM_OUTPUT as they are extracted when set
+        self.result_stream = open_writer()
         self.load_history()
         self.load_checkpoint()
     
     def load_history(self):
-        """Load extraction history from JSON file"""
-        if os.path.exists(self.history_file):
-            try:
-                with open(self.history_file, 'r', encoding='utf-8') as f:
-                    self.history = json.load(f)
-            except Exception as e:
-                print(f"⚠️  Error loading history: {e}. Starting fresh.")
-                self.history = {}
-        else:
-            self.history = {}
-    
-    def save_history(self):
-        """Save extraction history to JSON file"""
-        try:
-            with open(self.history_file, 'w', encoding='utf-8') as f:
-                json.dump(self.history, f, indent=2, ensure_ascii=False)
-            print(f"💾 History saved to: {self.history_file}")
-        except Exception as e:
-            print(f"❌ Error saving history: {e}")
+        """Open the extraction state store, importing the legacy JSON history once"""
+        self.state = StateStore(self.state_file, "universal")
+        imported = self.state.import_history(self.history_file)
+        if imported:
+            print(f"📥 Imported {imported} shows from {self.history_file}")
     
     def load_checkpoint(self):
-        """Load extraction checkpoint from JSON file"""
-        if os.path.exists(self.checkpoint_file):
-            try:
-                with open(self.checkpoint_file, 'r', encoding='utf-8') as f:
-                    self.checkpoint = json.load(f)
-                print(f"📍 Loaded checkpoint: {self.checkpoint}")
-            except Exception as e:
-                print(f"⚠️  Error loading checkpoint: {e}. Starting fresh.")
-                self.checkpoint = {}
-        else:
-            self.checkpoint = {}
+        """Import the results of a legacy JSON checkpoint once"""
+        imported = self.state.import_checkpoint(self.checkpoint_file)
+        if imported:
+            print(f"📥 Imported {imported} episodes from {self.checkpoint_file}")
+        current_category = self.state.get_meta('current_category')
+        if current_category:
+            print(f"📍 Loaded checkpoint: {current_category}")
     
-    def save_checkpoint(self, all_results, current_category=None, current_show_index=None):
-        """Save extraction checkpoint and current results"""
-        checkpoint_data = {
-            'all_results': all_results,
-            'current_category': current_category,
-            'current_show_index': current_show_index
-        }
-        try:
-            with open(self.checkpoint_file, 'w', encoding='utf-8') as f:
-                json.dump(checkpoint_data, f, indent=2, ensure_ascii=False)
-            print(f"📍 Checkpoint saved at {current_category} show {current_show_index if current_show_index else 'N/A'}")
-        except Exception as e:
-            print(f"❌ Error saving checkpoint: {e}")
+    def save_checkpoint(self, current_category=None):
+        """Record the category in progress (episode results are stored as they are extracted)"""
+        self.state.set_meta('current_category', current_category)
     
     def is_show_extracted(self, category, show_name):
         """Check if a show in a category has been extracted"""
-        if category not in self.history:
-            return False
-        return show_name in self.history[category]
+        return self.state.is_show_done(category, show_name)
     
-    def mark_show_extracted(self, category, show_name):
+    def mark_show_extracted(self, category, show_name, show_url=None):
         """Mark a show as extracted in history"""
-        if category not in self.history:
-            self.history[category] = []
-        if show_name not in self.history[category]:
-            self.history[category].append(show_name)
-            self.save_history()
+        self.state.mark_show_done(category, show_name, show_url)
     
     def extract_google_drive_id(self, content):
         """Extract Google Drive file ID from content with multiple patterns"""
-        patterns = [
-            r'drive\.google\.com/file/d/([a-zA-Z0-9_-]+)',  # Standard iframe
-            r'drive-video-([a-zA-Z0-9_-]+)',                # Video ID attribute
-            r'/file/d/([a-zA-Z0-9_-]+)/preview',            # Preview URL
-            r'id="drive-video-([a-zA-Z0-9_-]+)"',           # ID with drive-video
-            r'data-id="([a-zA-Z0-9_-]+)"',                  # Data attribute
-            r'fileId["\s:=]+([a-zA-Z0-9_-]+)',              # fileId variable
-            r'video[_-]?id["\s:=]+([a-zA-Z0-9_-]+)',        # video_id/videoId
-            r'src="[^"]*?/d/([a-zA-Z0-9_-]+)',              # src attribute
-        ]
-        
-        for pattern in patterns:
-            match = re.search(pattern, content, re.IGNORECASE)
-            if match:
-                return match.group(1)
-        
-        return None
+        return video_extraction.extract_google_drive_id(content)
     
     def extract_video_source(self, html_content):
         """Detect and extract video source from HTML content for various players"""
-        soup = BeautifulSoup(html_content, 'html.parser')
-        
-        # Look for iframe with video sources
-        iframes = soup.find_all('iframe', src=re.compile(r'(drive\.google\.com|mega\.nz|youtube\.com|youtu\.be|vimeo\.com)', re.I))
-        if iframes:
-            src = iframes[0]['src']  # Take the first matching iframe
-            if 'drive.google.com' in src:
-                drive_id = self.extract_google_drive_id(src)
-                if drive_id:
-                    embed_src = f"https://drive.google.com/file/d/{drive_id}/preview"
-                    return {
-                        'type': 'google_drive',
-                        'embed_code': f'<iframe src="{embed_src}" width="100%" height="480" allowfullscreen></iframe>',
-                        'direct_link': f"https://drive.google.com/file/d/{drive_id}/view"
-                    }
-            elif 'mega.nz' in src:
-                return {
-                    'type': 'mega',
-                    'embed_code': f'<iframe src="{src}" width="100%" height="480" frameborder="0" allowfullscreen></iframe>',
-                    'direct_link': src
-                }
-            elif 'youtube.com' in src or 'youtu.be' in src:
-                return {
-                    'type': 'youtube',
-                    'embed_code': f'<iframe src="{src}" width="560" height="315" frameborder="0" allowfullscreen></iframe>',
-                    'direct_link': src
-                }
-            # General iframe fallback
-            return {
-                'type': 'iframe_embed',
-                'embed_code': f'<iframe src="{src}" width="100%" height="480" frameborder="0" allowfullscreen></iframe>',
-                'direct_link': src
-            }
-        
-        # Look for video tag (HTML5 player)
-        video = soup.find('video')
-        if video:
-            src_attr = video.get('src')
-            if not src_attr:
-                source = video.find('source')
-                if source:
-                    src_attr = source.get('src')
-            if src_attr:
-                full_src = urljoin(self.base_url, src_attr) if not src_attr.startswith('http') else src_attr
-                return {
-                    'type': 'html5',
-                    'embed_code': f'<video src="{full_src}" controls width="100%" height="480"></video>',
-                    'direct_link': full_src
-                }
-        
-        # Fallback regex for Google Drive
-        drive_id = self.extract_google_drive_id(html_content)
-        if drive_id:
-            embed_src = f"https://drive.google.com/file/d/{drive_id}/preview"
-            return {
-                'type': 'google_drive',
-                'embed_code': f'<iframe src="{embed_src}" width="100%" height="480" allowfullscreen></iframe>',
-                'direct_link': f"https://drive.google.com/file/d/{drive_id}/view"
-            }
-        
-        # Fallback regex for Mega
-        mega_match = re.search(r'mega\.nz/(?:file|embed)/([A-Za-z0-9]+)#?([A-Za-z0-9]+)?', html_content, re.I)
-        if mega_match:
-            file_id = mega_match.group(1)
-            key = mega_match.group(2) or ''
-            embed_src = f"https://mega.nz/embed/{file_id}#{key}"
-            return {
-                'type': 'mega',
-                'embed_code': f'<iframe src="{embed_src}" width="100%" height="480" frameborder="0" allowfullscreen></iframe>',
-                'direct_link': embed_src
-            }
-        
-        # Additional regex for other direct video URLs (e.g., .mp4 links)
-        video_match = re.search(r'(?:src|href|data-src)=["\']([^"\']*\.(?:mp4|webm|ogg|avi|mkv)[^"\']*)["\']', html_content, re.I)
-        if video_match:
-            video_src = video_match.group(1)
-            full_src = urljoin(self.base_url, video_src) if not video_src.startswith('http') else video_src
-            return {
-                'type': 'direct_video',
-                'embed_code': f'<video src="{full_src}" controls width="100%" height="480"></video>',
-                'direct_link': full_src
-            }
-        
-        return None
+        return video_extraction.extract_video_source(html_content, self.base_url)
     
     def extract_season_number(self, url):
         """Extract season number from URL"""
-        match = re.search(r'season[s]?-(\d+)', url.lower())
-        if match:
-            return int(match.group(1))
-        return None
+        return video_extraction.extract_season_number(url)
     
     def extract_episode_number(self, url):
         """Extract episode number from URL"""
-        match = re.search(r'episode[s]?-(\d+)', url.lower())
-        if match:
-            return int(match.group(1))
-        return None
+        return video_extraction.extract_episode_number(url)
     
     def get_episode_links_from_season_page(self, season_url):
         """Extract all episode links from a season page, sorted by episode number"""
         try:
             response = self.session.get(season_url, timeout=15)
             response.raise_for_status()
-            soup = BeautifulSoup(response.content, 'html.parser')
             
-            # Extract the season number from the current URL
-            current_season_num = self.extract_season_number(season_url)
+            episode_links = self.parse_pool.submit_response('episode_links', response, season_url).result()
             
-            if current_season_num is None:
+            if episode_links is None:
                 print("⚠️  Could not determine season number from URL")
                 return []
             
-            episode_links = []
-            
-            # Find all links containing "episode" in the URL
-            for link in soup.find_all('a', href=True):
-                href = link['href']
-                
-                # Must contain 'episode' keyword
-                if 'episode' not in href.lower():
-                    continue
-                
-                # Must contain the same season number as current page
-                episode_season_num = self.extract_season_number(href)
-                
-                # Only add if it matches the current season
-                if episode_season_num == current_season_num:
-                    full_url = urljoin(self.base_url, href)
-                    ep_num = self.extract_episode_number(full_url)
-                    if ep_num:  # Only include if episode number is extractable
-                        episode_links.append((ep_num, full_url))
-            
-            # Remove duplicates (by URL) and sort by episode number
-            seen_urls = set()
-            unique_episodes = []
-            for ep_num, url in episode_links:
-                if url not in seen_urls:
-                    seen_urls.add(url)
-                    unique_episodes.append((ep_num, url))
-            
-            unique_episodes.sort(key=lambda x: x[0])  # Sort by episode number
-            
-            # Extract just the URLs
-            episode_links = [url for _, url in unique_episodes]
-            
             return episode_links
         
         except Exception as e:
             print(f"❌ Error fetching season page: {e}")
             return []
     
-    def extract_video_from_episode(self, episode_url, retries=3):
-        """Extract video source from an episode page with retry logic"""
+    def fetch_page(self, url, retries=3):
+        """Fetch a page with retry logic, returning the response or None"""
         for attempt in range(retries):
             try:
-                response = self.session.get(episode_url, timeout=15)
+                response = self.session.get(url, timeout=15)
                 response.raise_for_status()
-                
-                video_source = self.extract_video_source(response.text)
-                if video_source:
-                    return video_source
-                
-                # If no video source found on last attempt, show debug info
-                if attempt == retries - 1:
-                    print(f"\n⚠️  No video source found in HTML")
-                return None
+                return response
             
             except requests.exceptions.Timeout:
                 if attempt < retries - 1:
@@ -288,8 +144,52 @@ class WorthCreteExtractor:
         
         return None
     
-    def extract_season(self, season_url, delay=2):
-        """Extract all video sources from a season"""
+    def extract_video_from_episode(self, episode_url, retries=3):
+        """Extract video source from an episode page with retry logic"""
+        response = self.fetch_page(episode_url, retries)
+        if response is None:
+            return None
+        
+        found = self.parse_pool.submit_response('episode', response, episode_url).result()
+        if not found:
+            print(f"\n⚠️  No video source found in HTML")
+            return None
+        return video_extraction.build_video_source(found[0], found[1])
+    
+    def store_page(self, response, url, kind, **context):
+        """Keep a fetched page in the page store, if one is configured"""
+        if self.page_store is None:
+            return
+        try:
+            self.page_store.put_response(response, kind, url, **context)
+        except Exception as e:
+            print(f"⚠️  Error storing page: {e}")
+    
+    def submit_episode(self, episode_url, retries=3, rule_order=None, drive_pattern_order=None, context=None):
+        """Fetch an episode page and queue it on the parse pool
+
+        Returns a Future for the compact (type, direct_link, rule,
+        drive_pattern) record, or None if the page could not be fetched.
+        context (category/show/season/episode) is recorded with the page
+        in the page store.
+        """
+        response = self.fetch_page(episode_url, retries)
+        if response is None:
+            return None
+        self.store_page(response, episode_url, 'episode', **(context or {}))
+        return self.parse_pool.submit_response('episode', response, episode_url,
+                                               rule_order, drive_pattern_order)
+    
+    def extract_season(self, season_url, delay=2, category=None, show_name=None, season_label=None, resume=True,
+                       only_episodes=None, refresh=False):
+        """Extract all video sources from a season
+        
+        With resume, a completed season is read back from the state store and
+        episodes that already have a stored result are not fetched again.
+        With refresh, a completed season is listed again so newly published
+        episodes are picked up (stored ones are still not fetched).
+        only_episodes limits the run to those episode numbers.
+        """
         print(f"\n🔍 Extracting season from: {season_url}")
         print("=" * 80)
         
@@ -297,9 +197,21 @@ class WorthCreteExtractor:
         season_num = self.extract_season_number(season_url)
         if season_num:
             print(f"📺 Detected: Season {season_num}")
+        season_label = season_label or (f"Season {season_num}" if season_num else None)
+        
+        if resume and not refresh and not only_episodes and self.state.is_season_done(season_url):
+            results = self.state.season_results(season_url)
+            # The same season may be listed by another category's show page
+            if category:
+                for ep in results:
+                    self.state.add_episode_category(ep['episode_url'], category, show_name, season_label)
+            print(f"⏭️  Season already extracted ({len(results)} episodes)")
+            return results
         
         # Get all episode links, sorted by episode number
         episode_links = self.get_episode_links_from_season_page(season_url)
+        if only_episodes:
+            episode_links = [url for url in episode_links if self.extract_episode_number(url) in only_episodes]
         
         if not episode_links:
             print("❌ No episodes found!")
@@ -309,6 +221,37 @@ class WorthCreteExtractor:
         
         results = []
         failed_episodes = []
+        pending = []
+        
+        def record(episode_num, episode_url, result):
+            self.state.record_episode(episode_url, result, category, show_name, season_label,
+                                      season_url, episode_num)
+            if result and self.result_stream is not None:
+                self.result_stream.write(dict({'category': category, 'show': show_name, 'season': season_label,
+                                               'episode': episode_num, 'episode_url': episode_url}, **result))
+        
+        def collect(episode_num, episode_url, future):
+            found = future.result() if future is not None else None
+            if found:
+                # A cached record is a replay, not a new observation
+                if not from_cache(future):
+                    self.rule_stats.record_match(found, category, show_name, season_num)
+                video_source = video_extraction.build_video_source(found[0], found[1])
+                results.append({
+                    'episode': episode_num,
+                    'episode_url': episode_url,
+                    'video_source': video_source
+                })
+                record(episode_num, episode_url, {'video_source': video_source})
+                self.dead_letters.resolve('universal', episode_url)
+                print(f"✓ Success ({video_source['type']})")
+            else:
+                failed_episodes.append({'episode': episode_num, 'url': episode_url})
+                record(episode_num, episode_url, None)
+                self.dead_letters.add('universal', episode_url,
+                                      'fetch_failed' if future is None else 'no_video_source',
+                                      category, show_name, season_label, season_url, episode_num)
+                print(f"✗ Failed")
         
         for idx, episode_url in enumerate(episode_links):
             episode_num = self.extract_episode_number(episode_url)
@@ -318,29 +261,73 @@ class WorthCreteExtractor:
                 
             print(f"📥 [Episode {episode_num}] Processing...", end=" ")
             
-            video_source = self.extract_video_from_episode(episode_url)
+            stored = self.state.episode_result(episode_url) if resume else None
+            if stored:
+                results.append(dict({'episode': episode_num, 'episode_url': episode_url}, **stored))
+                if category:
+                    self.state.add_episode_category(episode_url, category, show_name, season_label)
+                print("⏭️  Already extracted")
+                continue
             
-            if video_source:
-                results.append({
-                    'episode': episode_num,
-                    'episode_url': episode_url,
-                    'video_source': video_source
-                })
-                print(f"✓ Success ({video_source['type']})")
+            # Try the rules that matched most often for this season/show first
+            future = self.submit_episode(
+                episode_url,
+                rule_order=self.rule_stats.video_rule_order(category, show_name, season_num),
+                drive_pattern_order=self.rule_stats.drive_pattern_order(category, show_name, season_num),
+                context={
+                    'category': category,
+                    'show': show_name,
+                    'season': season_label,
+                    'episode': episode_num
+                }
+            )
+            
+            # Parsing overlaps with the next fetches when the pool has workers
+            
+            if future is None or future.done():
+                collect(episode_num, episode_url, future)
             else:
-                failed_episodes.append({'episode': episode_num, 'url': episode_url})
-                print(f"✗ Failed")
+                print("⏳ Parsing...")
+                pending.append((episode_num, episode_url, future))
             
             # Delay between requests
             if idx < len(episode_links) - 1:
                 time.sleep(delay)
         
+        for episode_num, episode_url, future in pending:
+            print(f"📥 [Episode {episode_num}] Parsed", end=" ")
+            collect(episode_num, episode_url, future)
+        
+        results.sort(key=lambda r: r['episode'])
+        self.rule_stats.save()
+        
+        # Sources as extracted (or resumed), to re-record only the ones the resolvers change
+        before = [json.dumps(ep['video_source'], sort_keys=True) for ep in results]
+        
+        if self.embed_resolver is not None:
+            resolved = self.embed_resolver.resolve_episodes(results)
+            if resolved:
+                print(f"🔗 Resolved {resolved} iframe embed(s) to direct media")
+        
+        if self.hls_resolver is not None:
+            annotated = self.hls_resolver.annotate_episodes(results)
+            if annotated:
+                print(f"🎞️  Read {annotated} HLS manifest(s)")
+        
+        for ep, source in zip(results, before):
+            if json.dumps(ep['video_source'], sort_keys=True) != source:
+                record(ep['episode'], ep['episode_url'], {'video_source': ep['video_source']})
+        
+        if not failed_episodes and not only_episodes:
+            self.state.mark_season_done(season_url, category, show_name, season_label)
+        self.parse_pool.flush()
+        
         # Show summary
         print("\n" + "=" * 80)
         print(f"✅ Successfully extracted: {len(results)}/{len(episode_links)} episodes")
         
         if failed_episodes:
-            print(f"⚠️  Failed episodes: {len(failed_episodes)}")
+            print(f"⚠️  Failed episodes: {len(failed_episodes)} (queued for redrive.py)")
             for ep in failed_episodes:
                 print(f"   - Episode {ep['episode']}: {ep['url']}")
         
@@ -351,27 +338,13 @@ class WorthCreteExtractor:
         try:
             response = self.session.get(show_url, timeout=15)
             response.raise_for_status()
-            soup = BeautifulSoup(response.content, 'html.parser')
-            
-            season_links = []
-            for link in soup.find_all('a', href=True):
-                href = link['href']
-                # Match season pages (e.g., "seasons-1", "seasons-2")
-                if re.search(r'season[s]?-\d+', href.lower()) and 'episode' not in href.lower():
-                    full_url = urljoin(self.base_url, href)
-                    season_links.append(full_url)
-            
-            # Remove duplicates and sort by season number
-            season_links = list(set(season_links))
-            season_links.sort(key=lambda x: self.extract_season_number(x) or 0)
-            
-            return season_links
+            return video_extraction.parse_season_links(decode_page(response), self.base_url)
         
         except Exception as e:
             print(f"❌ Error fetching show page: {e}")
             return []
     
-    def extract_show(self, show_url, show_name, delay=2):
+    def extract_show(self, show_url, show_name, delay=2, category=None, resume=True, refresh=False):
         """Extract all seasons and episodes from a show"""
         print(f"\n🎬 Extracting show: {show_name}")
         print(f"URL: {show_url}")
@@ -392,7 +365,8 @@ class WorthCreteExtractor:
         for season_num, season_url in enumerate(season_links, 1):
             print(f"\n{'='*80}")
             print(f"🎯 SEASON {season_num}")
-            results = self.extract_season(season_url, delay)
+            results = self.extract_season(season_url, delay, category, show_name, f"Season {season_num}", resume,
+                                          refresh=refresh)
             all_results[f"Season {season_num}"] = results
             
             # Count successes
@@ -408,10 +382,15 @@ class WorthCreteExtractor:
         
         return all_results
     
-    def get_show_links_from_category(self, category_url):
-        """Extract all show links from a category page with pagination support"""
+    def iter_show_links_from_category(self, category_url, category_name=None):
+        """Yield the show links of a category page by page, as each page is fetched
+        
+        Shows already yielded from an earlier page are skipped. With a
+        category_name, every show is also added to the slug index used by
+        reextract_show.py.
+        """
         print(f"🔍 Fetching shows from {category_url} with pagination...")
-        show_links = []
+        seen_urls = set()
         page = 1
         max_pages = 100  # Safety limit
         
@@ -421,46 +400,30 @@ class WorthCreteExtractor:
                 print(f"   Processing page {page}...")
                 response = self.session.get(page_url, timeout=15)
                 response.raise_for_status()
-                soup = BeautifulSoup(response.content, 'html.parser')
-                
-                page_shows = []
-                for link in soup.find_all('a', href=True):
-                    href = link['href']
-                    # Improved regex for show links: ends with -online-something/
-                    if (re.search(r'/[^/]+-online-[^/]+/?$', href) and 
-                        'seasons-' not in href.lower() and 'episode' not in href.lower()):
-                        full_url = urljoin(self.base_url, href)
-                        # Extract show name from the segment before 'online'
-                        segments = href.rstrip('/').split('/')
-                        if segments:
-                            last_seg = segments[-1]
-                            show_name = re.sub(r'-online-[^-]+$', '', last_seg).replace('-', ' ').title()
-                            if show_name:
-                                page_shows.append({
-                                    'name': show_name,
-                                    'url': full_url
-                                })
+                page_shows = video_extraction.parse_show_links(decode_page(response), self.base_url)
                 
                 if not page_shows:
                     print(f"   No more shows on page {page}. Stopping.")
                     break
                 
-                show_links.extend(page_shows)
                 print(f"   Found {len(page_shows)} shows on page {page}")
+                for show in page_shows:
+                    if show['url'] not in seen_urls:
+                        seen_urls.add(show['url'])
+                        if category_name:
+                            self.state.index_show(category_name, show['name'], show['url'])
+                        yield show
+                
                 page += 1
                 time.sleep(1)  # Delay between pages
                 
             except requests.exceptions.RequestException as e:
                 print(f"   Error on page {page}: {e}")
                 break
-        
-        # Remove duplicates based on URL
-        seen_urls = set()
-        unique_shows = []
-        for show in show_links:
-            if show['url'] not in seen_urls:
-                seen_urls.add(show['url'])
-                unique_shows.append(show)
+    
+    def get_show_links_from_category(self, category_url, category_name=None):
+        """Extract all show links from a category page with pagination support"""
+        unique_shows = list(self.iter_show_links_from_category(category_url, category_name))
         
         # Sort alphabetically by name
         unique_shows.sort(key=lambda x: x['name'])
@@ -469,12 +432,16 @@ class WorthCreteExtractor:
         return unique_shows
     
     def extract_category(self, category_url, category_name, all_results, delay=2, force=False):
-        """Extract all shows from a category with checkpointing"""
+        """Extract all shows from a category with checkpointing
+        
+        Finished shows are skipped by name; a show that was interrupted
+        resumes at the first episode without a stored result.
+        """
         print(f"\n🌐 Extracting category: {category_name}")
         print(f"URL: {category_url}")
         print("=" * 80)
         
-        show_links = self.get_show_links_from_category(category_url)
+        show_links = self.get_show_links_from_category(category_url, category_name)
         
         if not show_links:
             print("❌ No shows found!")
@@ -482,17 +449,11 @@ class WorthCreteExtractor:
         
         print(f"✅ Found {len(show_links)} shows\n")
         
-        category_results = {}
+        category_results = all_results.setdefault(category_name, {})
         skipped = 0
         extracted = 0
         
-        # Resume from checkpoint if available
-        start_index = self.checkpoint.get('current_category', '') == category_name and self.checkpoint.get('current_show_index', 0) or 0
-        if start_index > 0:
-            print(f"📍 Resuming from show index {start_index}")
-        
-        for i in range(start_index, len(show_links)):
-            show_info = show_links[i]
+        for i, show_info in enumerate(show_links):
             show_name = show_info['name']
             show_url = show_info['url']
             
@@ -503,14 +464,13 @@ class WorthCreteExtractor:
                 skipped += 1
                 continue
             
-            show_results = self.extract_show(show_url, show_name, delay)
+            show_results = self.extract_show(show_url, show_name, delay, category_name, resume=not force)
             if show_results:
-                category_results[show_name] = show_results
-                self.mark_show_extracted(category_name, show_name)
+                # Kept for the whole run, so only the compact form is held on to
+                category_results[show_name] = {season: compact_episodes(episodes)
+                                               for season, episodes in show_results.items()}
+                self.mark_show_extracted(category_name, show_name, show_url)
                 extracted += 1
-                all_results[category_name] = category_results  # Update all_results
-                # Checkpoint after each show
-                self.save_checkpoint(all_results, category_name, i+1)
             else:
                 print("❌ Failed to extract show")
             
@@ -523,29 +483,22 @@ class WorthCreteExtractor:
         print(f"✅ Extracted: {extracted}")
         print(f"⏭️  Skipped: {skipped}")
         
-        # Clear checkpoint for this category if completed
-        if len(show_links) == i + 1:
-            current_checkpoint = self.checkpoint.copy()
-            if 'current_category' in current_checkpoint:
-                del current_checkpoint['current_category']
-            if 'current_show_index' in current_checkpoint:
-                del current_checkpoint['current_show_index']
-            self.save_checkpoint(all_results, **current_checkpoint)
-        
         return all_results
     
     def extract_all_categories(self, categories, delay=2, force=False):
-        """Extract from all provided categories with checkpointing"""
-        all_results = self.checkpoint.get('all_results', {}) if self.checkpoint else {}
-        total_extracted_shows = sum(len(shows) for shows in all_results.values()) if all_results else 0
+        """Extract from all provided categories with checkpointing
+
+        Returns everything stored for these categories (state.results()), so
+        shows extracted before an interrupted run are exported too.
+        """
+        all_results = {}
         
-        # Resume from checkpoint if available
-        resume_category = self.checkpoint.get('current_category', None)
-        if resume_category:
+        # Resume from checkpoint if available: the interrupted category goes first
+        resume_category = self.state.get_meta('current_category')
+        if resume_category in categories:
             print(f"📍 Resuming extraction from category: {resume_category}")
-            categories_to_process = {k: v for k, v in categories.items() if k == resume_category}
-            if not categories_to_process:
-                categories_to_process = categories
+            names = [resume_category] + [name for name in categories if name != resume_category]
+            categories_to_process = {name: categories[name] for name in names}
         else:
             categories_to_process = categories
         
@@ -554,27 +507,27 @@ class WorthCreteExtractor:
             print(f"🚀 STARTING CATEGORY: {category_name}")
             print(f"{'='*100}")
             
+            self.save_checkpoint(category_name)
             all_results = self.extract_category(category_url, category_name, all_results, delay, force)
-            total_extracted_shows = sum(len(shows) for shows in all_results.values())
-            
-            # Checkpoint after each category
-            self.save_checkpoint(all_results, category_name)
+        
+        extracted_shows = sum(len(shows) for shows in all_results.values())
+        
+        # Shows skipped as already extracted (before a crash, say) are only in the state store
+        all_results = self.state.results(set(categories))
+        total_extracted_shows = sum(len(shows) for shows in all_results.values())
         
         # Final summary
         print("\n" + "=" * 100)
         print("🎊 GRAND FINAL SUMMARY")
         print("=" * 100)
         print(f"📊 Total Categories Processed: {len(categories)}")
+        print(f"✅ Shows Extracted This Run: {extracted_shows}")
         print(f"✅ Total Shows Extracted: {total_extracted_shows}")
-        print(f"💾 Check history file: {self.history_file}")
-        print(f"📍 Checkpoint file: {self.checkpoint_file}")
+        print(f"💾 Check state file: {self.state_file}")
         
         # Clear checkpoint on completion
-        try:
-            os.remove(self.checkpoint_file)
-            print("🗑️  Checkpoint cleared (extraction complete)")
-        except:
-            pass
+        self.save_checkpoint(None)
+        print("🗑️  Checkpoint cleared (extraction complete)")
         
         return all_results
     
@@ -582,7 +535,7 @@ class WorthCreteExtractor:
         """Save extracted data to JSON file"""
         try:
             with open(filename, 'w', encoding='utf-8') as f:
-                json.dump(data, f, indent=2, ensure_ascii=False)
+                json.dump(data, f, indent=2, ensure_ascii=False, default=json_default)
             print(f"\n💾 Data saved to: {filename}")
         except Exception as e:
             print(f"❌ Error saving file: {e}")
@@ -650,7 +603,13 @@ def main():
     print("• HTML5 video players")
     print("• YouTube and general iframes")
     print("\nPagination: Automatically fetches all pages via ?pg=N until no more shows.")
-    print("\nCheckpoint System: Saves progress after each show and category. Resumes automatically if interrupted.")
+    print("\nCheckpoint System: Saves progress after each episode (extraction_state.sqlite). Resumes at the exact episode if interrupted.")
+    print("\nParsing: Set STREAMVAULT_PARSE_WORKERS=N to parse pages on N worker processes.")
+    print("\nParse Cache: Unchanged pages reuse earlier parse results (STREAMVAULT_PARSE_CACHE, default parse_cache.sqlite).")
+    print("\nEmbeds: Set STREAMVAULT_RESOLVE_EMBEDS=1 to follow generic iframe embeds to their media URL.")
+    print("\nHLS: Set STREAMVAULT_RESOLVE_HLS=1 to record variants, duration and segment counts of .m3u8 sources.")
+    print("\nPage Store: Set STREAMVAULT_PAGE_STORE=DIR to keep episode pages for reextract_corpus.py.")
+    print("\nStreaming: Set STREAMVAULT_STREAM_OUTPUT=FILE.ndjson[.gz|.zst] to append each episode as it is extracted (see result_stream.py).")
     print("\nEpisode Fix: Now extracts and sorts episodes by actual episode number from URL.")
     print("\nCategories:")
     print("1. English Seasons: https://www.worthcrete.com/literature/seasons/english-seasons/")
@@ -666,29 +625,32 @@ def main():
         print("❌ Invalid choice! Please run again and choose 1 or 2.")
         return
     
-    force = (choice == "2")
-    
+    extract_all(force=(choice == "2"))
+
+
+def extract_all(categories=CATEGORIES, delay=2, force=False, output="all_categories_links.json"):
+    """Extract the given categories and save the JSON and TXT results (no prompts)"""
     extractor = WorthCreteExtractor()
     
-    categories = {
-        "English Seasons": "https://www.worthcrete.com/literature/seasons/english-seasons/",
-        "Hindi Seasons": "https://www.worthcrete.com/literature/seasons/hindi-seasons/",
-        "Hindi Dubbed Seasons": "https://www.worthcrete.com/literature/seasons/hindi-dubbed-seasons/"
-    }
-    
-    all_results = extractor.extract_all_categories(categories, delay=2, force=force)
+    try:
+        all_results = extractor.extract_all_categories(categories, delay=delay, force=force)
+    finally:
+        extractor.parse_pool.close()
+        if extractor.result_stream is not None:
+            extractor.result_stream.close()
     
     if all_results:
         extractor.print_results(all_results)
         
         # Save files
-        extractor.save_to_json(all_results, "all_categories_links.json")
-        extractor.save_to_txt(all_results, "all_categories_links.txt")
+        extractor.save_to_json(all_results, output)
+        extractor.save_to_txt(all_results, os.path.splitext(output)[0] + ".txt")
     
     print("\n" + "="*100)
     print("✅ Full extraction complete!")
-    print(f"📝 History updated: {extractor.history_file}")
+    print(f"📝 History updated: {extractor.state_file}")
     print("="*100)
+    return all_results
 
 
 if __name__ == "__main__":
@@ -1,8 +1,4 @@
-import json
-
-# Load the data
-with open('data/streamvault-data.json', 'r', encoding='utf-8') as f:
-    data = json.load(f)
+from catalog_patch import apply_url_map
 
 # Banshee show ID
 BANSHEE_SHOW_ID = "15ee663c-c0b2-4ddb-816e-7f426e3e6321"
@@ -52,31 +48,10 @@ URL_MAP = {
     (4, 8): "https://www.worthcrete.com/wp-content/uploads/DATA/ENGLISH_Series/Banshee_S1-S4-ENG/Banshee_S4-ENG/Banshee_S04E08-ENG.mp4",
 }
 
-# Update episodes
-updated_count = 0
-for episode in data.get('episodes', []):
-    if episode.get('showId') == BANSHEE_SHOW_ID:
-        season = episode.get('season')
-        ep_num = episode.get('episodeNumber')
-        
-        # Skip S1E1 - already updated
-        if season == 1 and ep_num == 1:
-            print(f"✓ Skipping S{season}E{ep_num} - already updated")
-            continue
-        
-        key = (season, ep_num)
-        if key in URL_MAP:
-            old_url = episode.get('googleDriveUrl', 'N/A')
-            new_url = URL_MAP[key]
-            episode['googleDriveUrl'] = new_url
-            updated_count += 1
-            print(f"✓ Updated S{season}E{ep_num}: {episode['title']}")
-        else:
-            print(f"⚠️ No URL mapping for S{season}E{ep_num}")
 
-# Save the updated data
-with open('data/streamvault-data.json', 'w', encoding='utf-8') as f:
-    json.dump(data, f, indent=2, ensure_ascii=False)
+def main():
+    apply_url_map(BANSHEE_SHOW_ID, URL_MAP, skip={(1, 1)})
+
 
-print(f"\n✅ Updated {updated_count} episodes!")
-print("💾 Data saved to data/streamvault-data.json")
+if __name__ == "__main__":
+    main()
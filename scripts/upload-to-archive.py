@@ -23,39 +23,58 @@ import json
 from pathlib import Path
 from datetime import datetime
 
-# Load environment variables from .env
-try:
-    from dotenv import load_dotenv
-    load_dotenv()
-except ImportError:
-    pass  # dotenv not required if env vars are already set
+# internetarchive is imported (and configured) on first use, see configure_ia()
+ia = None
 
-try:
-    import internetarchive as ia
-except ImportError:
-    print("❌ Please install internetarchive: pip install internetarchive")
-    sys.exit(1)
 
-# Configure IA with S3 keys from environment
-access_key = os.getenv('IA_ACCESS_KEY')
-secret_key = os.getenv('IA_SECRET_KEY')
+def configure_ia():
+    """Import internetarchive and write the S3 keys from the environment to its config
 
-if access_key and secret_key:
-    # Write to IA config file for S3 authentication
-    config_dir = Path.home() / '.ia'
-    config_dir.mkdir(exist_ok=True)
-    config_file = Path.home() / '.config' / 'internetarchive' / 'ia.ini'
-    config_file.parent.mkdir(parents=True, exist_ok=True)
-    
-    config_content = f"""[s3]
+    Called before the first upload rather than at import time, so importing
+    this module (e.g. from streamvault_cli.py) has no side effects.
+    """
+    global ia
+    if ia is not None:
+        return ia
+
+    # Load environment variables from .env
+    try:
+        from dotenv import load_dotenv
+        load_dotenv()
+    except ImportError:
+        pass  # dotenv not required if env vars are already set
+
+    try:
+        import internetarchive
+    except ImportError:
+        print("❌ Please install internetarchive: pip install internetarchive")
+        sys.exit(1)
+
+    # Configure IA with S3 keys from environment
+    access_key = os.getenv('IA_ACCESS_KEY')
+    secret_key = os.getenv('IA_SECRET_KEY')
+
+    if access_key and secret_key:
+        # Write to IA config file for S3 authentication
+        config_dir = Path.home() / '.ia'
+        config_dir.mkdir(exist_ok=True)
+        config_file = Path.home() / '.config' / 'internetarchive' / 'ia.ini'
+        config_file.parent.mkdir(parents=True, exist_ok=True)
+
+        config_content = f"""[s3]
 access = {access_key}
 secret = {secret_key}
 """
-    config_file.write_text(config_content)
-    print(f"✅ Configured IA with S3 keys from environment")
-else:
-    print("⚠️  No IA_ACCESS_KEY/IA_SECRET_KEY found in environment")
-    print("   Run: ia configure")
+        # Leave the file alone when it already holds these keys (parallel runs)
+        if not config_file.exists() or config_file.read_text() != config_content:
+            config_file.write_text(config_content)
+        print(f"✅ Configured IA with S3 keys from environment")
+    else:
+        print("⚠️  No IA_ACCESS_KEY/IA_SECRET_KEY found in environment")
+        print("   Run: ia configure")
+
+    ia = internetarchive
+    return ia
 
 # Default metadata template
 DEFAULT_METADATA = {
@@ -151,6 +170,8 @@ def upload_video(
     if season and episode:
         metadata["title"] = f"{show_name} - S{season:02d}E{episode:02d} - {title}"
     
+    configure_ia()
+    
     try:
         # Upload to Internet Archive
         response = ia.upload(
@@ -259,6 +280,8 @@ def upload_folder(
     print(f"\n📤 Uploading {len(video_files)} files to identifier: {identifier}")
     print("   (Uploading one at a time to avoid rate limits...)")
     
+    configure_ia()
+    
     try:
         video_urls = []
         failed_files = []
@@ -378,6 +401,17 @@ def upload_batch(csv_file, output_file="upload_results.json"):
     
     return results
 
+def append_result(result, results_file="upload_results.json"):
+    """Append a single upload result to the results file"""
+    existing = []
+    if os.path.exists(results_file):
+        with open(results_file, 'r') as f:
+            existing = json.load(f)
+    existing.append(result)
+    with open(results_file, 'w') as f:
+        json.dump(existing, f, indent=2)
+    print(f"\n💾 Result saved to {results_file}")
+
 def main():
     """Interactive mode"""
     print("=" * 60)
@@ -385,6 +419,7 @@ def main():
     print("=" * 60)
     
     # Check if configured
+    configure_ia()
     try:
         ia.get_session()
     except Exception:
@@ -431,16 +466,7 @@ def main():
         )
         
         if result.get('success'):
-            # Save to results file
-            results_file = "upload_results.json"
-            existing = []
-            if os.path.exists(results_file):
-                with open(results_file, 'r') as f:
-                    existing = json.load(f)
-            existing.append(result)
-            with open(results_file, 'w') as f:
-                json.dump(existing, f, indent=2)
-            print(f"\n💾 Result saved to {results_file}")
+            append_result(result)
     
     elif choice == "2":
         # Folder upload
@@ -0,0 +1,490 @@
+"""
+WorthCrete page extraction rules
+
+Pure functions behind WorthCreteExtractor: they take decoded page HTML and
+return plain values, with no session, files or printing, so they can run in
+worker processes as well as in the extractor itself.
+"""
+
+import hashlib
+import re
+import sys
+from urllib.parse import urljoin
+
+import page_classifier
+from html_parsing import current_backend, extract_hrefs, extract_media
+from page_classifier import classify_page
+
+
+BASE_URL = "https://www.worthcrete.com/"
+
+# Bump when the layout of the parse records changes; rule, pattern and
+# keyword edits change rule_version() on their own
+RULE_VERSION = 2
+
+# Modules whose code decides what a parse returns
+RULE_MODULES = ('video_extraction', 'html_parsing', 'page_classifier')
+
+DRIVE_ID_PATTERNS = [
+    r'drive\.google\.com/file/d/([a-zA-Z0-9_-]+)',  # Standard iframe
+    r'drive-video-([a-zA-Z0-9_-]+)',                # Video ID attribute
+    r'/file/d/([a-zA-Z0-9_-]+)/preview',            # Preview URL
+    r'id="drive-video-([a-zA-Z0-9_-]+)"',           # ID with drive-video
+    r'data-id="([a-zA-Z0-9_-]+)"',                  # Data attribute
+    r'fileId["\s:=]+([a-zA-Z0-9_-]+)',              # fileId variable
+    r'video[_-]?id["\s:=]+([a-zA-Z0-9_-]+)',        # video_id/videoId
+    r'src="[^"]*?/d/([a-zA-Z0-9_-]+)',              # src attribute
+]
+
+# Text each Drive ID pattern needs (any of, lowercase), so a pattern that
+# cannot match is known without running it
+DRIVE_PATTERN_KEYWORDS = [
+    ('drive.google.com/file/d/',),
+    ('drive-video-',),
+    ('/file/d/',),
+    ('id="drive-video-',),
+    ('data-id="',),
+    ('fileid',),
+    ('videoid', 'video_id', 'video-id'),
+    ('/d/',),
+]
+
+IFRAME_HOST_PATTERN = re.compile(r'(drive\.google\.com|mega\.nz|youtube\.com|youtu\.be|vimeo\.com)', re.I)
+MEGA_PATTERN = re.compile(r'mega\.nz/(?:file|embed)/([A-Za-z0-9]+)#?([A-Za-z0-9]+)?', re.I)
+DIRECT_VIDEO_PATTERN = re.compile(r'(?:src|href|data-src)=["\']([^"\']*\.(?:mp4|webm|ogg|avi|mkv)[^"\']*)["\']', re.I)
+
+# Non-Drive video link patterns, with the keyword family each needs
+VIDEO_LINK_PATTERNS = {
+    'mega': (r'https?://mega\.nz/[^\s\'"<>]+', 'mega'),
+    'direct_video': (r'https?://[^\s\'"<>]+\.(?:mp4|m3u8|webm|mkv|avi|mov)(?:\?[^\s\'"<>]*)?', 'video_file'),
+    'iframe_src': (r'<iframe[^>]+src=["\']([^"\']+)["\']', 'iframe_tag'),
+    'video_src': (r'<video[^>]+src=["\']([^"\']+)["\']', 'video_tag'),
+    'source_src': (r'<source[^>]+src=["\']([^"\']+)["\']', 'source_tag'),
+}
+
+# findall() yields the captured group when a pattern has one, so each may capture the URL and nothing else
+assert all(re.compile(pattern).groups <= 1 for pattern, _ in VIDEO_LINK_PATTERNS.values())
+
+# Media URLs inside a third-party embed page (player config, <source>, links)
+EMBED_MANIFEST_PATTERN = re.compile(r'((?:https?:)?//[^\s\'"<>()]+?\.m3u8(?:\?[^\s\'"<>()]*)?)', re.I)
+EMBED_FILE_PATTERN = re.compile(r'((?:https?:)?//[^\s\'"<>()]+?\.(?:mp4|webm|mkv|mov)(?:\?[^\s\'"<>()]*)?)', re.I)
+EMBED_RELATIVE_PATTERN = re.compile(
+    r'(?:src|file|source|url)["\']?\s*[:=]\s*["\']([^"\'\s]+?\.(m3u8|mp4|webm|mkv|mov)(?:\?[^"\'\s]*)?)["\']', re.I)
+
+# hls.js plays HLS in browsers without native support (all but Safari)
+HLS_JS_URL = "https://cdn.jsdelivr.net/npm/hls.js@1/dist/hls.min.js"
+
+SKIP_LINK_DOMAINS = ['google.com', 'facebook.com', 'twitter.com', 'instagram.com',
+                     'youtube.com', 'doubleclick.net', 'googletagmanager.com']
+
+
+def build_video_source(source_type, direct_link):
+    """Build the video_source dict stored for an episode"""
+    if source_type == 'google_drive':
+        embed_src = direct_link.rsplit('/', 1)[0] + '/preview'
+        embed_code = f'<iframe src="{embed_src}" width="100%" height="480" allowfullscreen></iframe>'
+    elif source_type == 'youtube':
+        embed_code = f'<iframe src="{direct_link}" width="560" height="315" frameborder="0" allowfullscreen></iframe>'
+    elif source_type == 'hls':
+        # The manifest stays the first src="" of the markup (importers read it from there); browsers
+        # that can't play it natively get it through hls.js
+        player_id = 'hls-' + hashlib.sha1(direct_link.encode('utf-8')).hexdigest()[:10]
+        embed_code = (
+            f'<video id="{player_id}" src="{direct_link}" controls width="100%" height="480"></video>'
+            f'<script src="{HLS_JS_URL}"></script>'
+            f'<script>(function(){{var v=document.getElementById("{player_id}");'
+            f'if(!v.canPlayType("application/vnd.apple.mpegurl")&&window.Hls&&Hls.isSupported())'
+            f'{{var h=new Hls();h.loadSource(v.getAttribute("src"));v.removeAttribute("src");h.attachMedia(v);}}}})();'
+            f'</script>'
+        )
+    elif source_type in ('html5', 'direct_video'):
+        embed_code = f'<video src="{direct_link}" controls width="100%" height="480"></video>'
+    else:
+        embed_code = f'<iframe src="{direct_link}" width="100%" height="480" frameborder="0" allowfullscreen></iframe>'
+
+    return {
+        'type': source_type,
+        'embed_code': embed_code,
+        'direct_link': direct_link
+    }
+
+
+def rule_version():
+    """Version of the parse results for parse_cache
+
+    A hash of RULE_VERSION, the code of the rule modules (rules, patterns,
+    keyword table), the HTML backend in use and the keyword matcher, so a
+    change to any of them leaves records parsed before it unused.
+    """
+    digest = hashlib.sha1(f"{RULE_VERSION}|{current_backend().name}|"
+                          f"{'ahocorasick' if page_classifier.ahocorasick else 're'}".encode())
+    for name in RULE_MODULES:
+        with open(sys.modules[name].__file__, 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()[:16]
+
+
+def drive_view_link(drive_id):
+    return f"https://drive.google.com/file/d/{drive_id}/view"
+
+
+def absolute_url(src, base_url=BASE_URL):
+    return urljoin(base_url, src) if not src.startswith('http') else src
+
+
+def match_google_drive_id(content, pattern_order=None):
+    """Find a Google Drive file ID, returning (drive_id, pattern_index) or None
+
+    pattern_order lists indexes into DRIVE_ID_PATTERNS to try first; the
+    result is the one of the default order either way.
+    """
+    lowered = content.lower() if pattern_order else content
+
+    def search(index):
+        match = re.search(DRIVE_ID_PATTERNS[index], content, re.IGNORECASE)
+        return match.group(1) if match else None
+
+    def may_match(index):
+        return any(keyword in lowered for keyword in DRIVE_PATTERN_KEYWORDS[index])
+
+    found = first_match(range(len(DRIVE_ID_PATTERNS)), pattern_order, search, may_match)
+    return (found[1], found[0]) if found else None
+
+
+def extract_google_drive_id(content, pattern_order=None):
+    """Extract Google Drive file ID from content with multiple patterns"""
+    found = match_google_drive_id(content, pattern_order)
+    return found[0] if found else None
+
+
+def ordered(default, preferred=None):
+    """Default order with the preferred entries moved to the front"""
+    default = list(default)
+    if not preferred:
+        return default
+    front = [item for item in preferred if item in default]
+    return front + [item for item in default if item not in front]
+
+
+def first_match(default, preferred, attempt, may_match):
+    """(item, result) of the first item in default order whose attempt() returns something
+
+    Preferred items are tried first only where that cannot change the
+    answer: an item's hit is taken early when every item ahead of it in
+    the default order has already failed or cannot match (may_match() is
+    False). From the first preferred item that does not qualify, the
+    remaining items run in default order.
+    """
+    default = list(default)
+    tried = set()
+    if preferred:
+        for item in ordered(default, preferred):
+            if any(earlier not in tried and may_match(earlier) for earlier in default[:default.index(item)]):
+                break
+            tried.add(item)
+            result = attempt(item)
+            if result:
+                return item, result
+    for item in default:
+        if item not in tried:
+            result = attempt(item)
+            if result:
+                return item, result
+    return None
+
+
+class EpisodePage:
+    """One episode page plus lazily computed parse state shared by the rules"""
+
+    def __init__(self, html_content, base_url=BASE_URL, drive_pattern_order=None):
+        self.html = html_content
+        self.base_url = base_url
+        self.drive_pattern_order = drive_pattern_order
+        self.drive_pattern = None
+        # One keyword pass decides which rules can possibly match
+        self.keywords = classify_page(html_content)
+        self._media = None
+
+    @property
+    def media(self):
+        # Only <iframe>/<video> elements are built, and only if the page has them
+        if self._media is None:
+            if self.keywords.has_any(('iframe_tag', 'video_tag')):
+                self._media = extract_media(self.html)
+            else:
+                self._media = {'iframes': [], 'video_src': None}
+        return self._media
+
+    def drive_id(self, content):
+        found = match_google_drive_id(content, self.drive_pattern_order)
+        if found:
+            self.drive_pattern = found[1]
+            return found[0]
+        return None
+
+
+def iframe_rule(page):
+    """Look for iframe with video sources"""
+    if not page.keywords.has('iframe_tag'):
+        return None
+    iframes = [src for src in page.media['iframes'] if IFRAME_HOST_PATTERN.search(src)]
+    if not iframes:
+        return None
+
+    src = iframes[0]  # Take the first matching iframe
+    if 'drive.google.com' in src:
+        drive_id = page.drive_id(src)
+        if drive_id:
+            return 'google_drive', drive_view_link(drive_id)
+    elif 'mega.nz' in src:
+        return 'mega', src
+    elif 'youtube.com' in src or 'youtu.be' in src:
+        return 'youtube', src
+    # General iframe fallback
+    return 'iframe_embed', src
+
+
+def video_tag_rule(page):
+    """Look for video tag (HTML5 player)"""
+    if not page.keywords.has('video_tag'):
+        return None
+    if page.media['video_src']:
+        return 'html5', absolute_url(page.media['video_src'], page.base_url)
+    return None
+
+
+def drive_regex_rule(page):
+    """Fallback regex for Google Drive"""
+    if not page.keywords.has_any(('drive', 'drive_marker')):
+        return None
+    drive_id = page.drive_id(page.html)
+    if drive_id:
+        return 'google_drive', drive_view_link(drive_id)
+    return None
+
+
+def mega_regex_rule(page):
+    """Fallback regex for Mega, only around the places mega.nz appears"""
+    mega_match = page.keywords.search(MEGA_PATTERN, page.html, 'mega')
+    if mega_match:
+        file_id = mega_match.group(1)
+        key = mega_match.group(2) or ''
+        return 'mega', f"https://mega.nz/embed/{file_id}#{key}"
+    return None
+
+
+def direct_regex_rule(page):
+    """Additional regex for other direct video URLs (e.g., .mp4 links)"""
+    if not page.keywords.has_any(('video_file', 'ogg_file')):
+        return None
+    video_match = DIRECT_VIDEO_PATTERN.search(page.html)
+    if video_match:
+        return 'direct_video', absolute_url(video_match.group(1), page.base_url)
+    return None
+
+
+# Keyword families a rule needs; without any of them it returns None
+# (the same checks the rules start with)
+RULE_KEYWORDS = {
+    'iframe': ('iframe_tag',),
+    'video_tag': ('video_tag',),
+    'drive_regex': ('drive', 'drive_marker'),
+    'mega_regex': ('mega',),
+    'direct_regex': ('video_file', 'ogg_file'),
+}
+
+# Default order in which the rules are tried; it decides which source wins
+# when several rules match
+VIDEO_RULES = {
+    'iframe': iframe_rule,
+    'video_tag': video_tag_rule,
+    'drive_regex': drive_regex_rule,
+    'mega_regex': mega_regex_rule,
+    'direct_regex': direct_regex_rule,
+}
+
+
+def match_video_source(html_content, base_url=BASE_URL, rule_order=None, drive_pattern_order=None):
+    """Detect the video source of an episode page
+
+    The first rule in VIDEO_RULES order that matches wins. Rules named in
+    rule_order are tried first where the keyword prefilter shows that no
+    rule ahead of them can match, so the order only saves work and never
+    changes the result. Returns a compact
+    (type, direct_link, rule_name, drive_pattern_index) record, or None.
+    drive_pattern_index is None unless a Drive ID pattern matched.
+    """
+    page = EpisodePage(html_content, base_url, drive_pattern_order)
+    found = first_match(VIDEO_RULES, rule_order, lambda name: VIDEO_RULES[name](page),
+                        lambda name: page.keywords.has_any(RULE_KEYWORDS[name]))
+    if found:
+        name, (source_type, direct_link) = found
+        return source_type, direct_link, name, page.drive_pattern
+    return None
+
+
+def find_video_source(html_content, base_url=BASE_URL, rule_order=None, drive_pattern_order=None):
+    """Detect the video source of an episode page
+
+    Returns a compact (type, direct_link) pair, or None.
+    """
+    found = match_video_source(html_content, base_url, rule_order, drive_pattern_order)
+    return found[:2] if found else None
+
+
+def extract_video_source(html_content, base_url=BASE_URL, rule_order=None, drive_pattern_order=None):
+    """Detect and extract video source from HTML content for various players"""
+    found = find_video_source(html_content, base_url, rule_order, drive_pattern_order)
+    if found:
+        return build_video_source(*found)
+    return None
+
+
+def extract_video_urls(html_content):
+    """Extract non-Drive video URLs ({'url', 'type'}) from HTML content"""
+    video_urls = []
+    page = classify_page(html_content)
+
+    for pattern_name, (pattern, family) in VIDEO_LINK_PATTERNS.items():
+        # Skip patterns whose keyword never appears in the page
+        if not page.has(family):
+            continue
+
+        matches = re.findall(pattern, html_content, re.IGNORECASE)
+        for match in matches:
+            url = match[0] if isinstance(match, tuple) else match
+
+            if 'drive.google.com' in url.lower():
+                continue
+            if any(domain in url.lower() for domain in SKIP_LINK_DOMAINS):
+                continue
+
+            video_urls.append({
+                'url': url,
+                'type': pattern_name
+            })
+
+    return video_urls
+
+
+def find_video_links(html_content):
+    """Non-Drive video links of an episode page, first occurrence of each URL"""
+    unique_urls = []
+    seen = set()
+    for video in extract_video_urls(html_content):
+        if video['url'] not in seen:
+            seen.add(video['url'])
+            unique_urls.append(video)
+    return unique_urls
+
+
+def find_embed_media(html_content, page_url):
+    """Direct media behind a generic embed page: (type, url) or None
+
+    Prefers an HLS manifest ('hls') over a plain video file
+    ('direct_video'). Escaped slashes in inline player JSON are undone
+    first, and relative URLs are resolved against page_url.
+    """
+    content = html_content.replace('\\/', '/')
+
+    for pattern, source_type in ((EMBED_MANIFEST_PATTERN, 'hls'), (EMBED_FILE_PATTERN, 'direct_video')):
+        match = pattern.search(content)
+        if match:
+            return source_type, urljoin(page_url, match.group(1))
+
+    match = EMBED_RELATIVE_PATTERN.search(content)
+    if match:
+        source_type = 'hls' if match.group(2).lower() == 'm3u8' else 'direct_video'
+        return source_type, urljoin(page_url, match.group(1))
+
+    return None
+
+
+def extract_season_number(url):
+    """Extract season number from URL"""
+    match = re.search(r'season[s]?-(\d+)', url.lower())
+    if match:
+        return int(match.group(1))
+    return None
+
+
+def extract_episode_number(url):
+    """Extract episode number from URL"""
+    match = re.search(r'episode[s]?-(\d+)', url.lower())
+    if match:
+        return int(match.group(1))
+    return None
+
+
+def parse_episode_links(html_content, season_url, base_url=BASE_URL):
+    """Episode links of a season page, sorted by episode number
+
+    Returns None when the season number can't be read from season_url.
+    """
+    # Extract the season number from the current URL
+    current_season_num = extract_season_number(season_url)
+    if current_season_num is None:
+        return None
+
+    episode_links = []
+
+    # Find all links containing "episode" in the URL
+    for href in extract_hrefs(html_content):
+        # Must contain 'episode' keyword
+        if 'episode' not in href.lower():
+            continue
+
+        # Only add if it matches the current season
+        if extract_season_number(href) == current_season_num:
+            full_url = urljoin(base_url, href)
+            ep_num = extract_episode_number(full_url)
+            if ep_num:  # Only include if episode number is extractable
+                episode_links.append((ep_num, full_url))
+
+    # Remove duplicates (by URL) and sort by episode number
+    seen_urls = set()
+    unique_episodes = []
+    for ep_num, url in episode_links:
+        if url not in seen_urls:
+            seen_urls.add(url)
+            unique_episodes.append((ep_num, url))
+
+    unique_episodes.sort(key=lambda x: x[0])
+
+    return [url for _, url in unique_episodes]
+
+
+def parse_season_links(html_content, base_url=BASE_URL):
+    """Season links of a show page, sorted by season number"""
+    season_links = []
+    for href in extract_hrefs(html_content):
+        # Match season pages (e.g., "seasons-1", "seasons-2")
+        if re.search(r'season[s]?-\d+', href.lower()) and 'episode' not in href.lower():
+            season_links.append(urljoin(base_url, href))
+
+    # Remove duplicates and sort by season number
+    season_links = list(set(season_links))
+    season_links.sort(key=lambda x: extract_season_number(x) or 0)
+
+    return season_links
+
+
+def parse_show_links(html_content, base_url=BASE_URL):
+    """Show entries ({'name', 'url'}) of one category listing page"""
+    page_shows = []
+    for href in extract_hrefs(html_content):
+        # Improved regex for show links: ends with -online-something/
+        if (re.search(r'/[^/]+-online-[^/]+/?$', href) and
+                'seasons-' not in href.lower() and 'episode' not in href.lower()):
+            full_url = urljoin(base_url, href)
+            # Extract show name from the segment before 'online'
+            segments = href.rstrip('/').split('/')
+            if segments:
+                last_seg = segments[-1]
+                show_name = re.sub(r'-online-[^-]+$', '', last_seg).replace('-', ' ').title()
+                if show_name:
+                    page_shows.append({
+                        'name': show_name,
+                        'url': full_url
+                    })
+    return page_shows